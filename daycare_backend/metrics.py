@@ -0,0 +1,271 @@
+import cProfile
+import hmac
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connection
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+# Upper bounds of the histogram buckets; the last bucket is unbounded
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+PERCENTILES = (50, 90, 95, 99)
+
+
+# ====================== HISTOGRAMS ======================
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, p):
+        # Upper bound of the bucket holding the p-th percentile, capped at
+        # the largest value seen
+        if not self.count:
+            return None
+        rank = self.count * p / 100
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                if index < len(self.buckets):
+                    return min(self.buckets[index], self.max)
+                return self.max
+        return self.max
+
+    def summary(self):
+        summary = {
+            'count': self.count,
+            'mean': round(self.total / self.count, 2) if self.count else None,
+            'max': round(self.max, 2),
+        }
+        for p in PERCENTILES:
+            value = self.percentile(p)
+            summary[f'p{p}'] = round(value, 2) if value is not None else None
+        return summary
+
+
+class MetricsRegistry:
+    # Per process: each worker keeps its own numbers.
+    METRICS = {
+        'total_ms': LATENCY_BUCKETS_MS,
+        'db_ms': LATENCY_BUCKETS_MS,
+        'render_ms': LATENCY_BUCKETS_MS,
+        'queries': QUERY_BUCKETS,
+    }
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+
+    def record(self, view, values):
+        with self.lock:
+            histograms = self.views.get(view)
+            if histograms is None:
+                histograms = self.views[view] = {
+                    name: Histogram(buckets) for name, buckets in self.METRICS.items()
+                }
+            for name, value in values.items():
+                histograms[name].observe(value)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                view: {name: histogram.summary() for name, histogram in histograms.items()}
+                for view, histograms in sorted(self.views.items())
+            }
+
+    def reset(self):
+        with self.lock:
+            self.views.clear()
+
+
+registry = MetricsRegistry()
+
+
+# ====================== MIDDLEWARE ======================
+# The request an async view's queries belong to; several in-flight async
+# requests can share one thread's connection and its wrappers.
+current_stats = ContextVar('current_stats', default=None)
+
+
+class RequestStats:
+    def __init__(self, scoped=False):
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_start = None
+        self.render_time = 0.0
+        self.scoped = scoped
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook
+        if self.scoped and current_stats.get() is not self:
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    cls = getattr(match.func, 'cls', None) or getattr(match.func, 'view_class', None)
+    if cls is None:
+        return match.view_name or match._func_path
+    actions = getattr(match.func, 'actions', None) or {}
+    action = actions.get(request.method.lower(), request.method.lower())
+    return f'{cls.__name__}.{action}'
+
+
+class RequestMetricsMiddleware:
+    # Records query count, DB time, render (serialization) time and total
+    # latency per view, adds a Server-Timing header, and with
+    # METRICS_PROFILE_DIR and METRICS_PROFILE_TOKEN set, dumps a cProfile
+    # for requests whose X-Profile header holds the token, at most one per
+    # METRICS_PROFILE_INTERVAL seconds per process. Streaming responses are
+    # timed up to their first byte.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        self.profile_lock = threading.Lock()
+        self.last_profile = None
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+
+        stats = request._metrics = RequestStats()
+        profiler = self._profiler(request)
+        start = time.perf_counter()
+
+        with connection.execute_wrapper(stats):
+            if profiler is not None:
+                profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+
+        return self._finish(request, response, stats, profiler, start)
+
+    async def __acall__(self, request):
+        # No profiling here: a profiler enabled across awaits would record
+        # whatever else the event loop runs meanwhile
+        stats = request._metrics = RequestStats(scoped=True)
+        current_stats.set(stats)
+        start = time.perf_counter()
+
+        # Queries from async views (and sync views adapted to ASGI) run on
+        # the request's worker thread, so the wrapper goes on that thread's
+        # connection
+        await sync_to_async(self._add_wrapper)(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(self._remove_wrapper)(stats)
+
+        return self._finish(request, response, stats, None, start)
+
+    @staticmethod
+    def _add_wrapper(stats):
+        connection.execute_wrappers.append(stats)
+
+    @staticmethod
+    def _remove_wrapper(stats):
+        if stats in connection.execute_wrappers:
+            connection.execute_wrappers.remove(stats)
+
+    def _finish(self, request, response, stats, profiler, start):
+        total = time.perf_counter() - start
+        name = view_name(request)
+
+        registry.record(name, {
+            'total_ms': total * 1000,
+            'db_ms': stats.db_time * 1000,
+            'render_ms': stats.render_time * 1000,
+            'queries': stats.queries,
+        })
+
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries"',
+            f'render;dur={stats.render_time * 1000:.1f}',
+            f'app;dur={(total - stats.db_time - stats.render_time) * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+        if profiler is not None:
+            response['X-Profile-Dump'] = self._dump(profiler, name)
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF Responses render after the view returns; time that separately
+        stats = getattr(request, '_metrics', None)
+        if stats is not None:
+            stats.render_start = time.perf_counter()
+            response.add_post_render_callback(lambda _: self._rendered(stats))
+        return response
+
+    @staticmethod
+    def _rendered(stats):
+        stats.render_time += time.perf_counter() - stats.render_start
+
+    def _profiler(self, request):
+        token = getattr(settings, 'METRICS_PROFILE_TOKEN', None)
+        if not token or not getattr(settings, 'METRICS_PROFILE_DIR', None):
+            return None
+        header = request.headers.get('X-Profile')
+        if not header or not hmac.compare_digest(header.encode(), token.encode()):
+            return None
+
+        with self.profile_lock:
+            now = time.monotonic()
+            if self.last_profile is not None and now - self.last_profile < settings.METRICS_PROFILE_INTERVAL:
+                return None
+            self.last_profile = now
+        return cProfile.Profile()
+
+    @staticmethod
+    def _dump(profiler, name):
+        directory = settings.METRICS_PROFILE_DIR
+        os.makedirs(directory, exist_ok=True)
+        filename = f'{time.strftime("%Y%m%d-%H%M%S")}-{time.time_ns() % 10**9:09d}-{name}.prof'
+        profiler.dump_stats(os.path.join(directory, filename))
+        return filename
+
+
+# ====================== ENDPOINT ======================
+class MetricsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response({'pid': os.getpid(), 'views': registry.snapshot()})
+
+    def delete(self, request, *args, **kwargs):
+        registry.reset()
+        return Response(status=204)
@@ -0,0 +1,46 @@
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # the stdlib encoder is used instead
+    orjson = None
+
+_encoder = JSONEncoder()
+
+
+def fast_serialization_enabled():
+    return getattr(settings, 'API_FAST_SERIALIZATION', True)
+
+
+class FastJSONRenderer(JSONRenderer):
+    # Same bytes as JSONRenderer, written by orjson when it is installed.
+    # Types orjson doesn't share DRF's format for (datetimes, decimals,
+    # lazy strings...) go through DRF's encoder; indented, spaced or
+    # ASCII-only output and anything orjson rejects fall back to JSONRenderer.
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            data is None
+            or orjson is None
+            or self.ensure_ascii
+            or not self.compact
+            or not fast_serialization_enabled()
+            or self.get_indent(accepted_media_type or '', renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=_encoder.default,
+                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+            )
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Like JSONRenderer: U+2028/U+2029 are valid JSON but not JavaScript
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
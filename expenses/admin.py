@@ -1,14 +1,80 @@
+from django import forms
 from django.contrib import admin
-from .models import Account, Expense, ExpenseItem
+from finances.periods import closed_period_error, is_closed
+from .models import Account, BalanceCheckpoint, Expense, ExpenseItem, LedgerEntry, ThumbnailJob
+
+class ExpenseAdminForm(forms.ModelForm):
+    def clean_date(self):
+        date = self.cleaned_data['date']
+        if is_closed(date):
+            raise forms.ValidationError(closed_period_error(date)['date'])
+        return date
 
 class ExpenseItemInline(admin.TabularInline):
     model = ExpenseItem
     extra = 1
 
+    # obj is the expense; items of a closed month are read-only
+    def has_add_permission(self, request, obj=None):
+        return super().has_add_permission(request, obj) and not (obj and is_closed(obj.date))
+
+    def has_change_permission(self, request, obj=None):
+        return super().has_change_permission(request, obj) and not (obj and is_closed(obj.date))
+
+    def has_delete_permission(self, request, obj=None):
+        return super().has_delete_permission(request, obj) and not (obj and is_closed(obj.date))
+
 @admin.register(Expense)
 class ExpenseAdmin(admin.ModelAdmin):
+    form = ExpenseAdminForm
     inlines = [ExpenseItemInline]
     list_display = ('date', 'category', 'payment_source', 'total_expense')
     list_filter = ('category', 'payment_source')
 
-admin.site.register(Account)
+    # Expenses in a closed month are shown read-only until it is reopened
+    def has_change_permission(self, request, obj=None):
+        return super().has_change_permission(request, obj) and not (obj and is_closed(obj.date))
+
+    def has_delete_permission(self, request, obj=None):
+        return super().has_delete_permission(request, obj) and not (obj and is_closed(obj.date))
+
+class AccountAdminForm(forms.ModelForm):
+    effective_date = forms.DateField(
+        required=False,
+        help_text="Date a balance change applies from, for the ledger. Today when left empty.",
+    )
+
+    class Meta:
+        model = Account
+        fields = '__all__'
+
+    def clean_effective_date(self):
+        date = self.cleaned_data['effective_date']
+        if date and is_closed(date):
+            raise forms.ValidationError(closed_period_error(date)['date'])
+        return date
+
+@admin.register(Account)
+class AccountAdmin(admin.ModelAdmin):
+    form = AccountAdminForm
+    list_display = ('account_type', 'balance', 'opened_on')
+
+    def save_model(self, request, obj, form, change):
+        # Dates the opening or adjustment ledger entry (expenses/signals.py)
+        obj._effective_date = form.cleaned_data.get('effective_date')
+        super().save_model(request, obj, form, change)
+
+@admin.register(LedgerEntry)
+class LedgerEntryAdmin(admin.ModelAdmin):
+    list_display = ('date', 'account', 'entry_type', 'amount', 'balance_after', 'created_at')
+    list_filter = ('account', 'entry_type')
+
+@admin.register(BalanceCheckpoint)
+class BalanceCheckpointAdmin(admin.ModelAdmin):
+    list_display = ('date', 'account', 'balance')
+    list_filter = ('account',)
+
+@admin.register(ThumbnailJob)
+class ThumbnailJobAdmin(admin.ModelAdmin):
+    list_display = ('expense', 'status', 'attempts', 'created_at', 'updated_at')
+    list_filter = ('status',)
@@ -0,0 +1,110 @@
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db.models import Sum
+from django.views import View
+from rest_framework import status
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+
+from .pagination import apaginate_page_number
+from .rows import ValuesListMixin
+from .services import aget_accounts_version
+from .views import AccountViewSet, ExpenseViewSet
+
+
+# ====================== BASE ======================
+class AsyncViewSetView(View):
+    # Serves one read action of a DRF viewset from an async handler. The
+    # viewset still authenticates, filters, serializes and renders; only the
+    # queries move to the async ORM, so under ASGI one worker can interleave
+    # many dashboard requests instead of parking a thread on each.
+    # Subclasses define `async respond(view, request)` returning the Response.
+    viewset_class = None
+    action = "list"
+
+    async def get(self, request, *args, **kwargs):
+        view = self.viewset_class()
+        view.action_map = {"get": self.action, "head": self.action}
+        view.args = args
+        view.kwargs = kwargs
+        view.request = view.initialize_request(request, *args, **kwargs)
+        view.headers = view.default_response_headers
+
+        try:
+            # Authentication may load the session or token from the database
+            await sync_to_async(view.initial)(view.request, *args, **kwargs)
+            response = await self.respond(view, view.request)
+        except Exception as exc:
+            response = view.handle_exception(exc)
+
+        return view.finalize_response(view.request, response, *args, **kwargs)
+
+
+class AsyncListView(AsyncViewSetView):
+    # ModelViewSet.list(): same filters, pagination and serializer, or
+    # ValuesListMixin's values() rows where the viewset uses them
+
+    async def respond(self, view, request):
+        queryset = view.filter_queryset(view.get_queryset())
+        paginator = view.paginator
+
+        values_serializer = None
+        if isinstance(view, ValuesListMixin):
+            values_serializer = view.values_serializer()
+        if values_serializer is not None:
+            queryset = view.values_queryset(queryset, values_serializer)
+
+        rows = None
+        if isinstance(paginator, PageNumberPagination):
+            rows = await apaginate_page_number(paginator, queryset, request)
+        elif paginator is not None:
+            # Keyset pages are a single slice; run DRF's paginator as is
+            rows = await sync_to_async(paginator.paginate_queryset)(queryset, request, view=view)
+
+        paginated = rows is not None
+        if not paginated:
+            rows = [row async for row in queryset.aiterator(chunk_size=2000)]
+
+        if values_serializer is not None:
+            data = await values_serializer.aserialize(rows)
+        else:
+            data = view.get_serializer(rows, many=True).data
+        return paginator.get_paginated_response(data) if paginated else Response(data)
+
+
+# ====================== ACCOUNTS ======================
+class AsyncAccountListView(AsyncViewSetView):
+    viewset_class = AccountViewSet
+
+    async def respond(self, view, request):
+        version = await aget_accounts_version()
+        headers = view.list_headers(version)
+        if view.not_modified(request, headers):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        cache_key = view.list_cache_key(version)
+        data = await cache.aget(cache_key)
+        if data is None:
+            queryset = view.get_queryset()
+            accounts = [account async for account in queryset.aiterator()]
+            total = await queryset.aaggregate(total=Sum("balance"))
+            data = view.list_rows(accounts, total["total"])
+            await cache.aset(cache_key, data, view.list_cache_timeout)
+
+        return Response(data, headers=headers)
+
+
+# ====================== EXPENSES ======================
+class AsyncExpenseListView(AsyncListView):
+    viewset_class = ExpenseViewSet
+
+
+class AsyncExpenseReportView(AsyncViewSetView):
+    # as_view(action=...) with one of ExpenseViewSet.REPORTS
+    viewset_class = ExpenseViewSet
+
+    async def respond(self, view, request):
+        group_field, group_expression = view.REPORTS[self.action]
+        querysets = view.report_rows(group_field, group_expression)
+        rows = [row for queryset in querysets async for row in queryset]
+        return Response(view.report_payload(rows, group_field))
@@ -0,0 +1,142 @@
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import (
+    content_disposition_header, http_date, parse_etags, parse_http_date_safe, quote_etag,
+)
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+SENDFILE_HEADERS = {
+    'x-accel-redirect': 'X-Accel-Redirect',  # nginx
+    'x-sendfile': 'X-Sendfile',              # Apache mod_xsendfile, lighttpd
+}
+
+
+# ====================== RANGES ======================
+class RangeFile:
+    # Reads at most `length` bytes from `start`; deliberately has no
+    # fileno()/tell() so FileResponse streams it instead of sending the
+    # rest of the file with wsgi.file_wrapper.
+    def __init__(self, file, start, length):
+        self.file = file
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    # Single byte range as (start, end) inclusive. None means "ignore the
+    # header and send the whole file"; ValueError means unsatisfiable.
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if not match or match.groups() == ('', ''):
+        return None
+
+    if size == 0:
+        raise ValueError
+
+    first, last = match.groups()
+    if first == '':
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size:
+        raise ValueError
+    if start > end:
+        return None
+    return start, min(end, size - 1)
+
+
+def _if_range_matches(request, etag, last_modified):
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        # Weak validators never match for ranges
+        return etag in parse_etags(if_range) and not etag.startswith('W/')
+    date = parse_http_date_safe(if_range)
+    return date is not None and int(last_modified) <= date
+
+
+# ====================== RESPONSE ======================
+def file_etag(name, stat):
+    # Content-addressed names already embed the digest of the bytes
+    stem = os.path.splitext(os.path.basename(name))[0]
+    if re.fullmatch(r'[0-9a-f]{64}', stem):
+        return quote_etag(stem)
+    return quote_etag(f'{stat.st_size:x}-{stat.st_mtime_ns:x}')
+
+
+def file_download_response(request, field_file, as_attachment=False, filename=None):
+    try:
+        path = field_file.path
+        stat = os.stat(path)
+    except (FileNotFoundError, NotImplementedError):
+        raise Http404("Invoice file not found.")
+
+    size = stat.st_size
+    last_modified = stat.st_mtime
+    etag = file_etag(field_file.name, stat)
+    filename = filename or os.path.basename(field_file.name)
+    content_type = mimetypes.guess_type(field_file.name)[0] or 'application/octet-stream'
+
+    conditional = get_conditional_response(request, etag=etag, last_modified=int(last_modified))
+    if conditional is not None:
+        conditional['ETag'] = etag
+        return conditional
+
+    sendfile = getattr(settings, 'INVOICE_SENDFILE_BACKEND', None)
+    if sendfile:
+        # The front server reads the file and handles Range itself
+        response = HttpResponse(content_type=content_type)
+        if sendfile == 'x-accel-redirect':
+            location = getattr(settings, 'INVOICE_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+            response[SENDFILE_HEADERS[sendfile]] = location.rstrip('/') + '/' + field_file.name
+        else:
+            response[SENDFILE_HEADERS[sendfile]] = path
+    else:
+        byte_range = None
+        range_header = request.headers.get('Range')
+        if range_header and _if_range_matches(request, etag, last_modified):
+            try:
+                byte_range = parse_range(range_header, size)
+            except ValueError:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{size}'
+                return response
+
+        if byte_range is None:
+            # Plain FileResponse: servers with wsgi.file_wrapper use sendfile()
+            response = FileResponse(open(path, 'rb'), content_type=content_type)
+        else:
+            start, end = byte_range
+            response = FileResponse(RangeFile(open(path, 'rb'), start, end - start + 1), content_type=content_type)
+            response.status_code = 206
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            response['Content-Length'] = str(end - start + 1)
+
+    response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = 'private, max-age=0, must-revalidate'
+    return response
@@ -0,0 +1,142 @@
+import csv
+import json
+import tempfile
+from datetime import datetime, timezone as dt_timezone
+from itertools import islice
+
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .models import ExpenseItem
+
+try:
+    from openpyxl import Workbook
+except ImportError:  # XLSX export is optional
+    Workbook = None
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FORMATS = ('csv', 'xlsx')
+
+EXPENSE_EXPORT_FIELDS = [
+    'id', 'date', 'description', 'category', 'supplier', 'payment_source',
+    'total_expense', 'remarks', 'invoice_file', 'created_at', 'items',
+]
+
+INCOME_EXPORT_FIELDS = [
+    'id', 'reference_number', 'transaction_type', 'date', 'due_date',
+    'description', 'payer_name', 'category', 'amount', 'payment_source',
+    'amount_cash', 'amount_bank', 'amount_paid', 'balance_due', 'status',
+    'remarks', 'created_at', 'updated_at',
+]
+
+
+# ====================== ROWS ======================
+# Rows are read with values_list() a chunk at a time, so a large export
+# builds no model instances
+EXPENSE_EXPORT_COLUMNS = [
+    'id', 'date', 'description', 'category', 'supplier', 'payment_source',
+    'total_expense', 'remarks', 'invoice', 'created_at',
+]
+EXPENSE_ITEM_EXPORT_FIELDS = ['item_name', 'quantity', 'unit', 'unit_price', 'vat_rate', 'total']
+
+
+def _chunks(queryset):
+    rows = queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    while chunk := list(islice(rows, EXPORT_CHUNK_SIZE)):
+        yield chunk
+
+
+def expense_export_rows(queryset):
+    # Items are a JSON column so the file can be fed back to the bulk import
+    queryset = queryset.prefetch_related(None).values_list(*EXPENSE_EXPORT_COLUMNS)
+    for chunk in _chunks(queryset):
+        items = {}
+        item_rows = (
+            ExpenseItem.objects.filter(expense_id__in=[row[0] for row in chunk])
+            .order_by('pk').values_list('expense_id', *EXPENSE_ITEM_EXPORT_FIELDS)
+        )
+        for expense_id, item_name, quantity, unit, unit_price, vat_rate, total in item_rows:
+            items.setdefault(expense_id, []).append({
+                'item_name': item_name,
+                'quantity': str(quantity),
+                'unit': unit,
+                'unit_price': str(unit_price),
+                'vat_rate': str(vat_rate),
+                'total': str(total),
+            })
+
+        for expense_id, *values, invoice, created_at in chunk:
+            yield [expense_id, *values, invoice or None, created_at, json.dumps(items.get(expense_id, []))]
+
+
+def income_export_rows(queryset):
+    return queryset.values_list(*INCOME_EXPORT_FIELDS).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+# ====================== RESPONSES ======================
+class Echo:
+    def write(self, value):
+        return value
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _xlsx_value(value):
+    # Excel has no timezone support
+    if isinstance(value, datetime) and timezone.is_aware(value):
+        return timezone.make_naive(value, dt_timezone.utc)
+    return value
+
+
+def _csv_response(rows, header, filename):
+    writer = csv.writer(Echo())
+
+    def stream():
+        yield writer.writerow(header)
+        for row in rows:
+            yield writer.writerow([_csv_value(value) for value in row])
+
+    response = StreamingHttpResponse(stream(), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+    return response
+
+
+def _xlsx_response(rows, header, filename):
+    # Write-only workbooks keep rows out of memory; the archive is spooled
+    # to a temporary file and streamed from there.
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(header)
+    for row in rows:
+        sheet.append([_xlsx_value(value) for value in row])
+
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+
+    return FileResponse(
+        output,
+        as_attachment=True,
+        filename=f'{filename}.xlsx',
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    )
+
+
+def export_response(rows, header, file_format, filename):
+    if file_format not in EXPORT_FORMATS:
+        raise ValidationError({"file_format": [f"Must be one of: {', '.join(EXPORT_FORMATS)}."]})
+    if file_format == 'xlsx' and Workbook is None:
+        raise ValidationError({"file_format": ["XLSX export requires openpyxl to be installed."]})
+
+    filename = f"{filename}-{timezone.localdate():%Y%m%d}"
+
+    if file_format == 'xlsx':
+        return _xlsx_response(rows, header, filename)
+    return _csv_response(rows, header, filename)
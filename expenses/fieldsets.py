@@ -0,0 +1,114 @@
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.exceptions import ValidationError
+
+
+def _split(value):
+    return [name.strip() for name in (value or '').split(',') if name.strip()]
+
+
+def concrete_columns(model, names):
+    # The names that are plain columns of model, without duplicates
+    opts = model._meta
+    columns = []
+    for name in names:
+        try:
+            field = opts.get_field(name)
+        except FieldDoesNotExist:
+            continue
+        if field.concrete and not field.many_to_many and field.name not in columns:
+            columns.append(field.name)
+    return columns
+
+
+def ordering_columns(view, queryset):
+    # Fields a list view sorts on: the queryset or model ordering, keyset
+    # pagination and ?ordering=
+    names = [name.lstrip('-') for name in queryset.query.order_by or queryset.model._meta.ordering if isinstance(name, str)]
+    cursor_pagination_class = getattr(view, 'cursor_pagination_class', None)
+    if cursor_pagination_class is not None:
+        names += [name.lstrip('-') for name in cursor_pagination_class.ordering]
+    names += [name.lstrip('-') for name in _split(view.request.query_params.get('ordering'))]
+    return concrete_columns(queryset.model, names)
+
+
+class DynamicFieldsMixin:
+    # Serializer kwargs: fields=[...] keeps only those fields, expand=[...]
+    # keeps the named nested ones as well
+    def __init__(self, *args, fields=None, expand=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            keep = set(fields) | set(expand)
+            for name in list(self.fields):
+                if name not in keep:
+                    self.fields.pop(name)
+
+
+class SparseFieldsetMixin:
+    # ?fields=id,date,total_expense narrows list rows to those fields and
+    # loads only their columns; ?expand=items adds nested rows, prefetched
+    # only then. Lists without either parameter are unchanged.
+    list_serializer_class = None
+    expandable_fields = {}  # ?expand= name -> prefetch lookup
+
+    def sparse_fieldset(self):
+        # (fields, expand) for a sparse list request, otherwise None
+        if getattr(self, 'action', None) != 'list' or self.list_serializer_class is None:
+            return None
+        if not hasattr(self, '_sparse_fieldset'):
+            self._sparse_fieldset = self._parse_sparse_fieldset()
+        return self._sparse_fieldset
+
+    def _parse_sparse_fieldset(self):
+        fields = _split(self.request.query_params.get('fields'))
+        expand = _split(self.request.query_params.get('expand'))
+        if not fields and not expand:
+            return None
+
+        available = list(self.list_serializer_class().fields)
+        errors = {}
+        unknown = [name for name in fields if name not in available]
+        if unknown:
+            errors['fields'] = [f"Unknown field(s): {', '.join(unknown)}. Choose from: {', '.join(available)}."]
+        unknown = [name for name in expand if name not in self.expandable_fields]
+        if unknown:
+            choices = ', '.join(self.expandable_fields) or 'none'
+            errors['expand'] = [f"Unknown expansion(s): {', '.join(unknown)}. Choose from: {choices}."]
+        if errors:
+            raise ValidationError(errors)
+
+        # Nested fields named in ?fields= count as expansions
+        expand += [name for name in fields if name in self.expandable_fields and name not in expand]
+        scalar = [name for name in available if name not in self.expandable_fields]
+        fields = [name for name in fields if name not in self.expandable_fields] or scalar
+        return fields, expand
+
+    def _sparse_columns(self, fields, queryset):
+        serializer = self.list_serializer_class()
+        names = [serializer.fields[name].source for name in fields]
+        # Ordering columns too, or paginating would load them row by row
+        names += ordering_columns(self, queryset)
+        return sorted(concrete_columns(queryset.model, [queryset.model._meta.pk.name, *names]))
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        sparse = self.sparse_fieldset()
+        if sparse is None:
+            return queryset
+
+        fields, expand = sparse
+        queryset = queryset.prefetch_related(None).only(*self._sparse_columns(fields, queryset))
+        for name in expand:
+            queryset = queryset.prefetch_related(self.expandable_fields[name])
+        return queryset
+
+    def get_serializer_class(self):
+        if self.sparse_fieldset() is not None:
+            return self.list_serializer_class
+        return super().get_serializer_class()
+
+    def get_serializer(self, *args, **kwargs):
+        sparse = self.sparse_fieldset()
+        if sparse is not None:
+            kwargs.setdefault('fields', sparse[0])
+            kwargs.setdefault('expand', sparse[1])
+        return super().get_serializer(*args, **kwargs)
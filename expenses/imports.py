@@ -0,0 +1,192 @@
+import csv
+import json
+from collections import defaultdict
+from decimal import Decimal
+from itertools import islice
+
+from django.db import DatabaseError, transaction
+from rest_framework.exceptions import ValidationError
+
+from .models import Account, Expense, ExpenseItem
+from .serializers import ExpenseSerializer
+from .services import InsufficientBalance, post_balance_changes
+from finances.events import publish_change
+from finances.periods import closed_period_error, closed_until, ensure_open
+from finances.services import apply_rollup_deltas, collect_expense_deltas
+
+DEFAULT_BATCH_SIZE = 500
+MAX_BATCH_SIZE = 5000
+
+NDJSON_EXTENSIONS = ('.ndjson', '.jsonl')
+NDJSON_CONTENT_TYPES = ('application/x-ndjson', 'application/jsonl', 'application/json-lines')
+
+
+# ====================== PARSING ======================
+def _decoded_lines(upload):
+    for line in upload:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8-sig')
+        yield line
+
+
+def _is_ndjson(upload):
+    name = (getattr(upload, 'name', '') or '').lower()
+    content_type = getattr(upload, 'content_type', '') or ''
+    return name.endswith(NDJSON_EXTENSIONS) or content_type in NDJSON_CONTENT_TYPES
+
+
+def iter_upload_rows(upload):
+    # Yields (line number, row dict or None, error or None) without
+    # loading the whole file; uploads are read line by line.
+    lines = _decoded_lines(upload)
+
+    if _is_ndjson(upload):
+        for line_no, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                yield line_no, None, {"detail": ["Invalid JSON."]}
+                continue
+            if not isinstance(row, dict):
+                yield line_no, None, {"detail": ["Each line must be a JSON object."]}
+                continue
+            yield line_no, row, None
+        return
+
+    reader = csv.DictReader(lines)
+    for row in reader:
+        # Empty CSV cells mean "not provided", not an empty string value
+        row = {key: value for key, value in row.items() if key and value not in ('', None)}
+        if row:
+            yield reader.line_num, row, None
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def get_batch_size(value):
+    try:
+        batch_size = int(value)
+    except (TypeError, ValueError):
+        return DEFAULT_BATCH_SIZE
+    return max(1, min(batch_size, MAX_BATCH_SIZE))
+
+
+def error_detail(exc):
+    detail = getattr(exc, 'detail', None)
+    if detail is None:
+        return {"detail": [str(exc)]}
+    if isinstance(detail, dict):
+        return detail
+    return {"detail": detail if isinstance(detail, list) else [detail]}
+
+
+# ====================== EXPENSES ======================
+def expense_split(expense, cash_amount, bank_amount):
+    if expense.payment_source == 'combined':
+        if cash_amount + bank_amount != expense.total_expense:
+            return None
+        return cash_amount, bank_amount
+    if expense.payment_source == 'cash':
+        return expense.total_expense, Decimal('0')
+    return Decimal('0'), expense.total_expense
+
+
+def _import_expense_batch(batch, report):
+    balances = dict(
+        Account.objects.filter(account_type__in=('cash', 'bank'))
+        .values_list('account_type', 'balance')
+    )
+    cash_left = balances.get('cash', Decimal('0'))
+    bank_left = balances.get('bank', Decimal('0'))
+    closed = closed_until()
+
+    expenses, items = [], []
+    cash_by_date, bank_by_date = defaultdict(Decimal), defaultdict(Decimal)
+
+    for line_no, row, error in batch:
+        if error:
+            report['errors'].append({"row": line_no, "errors": error})
+            continue
+
+        serializer = ExpenseSerializer(data=row)
+        if not serializer.is_valid():
+            report['errors'].append({"row": line_no, "errors": serializer.errors})
+            continue
+
+        try:
+            expense, expense_items, cash_amount, bank_amount = serializer.build_expense(
+                serializer.validated_data
+            )
+        except ValidationError as exc:
+            report['errors'].append({"row": line_no, "errors": error_detail(exc)})
+            continue
+
+        if closed and expense.date <= closed:
+            report['errors'].append({"row": line_no, "errors": closed_period_error(expense.date)})
+            continue
+
+        split = expense_split(expense, cash_amount, bank_amount)
+        if split is None:
+            report['errors'].append({"row": line_no, "errors": {"detail": ["Cash + Bank must equal total expense."]}})
+            continue
+        cash, bank = split
+        if cash > cash_left:
+            report['errors'].append({"row": line_no, "errors": {"detail": ["Insufficient cash balance."]}})
+            continue
+        if bank > bank_left:
+            report['errors'].append({"row": line_no, "errors": {"detail": ["Insufficient bank balance."]}})
+            continue
+
+        cash_left -= cash
+        bank_left -= bank
+        cash_by_date[expense.date] += cash
+        bank_by_date[expense.date] += bank
+        expenses.append((line_no, expense))
+        items.extend(expense_items)
+
+    if not expenses:
+        return
+
+    try:
+        with transaction.atomic():
+            # The batch's months stay open until it commits
+            ensure_open(*(expense.date for _, expense in expenses))
+            Expense.objects.bulk_create([expense for _, expense in expenses])
+            ExpenseItem.objects.bulk_create(items)
+
+            # Net balance effect of the whole batch in one guarded UPDATE,
+            # with one ledger posting per account and date
+            postings = [('cash', -amount, date) for date, amount in cash_by_date.items()]
+            postings += [('bank', -amount, date) for date, amount in bank_by_date.items()]
+            post_balance_changes(postings, 'expense', check_funds=True)
+
+            apply_rollup_deltas(collect_expense_deltas(expense for _, expense in expenses))
+            publish_change('expense', 'created', [expense.pk for _, expense in expenses])
+    except ValidationError as exc:
+        # Closed since the rows were checked
+        for line_no, _ in expenses:
+            report['errors'].append({"row": line_no, "errors": error_detail(exc)})
+        return
+    except (DatabaseError, InsufficientBalance) as exc:
+        for line_no, _ in expenses:
+            report['errors'].append({"row": line_no, "errors": {"detail": [str(exc)]}})
+        return
+
+    report['created'] += len(expenses)
+
+
+def import_expenses(rows, batch_size=DEFAULT_BATCH_SIZE):
+    report = {"created": 0, "errors": []}
+    for batch in chunked(rows, batch_size):
+        _import_expense_batch(batch, report)
+    report['errors'].sort(key=lambda error: error['row'])
+    return report
@@ -0,0 +1,127 @@
+import calendar
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, DecimalField, F, Q, Sum, Value, When
+
+from .models import Account, BalanceCheckpoint, LedgerEntry
+
+
+# Checkpoints hold month-end balances, so answering "balance as of X"
+# reads one checkpoint and at most a month of entries per account.
+def month_end(date):
+    return date.replace(day=calendar.monthrange(date.year, date.month)[1])
+
+
+def _sum_entries(account, start=None, end=None):
+    entries = LedgerEntry.objects.filter(account=account)
+    if start is not None:
+        entries = entries.filter(date__gt=start)
+    if end is not None:
+        entries = entries.filter(date__lte=end)
+    return entries.aggregate(total=Sum('amount'))['total'] or Decimal('0')
+
+
+def balance_at(account, date):
+    checkpoint = (
+        BalanceCheckpoint.objects.filter(account=account, date__lte=date)
+        .order_by('-date')
+        .first()
+    )
+    if checkpoint is None:
+        return _sum_entries(account, end=date)
+    return checkpoint.balance + _sum_entries(account, start=checkpoint.date, end=date)
+
+
+def record_ledger_entry(account, amount, date, entry_type, balance_after):
+    return record_ledger_entries([(account, amount, date, entry_type, balance_after)])[0]
+
+
+def _backdate_opening(account, date):
+    # The opening balance was there before anything posted to the account,
+    # so it moves to the earliest posting and the checkpoints in between
+    # gain it
+    opening = LedgerEntry.objects.filter(account=account, entry_type='opening', date__gt=date)
+    amount = opening.aggregate(total=Sum('amount'))['total'] or Decimal('0')
+    opening.update(date=date)
+    BalanceCheckpoint.objects.filter(account=account, date__gte=date, date__lt=account.opened_on).update(
+        balance=F('balance') + amount
+    )
+    Account.objects.filter(pk=account.pk).update(opened_on=date)
+    account.opened_on = date
+
+
+def record_ledger_entries(postings):
+    # postings: (account, amount, date, entry_type, balance_after) tuples,
+    # with each account's opened_on loaded. One INSERT for the entries, one
+    # UPDATE shifting later checkpoints and one SELECT for the month ends;
+    # a missing month end costs two more statements the first time the
+    # month is posted to, and a posting before the opening entry four.
+    before_opening = {}
+    for account, _, date, entry_type, _ in postings:
+        if entry_type != 'opening' and account.opened_on is not None and date < account.opened_on:
+            before_opening[account] = min(date, before_opening.get(account, date))
+    for account, date in before_opening.items():
+        _backdate_opening(account, date)
+
+    entries = LedgerEntry.objects.bulk_create([
+        LedgerEntry(account=account, date=date, entry_type=entry_type, amount=amount, balance_after=balance_after)
+        for account, amount, date, entry_type, balance_after in postings
+    ])
+
+    accounts, by_date = {}, defaultdict(lambda: defaultdict(Decimal))
+    for account, amount, date, _, _ in postings:
+        accounts[account.pk] = account
+        by_date[account.pk][date] += amount
+
+    # A checkpoint moves by every amount dated on or before it: the
+    # cumulative totals are matched latest date first
+    condition, whens, shifts = Q(), [], {}
+    for account_id, amounts in by_date.items():
+        total, steps = Decimal('0'), []
+        for date in sorted(amounts):
+            total += amounts[date]
+            steps.append((date, total))
+        shifts[account_id] = steps
+        condition |= Q(account_id=account_id, date__gte=steps[0][0])
+        whens += [When(account_id=account_id, date__gte=date, then=Value(total)) for date, total in reversed(steps)]
+
+    # Backdated entries shift every later checkpoint
+    BalanceCheckpoint.objects.filter(condition).update(
+        balance=F('balance') + Case(
+            *whens,
+            default=Value(Decimal('0')),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        )
+    )
+
+    period_ends = {(account_id, month_end(date)) for account_id, amounts in by_date.items() for date in amounts}
+    existing = set(
+        BalanceCheckpoint.objects.filter(
+            account_id__in=by_date, date__in={date for _, date in period_ends}
+        ).values_list('account_id', 'date')
+    )
+    for account_id, period_end in sorted(period_ends - existing):
+        account = accounts[account_id]
+        previous = (
+            BalanceCheckpoint.objects.filter(account=account, date__lt=period_end)
+            .order_by('-date')
+            .first()
+        )
+        if previous is None:
+            balance = _sum_entries(account, end=period_end)
+        else:
+            balance = previous.balance + _sum_entries(account, start=previous.date, end=period_end)
+
+        try:
+            with transaction.atomic():
+                BalanceCheckpoint.objects.create(account=account, date=period_end, balance=balance)
+        except IntegrityError:
+            # Created by a concurrent writer that couldn't see these entries yet
+            shift = next(total for date, total in reversed(shifts[account_id]) if date <= period_end)
+            BalanceCheckpoint.objects.filter(account=account, date=period_end).update(
+                balance=F('balance') + shift
+            )
+
+    return entries
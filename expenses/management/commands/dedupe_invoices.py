@@ -0,0 +1,52 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from expenses.models import Expense
+from expenses.storage import HASH_ALGORITHM
+
+
+class Command(BaseCommand):
+    help = "Move invoices uploaded before content-addressed storage into it, sharing identical files."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--delete-originals',
+            action='store_true',
+            help="Remove the old files once every expense points at its blob.",
+        )
+
+    def handle(self, *args, **options):
+        storage = Expense._meta.get_field('invoice').storage
+        blob_prefix = f'{storage.prefix}/{HASH_ALGORITHM}/'
+
+        legacy = (
+            Expense.objects.exclude(invoice='').exclude(invoice__isnull=True)
+            .exclude(invoice__startswith=blob_prefix)
+            .order_by()
+            .values_list('invoice', flat=True)
+            .distinct()
+        )
+
+        moved, missing, blobs = 0, [], set()
+        for old_name in list(legacy):
+            if not os.path.exists(storage.path(old_name)):
+                missing.append(old_name)
+                continue
+
+            with storage.open(old_name, 'rb') as old_file:
+                new_name = storage.save(old_name, old_file)
+            blobs.add(new_name)
+            expenses = Expense.objects.filter(invoice=old_name)
+            expenses.filter(invoice_name__isnull=True).update(invoice_name=os.path.basename(old_name))
+            moved += expenses.update(invoice=new_name)
+
+            if options['delete_originals']:
+                os.remove(storage.path(old_name))
+
+        for name in missing:
+            self.stderr.write(f"Missing file: {name}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Moved {moved} invoices into {len(blobs)} blobs ({len(missing)} missing)."
+        ))
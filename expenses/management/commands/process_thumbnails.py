@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from expenses import thumbnails
+
+
+class Command(BaseCommand):
+    help = "Generate thumbnails and previews for queued invoice images."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help="Keep polling for new jobs.")
+        parser.add_argument('--interval', type=float, default=5.0, help="Seconds between polls with --loop.")
+        parser.add_argument('--limit', type=int, default=None, help="Jobs per pass.")
+
+    def handle(self, *args, **options):
+        if thumbnails.Image is None:
+            raise CommandError("Invoice thumbnails require Pillow to be installed.")
+
+        requeued = thumbnails.requeue_stale_jobs()
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale jobs.")
+
+        while True:
+            processed = thumbnails.process_pending_jobs(limit=options['limit'])
+            if processed:
+                self.stdout.write(self.style.SUCCESS(f"Processed {processed} jobs."))
+            if not options['loop']:
+                break
+            if not processed:
+                time.sleep(options['interval'])
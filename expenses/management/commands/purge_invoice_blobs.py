@@ -0,0 +1,55 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from expenses.models import Expense, ThumbnailJob
+
+FILE_FIELDS = ('invoice', 'invoice_thumbnail', 'invoice_preview')
+
+
+class Command(BaseCommand):
+    help = "Delete invoice blobs and derived images that no expense references."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age',
+            type=float,
+            default=24.0,
+            help="Hours a blob must have existed, so uploads whose expense isn't saved yet are kept.",
+        )
+        parser.add_argument('--dry-run', action='store_true', help="List the blobs without deleting them.")
+
+    def handle(self, *args, **options):
+        cutoff = time.time() - options['min_age'] * 3600
+        storages = {}
+        for field_name in FILE_FIELDS:
+            storage = Expense._meta.get_field(field_name).storage
+            storages.setdefault(storage.prefix, storage)
+
+        deleted, kept = 0, 0
+        for storage in storages.values():
+            for name in storage.blob_names():
+                path = storage.path(name)
+                if os.path.getmtime(path) > cutoff or self.referenced(name):
+                    kept += 1
+                    continue
+
+                deleted += 1
+                if options['dry_run']:
+                    self.stdout.write(name)
+                else:
+                    os.remove(path)
+
+        verb = "Would delete" if options['dry_run'] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {deleted} unreferenced blobs ({kept} kept)."))
+
+    def referenced(self, name):
+        in_use = Q()
+        for field_name in FILE_FIELDS:
+            in_use |= Q(**{field_name: name})
+        return (
+            Expense.objects.filter(in_use).exists()
+            or ThumbnailJob.objects.filter(source=name).exists()
+        )
@@ -0,0 +1,51 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from expenses.ledger import _sum_entries, record_ledger_entry
+from expenses.models import Account
+from finances.periods import is_closed
+
+
+class Command(BaseCommand):
+    help = "Compare each account's balance with its ledger and report the difference."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help="Post an adjustment entry so the ledger matches the balance.",
+        )
+        parser.add_argument(
+            '--date',
+            type=date.fromisoformat,
+            help="Date the adjustments with this YYYY-MM-DD day instead of today.",
+        )
+
+    def handle(self, *args, **options):
+        if options['date'] and is_closed(options['date']):
+            raise CommandError(f"The {options['date']:%Y-%m} period is closed.")
+
+        mismatched = 0
+        for account_type in Account.objects.order_by('account_type').values_list('account_type', flat=True):
+            with transaction.atomic():
+                account = Account.objects.select_for_update().get(account_type=account_type)
+                difference = account.balance - _sum_entries(account)
+                if not difference:
+                    continue
+
+                mismatched += 1
+                self.stdout.write(f"{account.account_type}: balance {account.balance}, ledger off by {difference}")
+                if options['fix']:
+                    record_ledger_entry(
+                        account, difference, options['date'] or timezone.localdate(), 'adjustment', account.balance
+                    )
+
+        if not mismatched:
+            self.stdout.write(self.style.SUCCESS("Every account matches its ledger."))
+        elif options['fix']:
+            self.stdout.write(self.style.SUCCESS(f"Posted adjustments for {mismatched} accounts."))
+        else:
+            self.stdout.write(self.style.WARNING(f"{mismatched} accounts don't match their ledger; rerun with --fix."))
@@ -0,0 +1,117 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:50
+
+import calendar
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def _month_end(day):
+    return day.replace(day=calendar.monthrange(day.year, day.month)[1])
+
+
+def _historical_postings(Expense, Income):
+    # (account_type, date, entry_type) -> signed amount of the expenses
+    # and incomes already reflected in the balances
+    postings = defaultdict(Decimal)
+
+    for day, payment_source, total in Expense.objects.values_list('date', 'payment_source', 'total_expense'):
+        # The cash/bank split of combined expenses isn't stored; they are
+        # posted to cash
+        account_type = 'bank' if payment_source == 'bank' else 'cash'
+        postings[(account_type, day, 'expense')] -= total or 0
+
+    incomes = Income.objects.values_list('date', 'payment_source', 'amount_paid', 'amount_cash', 'amount_bank')
+    for day, payment_source, paid, cash, bank in incomes:
+        if not paid or paid <= 0:
+            continue
+        if payment_source == 'combined':
+            split = {'cash': cash or 0, 'bank': bank or 0}
+        else:
+            split = {payment_source: paid}
+        for account_type, amount in split.items():
+            postings[(account_type, day, 'income')] += amount
+
+    return postings
+
+
+def open_ledgers(apps, schema_editor):
+    # Each account opens the day before the first expense or income with
+    # the balance it had then (today's balance less everything since), and
+    # the existing transactions are posted on their own dates, so
+    # balance_at() is right for past dates as well
+    Account = apps.get_model('expenses', 'Account')
+    Expense = apps.get_model('expenses', 'Expense')
+    Income = apps.get_model('incomes', 'Income')
+    LedgerEntry = apps.get_model('expenses', 'LedgerEntry')
+    BalanceCheckpoint = apps.get_model('expenses', 'BalanceCheckpoint')
+
+    postings = _historical_postings(Expense, Income)
+    first_day = min((day for _, day, _ in postings), default=timezone.localdate())
+    opening_day = first_day - timedelta(days=1)
+
+    for account in Account.objects.all():
+        # Incomes first on each day, as post_balance_changes() orders them
+        entries = sorted(
+            (day, entry_type != 'income', entry_type, amount)
+            for (account_type, day, entry_type), amount in postings.items()
+            if account_type == account.account_type and amount
+        )
+        balance = account.balance - sum((amount for *_, amount in entries), Decimal('0'))
+
+        rows = [LedgerEntry(account=account, date=opening_day, entry_type='opening', amount=balance, balance_after=balance)]
+        checkpoints = {_month_end(opening_day): balance}
+        for day, _, entry_type, amount in entries:
+            balance += amount
+            rows.append(LedgerEntry(account=account, date=day, entry_type=entry_type, amount=amount, balance_after=balance))
+            checkpoints[_month_end(day)] = balance
+
+        LedgerEntry.objects.bulk_create(rows)
+        BalanceCheckpoint.objects.bulk_create(
+            [BalanceCheckpoint(account=account, date=day, balance=value) for day, value in checkpoints.items()]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0011_expense_full_text_search'),
+        ('incomes', '0005_income_amount_paid_income_balance_due_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('balance', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checkpoints', to='expenses.account')),
+            ],
+            options={
+                'ordering': ['account', 'date'],
+                'constraints': [models.UniqueConstraint(fields=('account', 'date'), name='expenses_balancecheckpoint_unique_date')],
+            },
+        ),
+        migrations.CreateModel(
+            name='LedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('entry_type', models.CharField(choices=[('opening', 'Opening Balance'), ('expense', 'Expense'), ('expense_rollback', 'Expense Rollback'), ('income', 'Income'), ('income_rollback', 'Income Rollback')], max_length=20)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('balance_after', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='ledger_entries', to='expenses.account')),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['account', 'date'], name='expenses_le_account_c010e4_idx')],
+            },
+        ),
+        migrations.RunPython(open_ledgers, migrations.RunPython.noop),
+    ]
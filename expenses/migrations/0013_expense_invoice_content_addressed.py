@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:54
+
+import expenses.storage
+from django.db import migrations, models
+
+# SQLite remakes the table for the AlterField in both directions, which
+# drops the full-text triggers. The statements are copied from
+# expenses/search.py as of 0011 so this migration doesn't depend on it.
+TABLE = 'expenses_expense'
+FTS = 'expenses_expense_fts'
+COLUMNS = '"description", "supplier", "category", "remarks"'
+NEW_VALUES = 'new."description", new."supplier", new."category", new."remarks"'
+OLD_VALUES = 'old."description", old."supplier", old."category", old."remarks"'
+
+FULL_TEXT_SQL = [
+    f'DROP TRIGGER IF EXISTS "{FTS}_ai"',
+    f'DROP TRIGGER IF EXISTS "{FTS}_ad"',
+    f'DROP TRIGGER IF EXISTS "{FTS}_au"',
+    f'DROP TABLE IF EXISTS "{FTS}"',
+
+    f'CREATE VIRTUAL TABLE "{FTS}" USING fts5('
+    f"{COLUMNS}, content='{TABLE}', content_rowid='id', "
+    f"tokenize='unicode61 remove_diacritics 2')",
+
+    f'CREATE TRIGGER "{FTS}_ai" AFTER INSERT ON "{TABLE}" BEGIN '
+    f'INSERT INTO "{FTS}"(rowid, {COLUMNS}) VALUES (new.id, {NEW_VALUES}); END',
+
+    f'CREATE TRIGGER "{FTS}_ad" AFTER DELETE ON "{TABLE}" BEGIN '
+    f'INSERT INTO "{FTS}"("{FTS}", rowid, {COLUMNS}) '
+    f"VALUES ('delete', old.id, {OLD_VALUES}); END",
+
+    f'CREATE TRIGGER "{FTS}_au" AFTER UPDATE OF {COLUMNS} ON "{TABLE}" BEGIN '
+    f'INSERT INTO "{FTS}"("{FTS}", rowid, {COLUMNS}) '
+    f"VALUES ('delete', old.id, {OLD_VALUES}); "
+    f'INSERT INTO "{FTS}"(rowid, {COLUMNS}) VALUES (new.id, {NEW_VALUES}); END',
+
+    f'INSERT INTO "{FTS}"("{FTS}") VALUES (\'rebuild\')',
+]
+
+
+def reinstall_full_text_index(apps, schema_editor):
+    # PostgreSQL's GIN index survives the AlterField
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in FULL_TEXT_SQL:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0012_ledgerentry_balancecheckpoint'),
+    ]
+
+    operations = [
+        # Reversed last, after the table has been remade back
+        migrations.RunPython(migrations.RunPython.noop, reinstall_full_text_index),
+        migrations.AlterField(
+            model_name='expense',
+            name='invoice',
+            field=models.FileField(blank=True, null=True, storage=expenses.storage.ContentAddressedStorage(prefix='invoices'), upload_to='invoices/'),
+        ),
+        migrations.RunPython(reinstall_full_text_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:56
+
+import django.db.models.deletion
+import expenses.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0013_expense_invoice_content_addressed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='expense',
+            name='invoice_preview',
+            field=models.FileField(blank=True, editable=False, null=True, storage=expenses.storage.ContentAddressedStorage(prefix='invoices/derived'), upload_to='invoices/derived/'),
+        ),
+        migrations.AddField(
+            model_name='expense',
+            name='invoice_thumbnail',
+            field=models.FileField(blank=True, editable=False, null=True, storage=expenses.storage.ContentAddressedStorage(prefix='invoices/derived'), upload_to='invoices/derived/'),
+        ),
+        migrations.CreateModel(
+            name='ThumbnailJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=100)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('done', 'Done'), ('skipped', 'Skipped'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('expense', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='thumbnail_jobs', to='expenses.expense')),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['status', 'id'], name='expenses_th_status_0a3d73_idx')],
+            },
+        ),
+    ]
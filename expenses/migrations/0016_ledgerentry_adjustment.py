@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0015_composite_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ledgerentry',
+            name='entry_type',
+            field=models.CharField(choices=[('opening', 'Opening Balance'), ('expense', 'Expense'), ('expense_rollback', 'Expense Rollback'), ('income', 'Income'), ('income_rollback', 'Income Rollback'), ('adjustment', 'Adjustment')], max_length=20),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:01
+
+import os
+
+from django.db import migrations, models
+
+
+def name_legacy_invoices(apps, schema_editor):
+    # Invoices not yet moved by dedupe_invoices still have their upload
+    # name; blobs uploaded since 0013 have lost it
+    Expense = apps.get_model('expenses', 'Expense')
+    legacy = (
+        Expense.objects.exclude(invoice='').exclude(invoice__isnull=True)
+        .exclude(invoice__startswith='invoices/sha256/')
+    )
+    for pk, invoice in legacy.values_list('pk', 'invoice').iterator():
+        Expense.objects.filter(pk=pk).update(invoice_name=os.path.basename(invoice))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0016_ledgerentry_adjustment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='expense',
+            name='invoice_name',
+            field=models.CharField(blank=True, editable=False, max_length=255, null=True),
+        ),
+        migrations.RunPython(name_legacy_invoices, migrations.RunPython.noop),
+    ]
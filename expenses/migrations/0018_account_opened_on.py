@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:35
+
+from django.db import migrations, models
+from django.db.models import F, Min, Sum
+
+
+def date_openings(apps, schema_editor):
+    # Accounts created through the admin had their opening entry dated on
+    # the day they were created, after postings dated earlier; it moves
+    # back to the earliest posting like record_ledger_entries() does now
+    Account = apps.get_model('expenses', 'Account')
+    LedgerEntry = apps.get_model('expenses', 'LedgerEntry')
+    BalanceCheckpoint = apps.get_model('expenses', 'BalanceCheckpoint')
+
+    for account in Account.objects.all():
+        entries = LedgerEntry.objects.filter(account=account)
+        opened_on = entries.filter(entry_type='opening').aggregate(date=Min('date'))['date']
+        if opened_on is None:
+            continue
+        first = entries.exclude(entry_type='opening').aggregate(date=Min('date'))['date']
+        if first is not None and first < opened_on:
+            opening = entries.filter(entry_type='opening', date__gt=first)
+            amount = opening.aggregate(total=Sum('amount'))['total']
+            opening.update(date=first)
+            BalanceCheckpoint.objects.filter(account=account, date__gte=first, date__lt=opened_on).update(
+                balance=F('balance') + amount
+            )
+            opened_on = first
+        Account.objects.filter(pk=account.pk).update(opened_on=opened_on)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0017_expense_invoice_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='account',
+            name='opened_on',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(date_openings, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from decimal import Decimal
+from .storage import derivative_storage, invoice_storage
 
 
 class Account(models.Model):
@@ -21,6 +22,10 @@ class Account(models.Model):
         default=0
     )
 
+    # Date of the opening ledger entry; it moves back with the first
+    # posting dated before it
+    opened_on = models.DateField(null=True, blank=True, editable=False)
+
     def __str__(self):
         return f"{self.account_type.upper()} - {self.balance}"
 
@@ -37,7 +42,12 @@ class Expense(models.Model):
     description = models.TextField()
     category = models.CharField(max_length=100, db_index=True)
     supplier = models.CharField(max_length=255, blank=True, null=True)
-    invoice = models.FileField(upload_to='invoices/%Y/%m/', blank=True, null=True)
+    invoice = models.FileField(upload_to='invoices/', storage=invoice_storage, blank=True, null=True)
+    # The uploaded file's own name; the blob is named after its digest
+    invoice_name = models.CharField(max_length=255, blank=True, null=True, editable=False)
+    # Downscaled copies of image invoices, filled in by the thumbnail worker
+    invoice_thumbnail = models.FileField(upload_to='invoices/derived/', storage=derivative_storage, blank=True, null=True, editable=False)
+    invoice_preview = models.FileField(upload_to='invoices/derived/', storage=derivative_storage, blank=True, null=True, editable=False)
     remarks = models.TextField(blank=True, null=True)
 
     payment_source = models.CharField(
@@ -58,6 +68,13 @@ class Expense(models.Model):
         return f"{self.category} - {self.total_expense}"
     class Meta:
         ordering = ['-date', '-created_at']
+        indexes = [
+            # Composite indexes end in the list ordering so a filtered page
+            # is read straight off the index instead of sorted
+            models.Index(fields=['-date', '-created_at'], name='expense_date_created_idx'),
+            models.Index(fields=['category', '-date', '-created_at'], name='expense_cat_date_idx'),
+            models.Index(fields=['payment_source', '-date', '-created_at'], name='expense_source_date_idx'),
+        ]
 
 
 class ExpenseItem(models.Model):
@@ -83,4 +100,111 @@ class ExpenseItem(models.Model):
         subtotal = self.quantity * self.unit_price
         vat = subtotal * (self.vat_rate / Decimal('100'))
         self.total = subtotal + vat
-        super().save(*args, **kwargs)
\ No newline at end of file
+        super().save(*args, **kwargs)
+
+
+class LedgerEntry(models.Model):
+    ENTRY_TYPES = (
+        ('opening', 'Opening Balance'),
+        ('expense', 'Expense'),
+        ('expense_rollback', 'Expense Rollback'),
+        ('income', 'Income'),
+        ('income_rollback', 'Income Rollback'),
+        # Balance edits made outside services.py (admin, shell, reconcile_ledger)
+        ('adjustment', 'Adjustment'),
+    )
+
+    account = models.ForeignKey(
+        Account,
+        related_name='ledger_entries',
+        on_delete=models.PROTECT
+    )
+
+    # Business date of the transaction, not the posting time
+    date = models.DateField()
+    entry_type = models.CharField(max_length=20, choices=ENTRY_TYPES)
+
+    amount = models.DecimalField(
+        max_digits=12,
+        decimal_places=2
+    )
+
+    # Account balance right after this entry, in posting order
+    balance_after = models.DecimalField(
+        max_digits=12,
+        decimal_places=2
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.account.account_type.upper()} | {self.date} | {self.amount}"
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['account', 'date']),
+        ]
+
+
+class BalanceCheckpoint(models.Model):
+    account = models.ForeignKey(
+        Account,
+        related_name='checkpoints',
+        on_delete=models.CASCADE
+    )
+
+    # Month end; balance is the sum of all entries dated on or before it
+    date = models.DateField()
+
+    balance = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0
+    )
+
+    def __str__(self):
+        return f"{self.account.account_type.upper()} | {self.date} | {self.balance}"
+
+    class Meta:
+        ordering = ['account', 'date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['account', 'date'],
+                name='expenses_balancecheckpoint_unique_date',
+            ),
+        ]
+
+
+class ThumbnailJob(models.Model):
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('done', 'Done'),
+        ('skipped', 'Skipped'),
+        ('failed', 'Failed'),
+    )
+
+    expense = models.ForeignKey(
+        Expense,
+        related_name='thumbnail_jobs',
+        on_delete=models.CASCADE
+    )
+
+    # Invoice file name the job was queued for; a newer upload gets its own job
+    source = models.CharField(max_length=100)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Expense {self.expense_id} | {self.status}"
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'id']),
+        ]
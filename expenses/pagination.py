@@ -0,0 +1,66 @@
+from django.core.paginator import InvalidPage
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+
+
+class ExpenseCursorPagination(CursorPagination):
+    ordering = ('-date', '-created_at')
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class IncomeCursorPagination(CursorPagination):
+    ordering = ('-date', 'id')
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class SelectablePaginationMixin:
+    # ?pagination=cursor swaps the default page-number paginator for a
+    # keyset one, so deep pages don't pay for COUNT(*) and OFFSET.
+    cursor_pagination_class = None
+
+    def use_cursor_pagination(self):
+        request = getattr(self, 'request', None)
+        return (
+            self.cursor_pagination_class is not None
+            and request is not None
+            and request.query_params.get('pagination') == 'cursor'
+        )
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator') and self.use_cursor_pagination():
+            self._paginator = self.cursor_pagination_class()
+        return super().paginator
+
+
+async def apaginate_page_number(paginator, queryset, request):
+    # PageNumberPagination.paginate_queryset() on the async ORM. Leaves the
+    # paginator in the same state, so get_paginated_response() works as is.
+    page_size = paginator.get_page_size(request)
+    if not page_size:
+        return None
+
+    django_paginator = paginator.django_paginator_class(queryset, page_size)
+    # Fills the cached property Paginator would otherwise query for
+    django_paginator.count = await queryset.acount()
+
+    page_number = paginator.get_page_number(request, django_paginator)
+    try:
+        number = django_paginator.validate_number(page_number)
+    except InvalidPage as exc:
+        raise NotFound(paginator.invalid_page_message.format(page_number=page_number, message=str(exc)))
+
+    bottom = (number - 1) * page_size
+    top = bottom + page_size
+    if top + django_paginator.orphans >= django_paginator.count:
+        top = django_paginator.count
+
+    rows = [row async for row in queryset[bottom:top].aiterator(chunk_size=page_size)]
+
+    paginator.page = django_paginator._get_page(rows, number, django_paginator)
+    if paginator.page.paginator.num_pages > 1 and paginator.template is not None:
+        paginator.display_page_controls = True
+    paginator.request = request
+    return rows
@@ -0,0 +1,187 @@
+from datetime import date
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import ManyToOneRel
+from rest_framework import ISO_8601, serializers
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from daycare_backend.renderers import fast_serialization_enabled
+
+from .fieldsets import ordering_columns
+
+NESTED = object()
+
+
+def _decimal_string(value):
+    # Database decimals already carry the field's decimal places
+    return f'{value:f}'
+
+
+def _formatter(field, model_field, context):
+    # f(value) giving field.to_representation() of a non-null column value,
+    # or None where the value is already its representation
+    if isinstance(field, serializers.DateTimeField):
+        return field.to_representation  # converts to the current timezone
+    if isinstance(field, serializers.DecimalField):
+        coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+        if (
+            coerce_to_string and not field.localize and not field.normalize_output
+            and field.decimal_places == model_field.decimal_places
+        ):
+            return _decimal_string
+    elif isinstance(field, serializers.DateField):
+        if getattr(field, 'format', api_settings.DATE_FORMAT) == ISO_8601:
+            return date.isoformat
+    elif isinstance(field, serializers.ChoiceField):
+        if all(isinstance(key, str) for key in field.choices):
+            return None
+    elif isinstance(field, serializers.FileField):
+        return _file_url(field, model_field.storage, context.get('request'))
+    elif isinstance(field, (serializers.CharField, serializers.IntegerField, serializers.BooleanField)):
+        return None
+    return field.to_representation
+
+
+def _file_url(field, storage, request):
+    # FileField.to_representation() from the stored name
+    use_url = getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL)
+
+    def file_url(name):
+        if not name:
+            return None
+        if not use_url:
+            return name
+        url = storage.url(name)
+        return request.build_absolute_uri(url) if request is not None else url
+    return file_url
+
+
+class ValuesSerializer:
+    # Builds serializer(many=True).data from queryset.values() rows. Each
+    # field's formatter is picked once, so a page costs no model or
+    # serializer instance per row; nested many=True serializers over a
+    # reverse foreign key take one more values() query.
+
+    def __init__(self, model, columns, nested):
+        self.model = model
+        self.columns = columns  # (name, values() key, formatter or NESTED)
+        self.nested = nested  # name -> (ValuesSerializer, foreign key column)
+
+    @classmethod
+    def for_serializer(cls, serializer):
+        # None when some field has no plain column to read it from
+        if (
+            not isinstance(serializer, serializers.ModelSerializer)
+            or type(serializer).to_representation is not serializers.Serializer.to_representation
+        ):
+            return None
+        model = serializer.Meta.model
+        opts = model._meta
+
+        columns, nested = [], {}
+        for field in serializer._readable_fields:
+            if '.' in field.source or field.source == '*':
+                return None
+            try:
+                model_field = opts.get_field(field.source)
+            except FieldDoesNotExist:
+                return None
+
+            if isinstance(field, serializers.ListSerializer):
+                if not isinstance(model_field, ManyToOneRel):
+                    return None
+                child = cls.for_serializer(field.child)
+                if child is None or child.nested:
+                    return None
+                nested[field.field_name] = (child, model_field.field.attname)
+                columns.append((field.field_name, None, NESTED))
+            elif model_field.concrete and not model_field.is_relation:
+                columns.append((field.field_name, model_field.attname, _formatter(field, model_field, serializer.context)))
+            else:
+                return None
+        return cls(model, columns, nested)
+
+    def keys(self):
+        keys = [key for _, key, formatter in self.columns if formatter is not NESTED]
+        if self.nested:
+            keys.append(self.model._meta.pk.attname)
+        return keys
+
+    def to_rows(self, records):
+        columns = self.columns
+        rows = []
+        for record in records:
+            row = {}
+            for name, key, formatter in columns:
+                if formatter is NESTED:
+                    row[name] = []
+                    continue
+                value = record[key]
+                row[name] = value if value is None or formatter is None else formatter(value)
+            rows.append(row)
+        return rows
+
+    def nested_querysets(self, records):
+        # (name, ValuesSerializer, foreign key column, values() queryset)
+        ids = [record[self.model._meta.pk.attname] for record in records]
+        for name, (child, foreign_key) in self.nested.items():
+            queryset = (
+                child.model._default_manager
+                .filter(**{f'{foreign_key}__in': ids})
+                .order_by(*child.model._meta.ordering or ['pk'])
+                .values(foreign_key, *child.keys())
+            )
+            yield name, child, foreign_key, queryset
+
+    def attach(self, rows, records, name, child, foreign_key, child_records):
+        by_parent = {}
+        for record, row in zip(child_records, child.to_rows(child_records)):
+            by_parent.setdefault(record[foreign_key], []).append(row)
+
+        pk = self.model._meta.pk.attname
+        for record, row in zip(records, rows):
+            row[name] = by_parent.get(record[pk], [])
+
+    def serialize(self, records):
+        records = list(records)
+        rows = self.to_rows(records)
+        if records:
+            for name, child, foreign_key, queryset in self.nested_querysets(records):
+                self.attach(rows, records, name, child, foreign_key, list(queryset))
+        return rows
+
+    async def aserialize(self, records):
+        records = list(records)
+        rows = self.to_rows(records)
+        if records:
+            for name, child, foreign_key, queryset in self.nested_querysets(records):
+                self.attach(rows, records, name, child, foreign_key, [row async for row in queryset])
+        return rows
+
+
+class ValuesListMixin:
+    # list() through ValuesSerializer when the list serializer allows it;
+    # API_FAST_SERIALIZATION = False keeps DRF's serializers.
+
+    def values_serializer(self):
+        if not fast_serialization_enabled():
+            return None
+        return ValuesSerializer.for_serializer(self.get_serializer())
+
+    def values_queryset(self, queryset, values_serializer):
+        # Ordering columns are read too: keyset pagination takes its
+        # position from the last row
+        keys = [*values_serializer.keys(), *ordering_columns(self, queryset)]
+        return queryset.prefetch_related(None).values(*dict.fromkeys(keys))
+
+    def list(self, request, *args, **kwargs):
+        values_serializer = self.values_serializer()
+        if values_serializer is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.values_queryset(self.filter_queryset(self.get_queryset()), values_serializer)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(values_serializer.serialize(page))
+        return Response(values_serializer.serialize(queryset))
@@ -0,0 +1,148 @@
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import SearchFilter
+
+
+# ====================== INDEX ======================
+# SQLite keeps an FTS5 external-content table next to the model table,
+# synced by triggers so bulk_create() and queryset.update() stay indexed.
+# PostgreSQL gets a GIN expression index over the same columns.
+def fts_table_name(table):
+    return f'{table}_fts'
+
+
+def gin_index_name(table):
+    return f'{table}_search_gin'
+
+
+def search_document_sql(table, columns, qualify=True):
+    prefix = f'"{table}".' if qualify else ''
+    document = " || ' ' || ".join(f"coalesce({prefix}\"{column}\", '')" for column in columns)
+    return f"to_tsvector('simple', {document})"
+
+
+def _sqlite_statements(table, columns):
+    fts = fts_table_name(table)
+    column_list = ', '.join(f'"{column}"' for column in columns)
+    new_values = ', '.join(f'new."{column}"' for column in columns)
+    old_values = ', '.join(f'old."{column}"' for column in columns)
+
+    return [
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS "{fts}" USING fts5('
+        f"{column_list}, content='{table}', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2')",
+
+        f'CREATE TRIGGER IF NOT EXISTS "{fts}_ai" AFTER INSERT ON "{table}" BEGIN '
+        f'INSERT INTO "{fts}"(rowid, {column_list}) VALUES (new.id, {new_values}); END',
+
+        f'CREATE TRIGGER IF NOT EXISTS "{fts}_ad" AFTER DELETE ON "{table}" BEGIN '
+        f'INSERT INTO "{fts}"("{fts}", rowid, {column_list}) '
+        f"VALUES ('delete', old.id, {old_values}); END",
+
+        f'CREATE TRIGGER IF NOT EXISTS "{fts}_au" AFTER UPDATE OF {column_list} ON "{table}" BEGIN '
+        f'INSERT INTO "{fts}"("{fts}", rowid, {column_list}) '
+        f"VALUES ('delete', old.id, {old_values}); "
+        f'INSERT INTO "{fts}"(rowid, {column_list}) VALUES (new.id, {new_values}); END',
+
+        f'INSERT INTO "{fts}"("{fts}") VALUES (\'rebuild\')',
+    ]
+
+
+def install_full_text_index(schema_editor, table, columns):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        # Triggers are dropped whenever SQLite remakes the table, so
+        # migrations that remake it should call this again.
+        remove_full_text_index(schema_editor, table)
+        for statement in _sqlite_statements(table, columns):
+            schema_editor.execute(statement)
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{gin_index_name(table)}" ON "{table}" '
+            f'USING GIN (({search_document_sql(table, columns, qualify=False)}))'
+        )
+
+
+def remove_full_text_index(schema_editor, table):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        fts = fts_table_name(table)
+        for suffix in ('ai', 'ad', 'au'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS "{fts}_{suffix}"')
+        schema_editor.execute(f'DROP TABLE IF EXISTS "{fts}"')
+    elif vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{gin_index_name(table)}"')
+
+
+# ====================== FILTER BACKEND ======================
+class FullTextSearchFilter(SearchFilter):
+    # Drop-in replacement for SearchFilter: same ?search= parameter and
+    # search_fields, answered from the full-text index and ranked by
+    # relevance unless ?ordering= is given. Other database vendors fall
+    # back to SearchFilter's icontains lookups.
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request)
+        search_terms = self.get_search_terms(request)
+        if not search_fields or not search_terms:
+            return queryset
+
+        vendor = connections[queryset.db].vendor
+        if vendor == 'sqlite':
+            return self.sqlite_search(queryset, search_terms)
+        if vendor == 'postgresql':
+            return self.postgresql_search(queryset, search_fields, search_terms)
+        return super().filter_queryset(request, queryset, view)
+
+    def sqlite_search(self, queryset, search_terms):
+        # Every term must match, each as a prefix so search-as-you-type works
+        terms = [term.replace('"', '').strip() for term in search_terms]
+        match = ' '.join(f'"{term}"*' for term in terms if term)
+        if not match:
+            return queryset
+
+        table = queryset.model._meta.db_table
+        fts = fts_table_name(table)
+        pk = f'"{table}"."{queryset.model._meta.pk.column}"'
+
+        return (
+            queryset
+            .filter(pk__in=RawSQL(f'SELECT rowid FROM "{fts}" WHERE "{fts}" MATCH %s', [match]))
+            .annotate(search_rank=RawSQL(
+                f'SELECT -bm25("{fts}") FROM "{fts}" WHERE "{fts}" MATCH %s AND rowid = {pk}',
+                [match],
+                output_field=FloatField(),
+            ))
+            .order_by('-search_rank')
+        )
+
+    def postgresql_search(self, queryset, search_fields, search_terms):
+        tokens = []
+        for term in search_terms:
+            tokens.extend(token for token in re.split(r'\W+', term) if token)
+        if not tokens:
+            return queryset
+
+        opts = queryset.model._meta
+        columns = [opts.get_field(field.lstrip('^=@$')).column for field in search_fields]
+        document = search_document_sql(opts.db_table, columns)
+        query = ' & '.join(f'{token}:*' for token in tokens)
+
+        return (
+            queryset
+            .alias(search_match=RawSQL(
+                f"{document} @@ to_tsquery('simple', %s)",
+                [query],
+                output_field=BooleanField(),
+            ))
+            .filter(search_match=True)
+            .annotate(search_rank=RawSQL(
+                f"ts_rank({document}, to_tsquery('simple', %s))",
+                [query],
+                output_field=FloatField(),
+            ))
+            .order_by('-search_rank')
+        )
@@ -1,5 +1,6 @@
 import json
 from rest_framework import serializers
+from .fieldsets import DynamicFieldsMixin
 from .models import Account, Expense, ExpenseItem
 from django.db import transaction
 from decimal import Decimal
@@ -12,6 +13,8 @@ class AccountSerializer(serializers.ModelSerializer):
 
 
 class ExpenseItemSerializer(serializers.ModelSerializer):
+    # Writable so updates can match incoming lines to existing rows
+    id = serializers.IntegerField(required=False)
     vat_rate = serializers.DecimalField(
         max_digits=5,
         decimal_places=2,
@@ -28,6 +31,7 @@ class ExpenseItemSerializer(serializers.ModelSerializer):
             'quantity',
             'unit',
             'unit_price',
+            'vat_rate',
             'total',
         )
         read_only_fields = ('total',)
@@ -47,7 +51,9 @@ class ExpenseSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ('total_expense', 'vat_amount', 'created_at')
     def to_internal_value(self, data):
-        data = data.copy()
+        # Multipart uploads (with an invoice) arrive as a QueryDict, which
+        # DRF reads as HTML form lists; a plain dict keeps the JSON items.
+        data = data.dict() if hasattr(data, 'dict') else data.copy()
         items = data.get('items')
         if items and isinstance(items, str):
             try:
@@ -56,106 +62,111 @@ class ExpenseSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError({"items": ["Invalid JSON format."]})
         return super().to_internal_value(data)
 
-    def _handle_account_deduction(self, expense, cash_amount, bank_amount):
-        payment_source = expense.payment_source
-        if payment_source == 'cash':
-            cash_account, _ = Account.objects.get_or_create(
-                account_type='cash', defaults={'balance': Decimal('0')}
-            )
-            cash_account.balance -= expense.total_expense
-            cash_account.save()
-        elif payment_source == 'bank':
-            bank_account, _ = Account.objects.get_or_create(
-                account_type='bank', defaults={'balance': Decimal('0')}
-            )
-            bank_account.balance -= expense.total_expense
-            bank_account.save()
-        elif payment_source == 'combined':
-            if cash_amount > 0:
-                cash_account, _ = Account.objects.get_or_create(
-                    account_type='cash', defaults={'balance': Decimal('0')}
-                )
-                cash_account.balance -= Decimal(str(cash_amount))
-                cash_account.save()
-            if bank_amount > 0:
-                bank_account, _ = Account.objects.get_or_create(
-                    account_type='bank', defaults={'balance': Decimal('0')}
-                )
-                bank_account.balance -= Decimal(str(bank_amount))
-                bank_account.save()
-    @transaction.atomic
-    def create(self, validated_data):
+    @staticmethod
+    def _item_values(item):
+        qty = Decimal(str(item['quantity']))
+        unit_price = Decimal(str(item['unit_price']))
+        vat_rate = Decimal(str(item.get('vat_rate', 0)))
+
+        item_subtotal = qty * unit_price
+        item_vat = item_subtotal * vat_rate / Decimal('100')
+
+        values = {
+            'item_name': item['item_name'],
+            'quantity': item['quantity'],
+            'unit': item.get('unit', 'pcs'),
+            'unit_price': item['unit_price'],
+            'vat_rate': vat_rate,
+            'total': item_subtotal + item_vat,
+        }
+        return values, item_vat
+
+    def build_expense(self, validated_data):
+        # Unsaved Expense and items with totals filled in, plus the cash/bank split
+        validated_data = dict(validated_data)
         items_data = validated_data.pop('items', None)
         if not items_data:
             raise serializers.ValidationError({"items": ["This field is required."]})
 
         cash_amount = validated_data.pop('cash_amount', Decimal('0'))
         bank_amount = validated_data.pop('bank_amount', Decimal('0'))
-        expense = Expense.objects.create(**validated_data)
 
         total_expense = Decimal('0')
         vat_amount = Decimal('0')
+        item_values = []
 
         for item in items_data:
-            qty = Decimal(str(item['quantity']))
-            unit_price = Decimal(str(item['unit_price']))
-            vat_rate = Decimal(str(item.get('vat_rate', 0)))
-
-            item_subtotal = qty * unit_price
-            item_vat = item_subtotal * vat_rate / Decimal('100')
-            item_total = item_subtotal + item_vat
-
-            ExpenseItem.objects.create(
-                expense=expense,
-                item_name=item['item_name'],
-                quantity=item['quantity'],
-                unit=item.get('unit', 'pcs'),
-                unit_price=item['unit_price'],
-                total=item_total,
-            )
-            total_expense += item_total
+            values, item_vat = self._item_values(item)
+            item_values.append(values)
+            total_expense += values['total']
             vat_amount += item_vat
 
+        expense = Expense(total_expense=total_expense, **validated_data)
         expense.vat_amount = vat_amount
-        expense.total_expense = total_expense
-        expense.save()
+        items = [ExpenseItem(expense=expense, **values) for values in item_values]
+        return expense, items, cash_amount, bank_amount
 
-        self._handle_account_deduction(expense, cash_amount, bank_amount)
+    @transaction.atomic
+    def create(self, validated_data):
+        # Account balances are updated by ExpenseViewSet, not here
+        expense, items, _, _ = self.build_expense(validated_data)
+        expense.save()
+        ExpenseItem.objects.bulk_create(items)
         return expense
 
+    def _sync_items(self, instance, items_data):
+        existing = {item.id: item for item in instance.items.all()}
+        seen = set()
+        to_create = []
+        to_update = []
+        total_expense = Decimal('0')
+        vat_amount = Decimal('0')
+
+        for item in items_data:
+            values, item_vat = self._item_values(item)
+            item_id = item.get('id')
+
+            if item_id is None:
+                to_create.append(ExpenseItem(expense=instance, **values))
+            elif item_id in existing and item_id not in seen:
+                seen.add(item_id)
+                current = existing[item_id]
+                if any(getattr(current, field) != value for field, value in values.items()):
+                    for field, value in values.items():
+                        setattr(current, field, value)
+                    to_update.append(current)
+            else:
+                raise serializers.ValidationError(
+                    {"items": [f"Item {item_id} does not belong to this expense."]}
+                )
+
+            total_expense += values['total']
+            vat_amount += item_vat
+
+        removed = [item_id for item_id in existing if item_id not in seen]
+        if removed:
+            ExpenseItem.objects.filter(pk__in=removed).delete()
+        if to_update:
+            ExpenseItem.objects.bulk_update(
+                to_update, ['item_name', 'quantity', 'unit', 'unit_price', 'vat_rate', 'total']
+            )
+        if to_create:
+            ExpenseItem.objects.bulk_create(to_create)
+
+        return total_expense, vat_amount
+
     @transaction.atomic
     def update(self, instance, validated_data):
         items_data = validated_data.pop('items', None)
-        cash_amount = validated_data.pop('cash_amount', Decimal('0'))
-        bank_amount = validated_data.pop('bank_amount', Decimal('0'))
+        # The split is applied to the accounts by ExpenseViewSet
+        validated_data.pop('cash_amount', None)
+        validated_data.pop('bank_amount', None)
 
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
-        instance.save()
 
         if items_data is not None:
-            instance.items.all().delete()
-            total_expense = Decimal('0')
-            vat_amount = Decimal('0')
-            for item in items_data:
-                qty = Decimal(str(item['quantity']))
-                unit_price = Decimal(str(item['unit_price']))
-                vat_rate = Decimal(str(item.get('vat_rate', 0)))
-
-                item_subtotal = qty * unit_price
-                item_vat = item_subtotal * vat_rate / Decimal('100')
-                item_total = item_subtotal + item_vat
-
-                ExpenseItem.objects.create(
-                    expense=instance,
-                    item_name=item['item_name'],
-                    quantity=item['quantity'],
-                    unit=item.get('unit', 'pcs'),
-                    unit_price=item['unit_price'],
-                    total=item_total,
-                )
-                total_expense += item_total
-                vat_amount += item_vat
+            total_expense, vat_amount = self._sync_items(instance, items_data)
         else:
             total_expense = Decimal('0')
             vat_amount = getattr(instance, 'vat_amount', Decimal('0'))
@@ -165,6 +176,13 @@ class ExpenseSerializer(serializers.ModelSerializer):
         instance.vat_amount = vat_amount
         instance.total_expense = total_expense
         instance.save()
+        return instance
+
 
-        self._handle_account_deduction(instance, cash_amount, bank_amount)
-        return instance
\ No newline at end of file
+class ExpenseListSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    # Read-only rows for ?fields= / ?expand=items list requests
+    items = ExpenseItemSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Expense
+        fields = '__all__'
@@ -1,8 +1,70 @@
+import hashlib
+from collections import defaultdict
 from decimal import Decimal
-from django.db.models import F
+from uuid import uuid4
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connection, transaction
+from django.db.models import Case, DecimalField, F, Q, Value, When
+from django.db.models.sql import UpdateQuery
+from django.utils import timezone
+from finances.events import publish_balances
+from .ledger import record_ledger_entries
 from .models import Account   # expenses/models.py
 
 
+class InsufficientBalance(Exception):
+    def __init__(self, account_type):
+        self.account_type = account_type
+        super().__init__(f"Insufficient {account_type} balance.")
+
+
+ACCOUNTS_VERSION_KEY = 'expenses:accounts:version'
+
+
+# The version lives in the cache only when every worker shares that cache.
+# A per-process cache (LocMemCache) would let other workers keep answering
+# 304 with stale balances, so there it is a digest of the account rows: one
+# small query, but correct in every worker.
+def accounts_version_is_cached():
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+def _rows_version(rows):
+    return hashlib.sha1(repr(rows).encode()).hexdigest()
+
+
+# A random token rather than a counter, so an evicted or cold cache can
+# never reissue a version a client still holds.
+def get_accounts_version():
+    if not accounts_version_is_cached():
+        return _rows_version(list(Account.objects.order_by('pk').values_list()))
+
+    version = cache.get(ACCOUNTS_VERSION_KEY)
+    if version is None:
+        version = uuid4().hex
+        if not cache.add(ACCOUNTS_VERSION_KEY, version, timeout=None):
+            version = cache.get(ACCOUNTS_VERSION_KEY, version)
+    return version
+
+
+async def aget_accounts_version():
+    if not accounts_version_is_cached():
+        return _rows_version([row async for row in Account.objects.order_by('pk').values_list()])
+
+    version = await cache.aget(ACCOUNTS_VERSION_KEY)
+    if version is None:
+        version = uuid4().hex
+        if not await cache.aadd(ACCOUNTS_VERSION_KEY, version, timeout=None):
+            version = await cache.aget(ACCOUNTS_VERSION_KEY, version)
+    return version
+
+
+def bump_accounts_version():
+    cache.set(ACCOUNTS_VERSION_KEY, uuid4().hex, timeout=None)
+
+
 def get_account(account_type):
     account, _ = Account.objects.get_or_create(
         account_type=account_type,
@@ -11,57 +73,175 @@ def get_account(account_type):
     return account
 
 
-# ====================== EXPENSE ======================
-def apply_expense(amount, payment_source, amount_cash=0, amount_bank=0):
-    if payment_source == 'combined':
-        cash = get_account('cash')
-        bank = get_account('bank')
-        cash.balance = F('balance') - Decimal(amount_cash)
-        bank.balance = F('balance') - Decimal(amount_bank)
-        cash.save(update_fields=['balance'])
-        bank.save(update_fields=['balance'])
-    else:
-        account = get_account(payment_source)
-        account.balance = F('balance') - Decimal(amount)
-        account.save(update_fields=['balance'])
-
-
-def rollback_expense(amount, payment_source, amount_cash=0, amount_bank=0):
-    if payment_source == 'combined':
-        cash = get_account('cash')
-        bank = get_account('bank')
-        cash.balance = F('balance') + Decimal(amount_cash)
-        bank.balance = F('balance') + Decimal(amount_bank)
-        cash.save(update_fields=['balance'])
-        bank.save(update_fields=['balance'])
-    else:
-        account = get_account(payment_source)
-        account.balance = F('balance') + Decimal(amount)
-        account.save(update_fields=['balance'])
-
-def apply_income(amount, payment_source, amount_cash=0, amount_bank=0):
-    if payment_source == 'combined':
-        cash = get_account('cash')
-        bank = get_account('bank')
-        cash.balance = F('balance') + Decimal(amount_cash)
-        bank.balance = F('balance') + Decimal(amount_bank)
-        cash.save(update_fields=['balance'])
-        bank.save(update_fields=['balance'])
-    else:
-        account = get_account(payment_source)
-        account.balance = F('balance') + Decimal(amount)
-        account.save(update_fields=['balance'])
-
-
-def rollback_income(amount, payment_source, amount_cash=0, amount_bank=0):
+def ensure_accounts(account_types):
+    Account.objects.bulk_create(
+        [Account(account_type=account_type, balance=Decimal('0')) for account_type in sorted(account_types)],
+        ignore_conflicts=True,
+    )
+
+
+def _update_returns_rows():
+    # UPDATE ... RETURNING: PostgreSQL, and SQLite from 3.35 (the same
+    # release that added it to INSERT)
+    return connection.vendor in ('postgresql', 'sqlite') and connection.features.can_return_columns_from_insert
+
+
+def _update_returning(queryset, field_names, **values):
+    # queryset.update(**values), returning the changed rows as instances
+    # with only field_names loaded
+    query = queryset.query.chain(UpdateQuery)
+    query.add_update_values(values)
+    query.annotations = {}
+    statement, params = query.get_compiler(queryset.db).as_sql()
+
+    opts = queryset.model._meta
+    fields = [opts.get_field(name) for name in field_names]
+    columns = [field.get_col(opts.db_table) for field in fields]
+    converters = [
+        (column, connection.ops.get_db_converters(column) + column.get_db_converters(connection))
+        for column in columns
+    ]
+
+    returning = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+    with connection.cursor() as cursor:
+        cursor.execute(f'{statement} RETURNING {returning}', params)
+        rows = cursor.fetchall()
+
+    attnames = [field.attname for field in fields]
+    instances = []
+    for row in rows:
+        values = []
+        for value, (column, column_converters) in zip(row, converters):
+            for converter in column_converters:
+                value = converter(value, column, connection)
+            values.append(value)
+        instances.append(queryset.model.from_db(queryset.db, attnames, values))
+    return instances
+
+
+def _move_balances(deltas, check_funds):
+    # {account_type: account as updated}. Where UPDATE returns rows, an
+    # account without a row or a debit it can't cover is just left out.
+    condition = Q()
+    for account_type, amount in deltas.items():
+        if check_funds and amount < 0:
+            condition |= Q(account_type=account_type, balance__gte=-amount)
+        else:
+            condition |= Q(account_type=account_type)
+
+    queryset = Account.objects.filter(condition)
+    balance = F('balance') + Case(
+        *[When(account_type=account_type, then=Value(amount)) for account_type, amount in deltas.items()],
+        default=Value(Decimal('0')),
+        output_field=DecimalField(max_digits=12, decimal_places=2),
+    )
+
+    if _update_returns_rows():
+        updated = _update_returning(queryset, ['id', 'account_type', 'balance', 'opened_on'], balance=balance)
+        return {account.account_type: account for account in updated}
+
+    ensure_accounts(deltas)
+    updated = queryset.update(balance=balance)
+    accounts = {
+        account.account_type: account
+        for account in Account.objects.filter(account_type__in=deltas)
+    }
+    if updated != len(deltas):
+        for account_type, amount in deltas.items():
+            if amount < 0 and accounts[account_type].balance < -amount:
+                raise InsufficientBalance(account_type)
+        raise InsufficientBalance(next(iter(deltas)))
+    return accounts
+
+
+def post_balance_changes(postings, entry_type, check_funds=False):
+    # postings: (account_type, signed amount, business date) tuples, with
+    # an optional fourth element overriding entry_type for that posting.
+    # All accounts move in one UPDATE; with check_funds, debits only
+    # apply where the net balance change is covered and a short row count
+    # fails the surrounding transaction. Where UPDATE can return rows the
+    # new balances come back with it; the ledger then takes an INSERT, a
+    # checkpoint UPDATE and a checkpoint SELECT however many postings.
+    postings = [
+        (posting[0], Decimal(posting[1]), posting[2] or timezone.localdate(), posting[3] if len(posting) > 3 else entry_type)
+        for posting in postings
+        if posting[1]
+    ]
+    if not postings:
+        return
+
+    deltas = defaultdict(Decimal)
+    for account_type, amount, _, _ in postings:
+        deltas[account_type] += amount
+
+    with transaction.atomic(savepoint=False):
+        # The UPDATE below locks the rows it changes, which is all a single
+        # account needs. Several accounts are locked first in a fixed order
+        # so two writers moving cash and bank can't deadlock on each other.
+        if len(deltas) > 1 and connection.features.has_select_for_update:
+            list(
+                Account.objects.select_for_update()
+                .filter(account_type__in=deltas)
+                .order_by('account_type')
+                .values_list('pk', flat=True)
+            )
+
+        accounts = _move_balances(deltas, check_funds)
+        if len(accounts) < len(deltas):
+            # An account's first posting creates its row; one that still
+            # doesn't move is short of funds
+            missing = {account_type: amount for account_type, amount in deltas.items() if account_type not in accounts}
+            ensure_accounts(missing)
+            accounts.update(_move_balances(missing, check_funds))
+            for account_type in deltas:
+                if account_type not in accounts:
+                    raise InsufficientBalance(account_type)
+
+        # Replay the postings from the pre-update balance for the ledger
+        running = {
+            account_type: account.balance - deltas[account_type]
+            for account_type, account in accounts.items()
+        }
+        entries = []
+        for account_type, amount, date, posting_type in postings:
+            running[account_type] += amount
+            entries.append((accounts[account_type], amount, date, posting_type, running[account_type]))
+        record_ledger_entries(entries)
+
+        transaction.on_commit(bump_accounts_version)
+        publish_balances(accounts.values())
+
+
+def _split(amount, payment_source, amount_cash, amount_bank):
     if payment_source == 'combined':
-        cash = get_account('cash')
-        bank = get_account('bank')
-        cash.balance = F('balance') - Decimal(amount_cash)
-        bank.balance = F('balance') - Decimal(amount_bank)
-        cash.save(update_fields=['balance'])
-        bank.save(update_fields=['balance'])
-    else:
-        account = get_account(payment_source)
-        account.balance = F('balance') - Decimal(amount)
-        account.save(update_fields=['balance'])
\ No newline at end of file
+        return [('cash', Decimal(amount_cash)), ('bank', Decimal(amount_bank))]
+    return [(payment_source, Decimal(amount))]
+
+
+# ====================== EXPENSE ======================
+def apply_expense(amount, payment_source, amount_cash=0, amount_bank=0, date=None, check_funds=False):
+    post_balance_changes(
+        [(account_type, -value, date) for account_type, value in _split(amount, payment_source, amount_cash, amount_bank)],
+        'expense',
+        check_funds=check_funds,
+    )
+
+
+def rollback_expense(amount, payment_source, amount_cash=0, amount_bank=0, date=None):
+    post_balance_changes(
+        [(account_type, value, date) for account_type, value in _split(amount, payment_source, amount_cash, amount_bank)],
+        'expense_rollback',
+    )
+
+def apply_income(amount, payment_source, amount_cash=0, amount_bank=0, date=None):
+    post_balance_changes(
+        [(account_type, value, date) for account_type, value in _split(amount, payment_source, amount_cash, amount_bank)],
+        'income',
+    )
+
+
+def rollback_income(amount, payment_source, amount_cash=0, amount_bank=0, date=None):
+    post_balance_changes(
+        [(account_type, -value, date) for account_type, value in _split(amount, payment_source, amount_cash, amount_bank)],
+        'income_rollback',
+    )
@@ -0,0 +1,84 @@
+import os
+from decimal import Decimal
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .ledger import record_ledger_entry
+from .models import Account, Expense, ThumbnailJob
+from .services import bump_accounts_version
+from .thumbnails import enqueue_thumbnail_job
+
+
+# Balance changes from services.py bump the version themselves; these
+# cover edits made through the admin or the shell.
+@receiver(post_save, sender=Account)
+@receiver(post_delete, sender=Account)
+def account_changed(sender, **kwargs):
+    bump_accounts_version()
+
+
+# services.py moves balances with queryset updates, which send no
+# signals; a balance saved any other way is ledgered as an adjustment.
+@receiver(pre_save, sender=Account)
+def remember_account_balance(sender, instance, raw=False, **kwargs):
+    instance._saved_balance = None
+    if raw or instance.pk is None:
+        return
+    instance._saved_balance = (
+        Account.objects.filter(pk=instance.pk).values_list('balance', flat=True).first()
+    )
+
+
+# The entry is dated instance._effective_date when set (the admin's
+# "effective date"), today otherwise.
+@receiver(post_save, sender=Account)
+def ledger_account_edit(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and 'balance' not in update_fields):
+        return
+
+    balance = Decimal(str(instance.balance))
+    amount = balance - (getattr(instance, '_saved_balance', None) or Decimal('0'))
+    if not amount:
+        return
+
+    date = getattr(instance, '_effective_date', None) or timezone.localdate()
+    if created:
+        record_ledger_entry(instance, amount, date, 'opening', balance)
+        Account.objects.filter(pk=instance.pk).update(opened_on=date)
+        instance.opened_on = date
+    else:
+        record_ledger_entry(instance, amount, date, 'adjustment', balance)
+
+
+@receiver(pre_save, sender=Expense)
+def remember_invoice_name(sender, instance, raw=False, **kwargs):
+    # Runs before FileField.pre_save() renames a new upload to its blob
+    if raw:
+        return
+    if not instance.invoice:
+        instance.invoice_name = None
+    elif not instance.invoice._committed:
+        instance.invoice_name = os.path.basename(instance.invoice.name)[:255]
+
+
+@receiver(post_save, sender=Expense)
+def queue_invoice_thumbnails(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    has_derivatives = bool(instance.invoice_thumbnail or instance.invoice_preview)
+
+    if not instance.invoice:
+        if has_derivatives:
+            Expense.objects.filter(pk=instance.pk).update(invoice_thumbnail=None, invoice_preview=None)
+        return
+
+    if ThumbnailJob.objects.filter(expense=instance, source=instance.invoice.name).exists():
+        return
+
+    # New or replaced invoice: old copies no longer match it
+    if has_derivatives:
+        Expense.objects.filter(pk=instance.pk).update(invoice_thumbnail=None, invoice_preview=None)
+    enqueue_thumbnail_job(instance)
@@ -0,0 +1,92 @@
+import hashlib
+import os
+import pathlib
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+HASH_ALGORITHM = 'sha256'
+
+
+# ====================== CONTENT-ADDRESSED STORAGE ======================
+# Files are named after the SHA-256 of their bytes, e.g.
+# invoices/sha256/ab/cd/abcd...ef.pdf, so re-uploading the same scan
+# reuses the existing blob instead of writing a second copy. The upload is
+# hashed while it streams to a temporary file in the same directory tree,
+# which is then renamed into place (or discarded if the blob exists).
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+
+    def __init__(self, prefix='invoices', **kwargs):
+        self.prefix = prefix
+        super().__init__(**kwargs)
+
+    def get_available_name(self, name, max_length=None):
+        # The final name is only known after hashing; see _save()
+        return str(name).replace('\\', '/')
+
+    def blob_name(self, digest, extension):
+        return f'{self.prefix}/{HASH_ALGORITHM}/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+    def _save(self, name, content):
+        extension = pathlib.PurePath(name).suffix.lower()
+
+        tmp_dir = self.path(f'{self.prefix}/{HASH_ALGORITHM}/tmp')
+        os.makedirs(tmp_dir, exist_ok=True)
+
+        digest = hashlib.new(HASH_ALGORITHM)
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            with os.fdopen(fd, 'wb') as tmp_file:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode()
+                    digest.update(chunk)
+                    tmp_file.write(chunk)
+
+            name = self.blob_name(digest.hexdigest(), extension)
+            full_path = self.path(name)
+
+            if os.path.exists(full_path):
+                try:
+                    # A fresh mtime keeps purge_invoice_blobs' --min-age
+                    # grace period for this upload too
+                    os.utime(full_path)
+                    return name
+                except FileNotFoundError:
+                    # Purged in the meantime; store it again
+                    pass
+
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            if self.file_permissions_mode is not None:
+                os.chmod(tmp_path, self.file_permissions_mode)
+            # Atomic on POSIX; a concurrent upload of the same bytes just
+            # replaces the blob with identical content.
+            os.replace(tmp_path, full_path)
+            return name
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def delete(self, name):
+        # Blobs may be shared by several expenses, so they are never
+        # removed through a single reference; purge_invoice_blobs removes
+        # the ones nothing points at.
+        pass
+
+    def blob_names(self):
+        # Every stored blob, skipping uploads still being hashed
+        root = self.path(f'{self.prefix}/{HASH_ALGORITHM}')
+        for directory, subdirectories, files in os.walk(root):
+            if directory == root and 'tmp' in subdirectories:
+                subdirectories.remove('tmp')
+            for file_name in files:
+                path = os.path.join(directory, file_name)
+                yield self.prefix + '/' + os.path.relpath(path, self.path(self.prefix)).replace(os.sep, '/')
+
+
+invoice_storage = ContentAddressedStorage(prefix='invoices')
+derivative_storage = ContentAddressedStorage(prefix='invoices/derived')
@@ -1,3 +1,763 @@
-from django.test import TestCase
+import csv
+import json
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from . import thumbnails
+from .exports import EXPENSE_EXPORT_FIELDS
+from .ledger import balance_at
+from .models import Account, BalanceCheckpoint, Expense, ExpenseItem, LedgerEntry, ThumbnailJob
+from .rows import ValuesSerializer
+from .serializers import ExpenseSerializer
+from .services import InsufficientBalance, post_balance_changes
+from .storage import invoice_storage
+
+try:
+    from openpyxl import load_workbook
+except ImportError:  # XLSX export is optional
+    load_workbook = None
+
+try:
+    from PIL import Image
+except ImportError:  # thumbnails are optional
+    Image = None
+
+
+def expense_payload(**overrides):
+    payload = {
+        'date': '2026-01-10',
+        'description': 'Groceries',
+        'category': 'Food',
+        'payment_source': 'cash',
+        'items': [{'item_name': 'Rice', 'quantity': '2', 'unit': 'kg', 'unit_price': '10.00'}],
+    }
+    payload.update(overrides)
+    return payload
+
+
+# ====================== REPORTS ======================
+class ExpenseReportTests(APITestCase):
+
+    def setUp(self):
+        Account.objects.create(account_type='cash', balance=Decimal('1000.00'))
+        for day, category, description in [
+            ('2026-01-10', 'Food', 'Rice'),
+            ('2026-01-10', 'Supplies', 'Crayons'),
+            ('2026-01-25', 'Food', 'Beans'),
+            ('2026-02-03', 'Food', 'Rice again'),
+        ]:
+            response = self.client.post(
+                '/api/expenses/', expense_payload(date=day, category=category, description=description), format='json',
+            )
+            self.assertEqual(response.status_code, 201, response.data)
+
+    def report(self, name, **params):
+        response = self.client.get(f'/api/expenses/reports/{name}/', params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.json()
+
+    def test_groups(self):
+        daily = self.report('daily')
+        self.assertEqual(
+            [(row['day'], row['total_expense'], row['count']) for row in daily['results']],
+            [('2026-01-10', 40.0, 2), ('2026-01-25', 20.0, 1), ('2026-02-03', 20.0, 1)],
+        )
+        self.assertEqual((daily['total_expense'], daily['count']), (80.0, 4))
+
+        monthly = self.report('monthly')
+        self.assertEqual([(row['month'], row['count']) for row in monthly['results']], [('2026-01-01', 3), ('2026-02-01', 1)])
+        category = self.report('category')
+        self.assertEqual([(row['category'], row['count']) for row in category['results']], [('Food', 3), ('Supplies', 1)])
+
+    def test_filters_apply(self):
+        monthly = self.report('monthly', category='Food', date__gte='2026-01-15')
+        self.assertEqual([(row['month'], row['count']) for row in monthly['results']], [('2026-01-01', 1), ('2026-02-01', 1)])
+
+    def test_search_reads_the_expenses(self):
+        category = self.report('category', search='rice')
+        self.assertEqual(category['results'], [{'category': 'Food', 'total_expense': 40.0, 'count': 2}])
+
+
+# ====================== BALANCES ======================
+class PostBalanceChangesTests(TestCase):
+
+    def setUp(self):
+        Account.objects.create(account_type='cash', balance=Decimal('100.00'))
+        Account.objects.create(account_type='bank', balance=Decimal('50.00'))
+
+    def balances(self):
+        return dict(Account.objects.values_list('account_type', 'balance'))
+
+    def test_debit_within_balance(self):
+        post_balance_changes([('cash', Decimal('-40'), date(2026, 1, 5))], 'expense', check_funds=True)
+
+        self.assertEqual(self.balances()['cash'], Decimal('60.00'))
+        entry = LedgerEntry.objects.filter(entry_type='expense').get()
+        self.assertEqual(entry.amount, Decimal('-40.00'))
+        self.assertEqual(entry.balance_after, Decimal('60.00'))
+
+    def test_insufficient_funds_leaves_balance(self):
+        with self.assertRaises(InsufficientBalance) as raised:
+            with transaction.atomic():
+                post_balance_changes([('cash', Decimal('-150'), date(2026, 1, 5))], 'expense', check_funds=True)
+
+        self.assertEqual(raised.exception.account_type, 'cash')
+        self.assertEqual(self.balances(), {'cash': Decimal('100.00'), 'bank': Decimal('50.00')})
+        self.assertFalse(LedgerEntry.objects.filter(entry_type='expense').exists())
+
+    def test_combined_moves_both_accounts(self):
+        post_balance_changes(
+            [('cash', Decimal('-30'), date(2026, 1, 5)), ('bank', Decimal('-20'), date(2026, 1, 5))],
+            'expense',
+            check_funds=True,
+        )
+
+        self.assertEqual(self.balances(), {'cash': Decimal('70.00'), 'bank': Decimal('30.00')})
+        self.assertEqual(LedgerEntry.objects.filter(entry_type='expense').count(), 2)
+
+    def test_combined_rolls_back_when_one_account_is_short(self):
+        with self.assertRaises(InsufficientBalance) as raised:
+            with transaction.atomic():
+                post_balance_changes(
+                    [('cash', Decimal('-30'), date(2026, 1, 5)), ('bank', Decimal('-80'), date(2026, 1, 5))],
+                    'expense',
+                    check_funds=True,
+                )
+
+        self.assertEqual(raised.exception.account_type, 'bank')
+        self.assertEqual(self.balances(), {'cash': Decimal('100.00'), 'bank': Decimal('50.00')})
+
+    def test_nets_postings_per_account(self):
+        # The income in the same call covers the debit
+        post_balance_changes(
+            [('cash', Decimal('80'), date(2026, 1, 5), 'income'), ('cash', Decimal('-150'), date(2026, 1, 5))],
+            'expense',
+            check_funds=True,
+        )
+
+        self.assertEqual(self.balances()['cash'], Decimal('30.00'))
+
+
+# ====================== LEDGER ======================
+class LedgerCheckpointTests(TestCase):
+
+    def setUp(self):
+        self.cash = Account.objects.create(account_type='cash', balance=Decimal('0'))
+        post_balance_changes([('cash', Decimal('100'), date(2026, 1, 5))], 'income')
+        post_balance_changes([('cash', Decimal('-30'), date(2026, 3, 10))], 'expense')
+
+    def checkpoints(self):
+        return dict(BalanceCheckpoint.objects.filter(account=self.cash).values_list('date', 'balance'))
+
+    def test_month_end_checkpoints(self):
+        self.assertEqual(self.checkpoints(), {
+            date(2026, 1, 31): Decimal('100.00'),
+            date(2026, 3, 31): Decimal('70.00'),
+        })
+
+    def test_backdated_entry_shifts_later_checkpoints(self):
+        post_balance_changes([('cash', Decimal('-20'), date(2026, 1, 20))], 'expense')
+
+        self.assertEqual(self.checkpoints(), {
+            date(2026, 1, 31): Decimal('80.00'),
+            date(2026, 3, 31): Decimal('50.00'),
+        })
+        self.assertEqual(balance_at(self.cash, date(2026, 1, 19)), Decimal('100.00'))
+        self.assertEqual(balance_at(self.cash, date(2026, 2, 15)), Decimal('80.00'))
+        self.assertEqual(balance_at(self.cash, date(2026, 3, 31)), Decimal('50.00'))
+
+    def test_backdated_entry_in_new_month_creates_checkpoint(self):
+        post_balance_changes([('cash', Decimal('10'), date(2026, 2, 14))], 'income')
+
+        self.assertEqual(self.checkpoints(), {
+            date(2026, 1, 31): Decimal('100.00'),
+            date(2026, 2, 28): Decimal('110.00'),
+            date(2026, 3, 31): Decimal('80.00'),
+        })
+
+    def test_first_posting_creates_account(self):
+        post_balance_changes([('bank', Decimal('25'), date(2026, 1, 5))], 'income')
+
+        bank = Account.objects.get(account_type='bank')
+        self.assertEqual(bank.balance, Decimal('25.00'))
+        self.assertEqual(balance_at(bank, date(2026, 1, 31)), Decimal('25.00'))
+
+    def test_balance_edit_is_ledgered(self):
+        self.cash.refresh_from_db()
+        self.cash.balance += Decimal('5')
+        self.cash.save()
+
+        adjustment = LedgerEntry.objects.get(account=self.cash, entry_type='adjustment')
+        self.assertEqual(adjustment.amount, Decimal('5.00'))
+        self.assertEqual(adjustment.balance_after, Decimal('75.00'))
+
+    def test_adjustment_takes_an_effective_date(self):
+        self.cash.refresh_from_db()
+        self.cash.balance += Decimal('5')
+        self.cash._effective_date = date(2026, 2, 1)
+        self.cash.save()
+
+        self.assertEqual(balance_at(self.cash, date(2026, 2, 15)), Decimal('105.00'))
+        self.assertEqual(self.checkpoints()[date(2026, 3, 31)], Decimal('75.00'))
+
+
+class OpeningBalanceTests(TestCase):
+
+    def setUp(self):
+        self.cash = Account.objects.create(account_type='cash', balance=Decimal('100.00'))
+
+    def test_opening_moves_back_to_earlier_postings(self):
+        opened_on = self.cash.opened_on
+        post_balance_changes([('cash', Decimal('-30'), date(2025, 6, 10))], 'expense', check_funds=True)
+        post_balance_changes([('cash', Decimal('-20'), date(2025, 5, 2))], 'expense', check_funds=True)
+
+        self.cash.refresh_from_db()
+        self.assertEqual(self.cash.opened_on, date(2025, 5, 2))
+        self.assertLess(self.cash.opened_on, opened_on)
+        self.assertEqual(balance_at(self.cash, date(2025, 5, 31)), Decimal('80.00'))
+        self.assertEqual(balance_at(self.cash, date(2025, 6, 30)), Decimal('50.00'))
+        self.assertEqual(balance_at(self.cash, opened_on), self.cash.balance)
+
+    def test_later_postings_leave_it(self):
+        opened_on = self.cash.opened_on
+        post_balance_changes([('cash', Decimal('10'), opened_on + timedelta(days=3))], 'income')
+
+        self.cash.refresh_from_db()
+        self.assertEqual(self.cash.opened_on, opened_on)
+        self.assertEqual(LedgerEntry.objects.get(entry_type='opening').date, opened_on)
+
+
+# ====================== ITEMS ======================
+class ExpenseItemSyncTests(APITestCase):
+
+    def setUp(self):
+        Account.objects.create(account_type='cash', balance=Decimal('1000.00'))
+        payload = expense_payload(items=[
+            {'item_name': 'Rice', 'quantity': '2', 'unit': 'kg', 'unit_price': '10.00'},
+            {'item_name': 'Oil', 'quantity': '1', 'unit': 'l', 'unit_price': '5.00'},
+        ])
+        response = self.client.post('/api/expenses/', payload, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.expense = Expense.objects.get(pk=response.data['id'])
+        self.rice, self.oil = self.expense.items.order_by('id')
+
+    def test_update_create_and_delete_items(self):
+        response = self.client.patch(f'/api/expenses/{self.expense.pk}/', {'items': [
+            {'id': self.rice.pk, 'item_name': 'Rice', 'quantity': '3', 'unit': 'kg', 'unit_price': '10.00'},
+            {'item_name': 'Salt', 'quantity': '1', 'unit': 'kg', 'unit_price': '2.00'},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+
+        items = {item.item_name: item for item in self.expense.items.all()}
+        self.assertEqual(set(items), {'Rice', 'Salt'})
+        self.assertEqual(items['Rice'].pk, self.rice.pk)
+        self.assertEqual(items['Rice'].total, Decimal('30.00'))
+        self.assertFalse(ExpenseItem.objects.filter(pk=self.oil.pk).exists())
+
+        self.expense.refresh_from_db()
+        self.assertEqual(self.expense.total_expense, Decimal('32.00'))
+        self.assertEqual(Account.objects.get(account_type='cash').balance, Decimal('968.00'))
+
+    def test_foreign_item_id_is_rejected(self):
+        other = self.client.post('/api/expenses/', expense_payload(), format='json').data
+        foreign_id = other['items'][0]['id']
+
+        response = self.client.patch(f'/api/expenses/{self.expense.pk}/', {'items': [
+            {'id': foreign_id, 'item_name': 'Stolen', 'quantity': '1', 'unit': 'kg', 'unit_price': '1.00'},
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('items', response.data)
+        self.assertEqual(ExpenseItem.objects.get(pk=foreign_id).item_name, 'Rice')
+        self.assertEqual(self.expense.items.count(), 2)
+
+
+# ====================== BULK IMPORT ======================
+class ExpenseBulkImportTests(APITestCase):
+
+    def setUp(self):
+        Account.objects.create(account_type='cash', balance=Decimal('100.00'))
+
+    def upload(self, lines):
+        content = '\n'.join(lines).encode()
+        return self.client.post(
+            '/api/expenses/bulk/',
+            {'file': SimpleUploadedFile('expenses.ndjson', content, content_type='application/x-ndjson')},
+            format='multipart',
+        )
+
+    def test_partial_failures_are_reported_per_row(self):
+        response = self.upload([
+            '{"date": "2026-01-10", "description": "ok", "category": "Food", "payment_source": "cash",'
+            ' "items": [{"item_name": "a", "quantity": "1", "unit": "pcs", "unit_price": "30.00"}]}',
+            'not json',
+            '{"date": "2026-01-11", "description": "too much", "category": "Food", "payment_source": "cash",'
+            ' "items": [{"item_name": "b", "quantity": "1", "unit": "pcs", "unit_price": "500.00"}]}',
+            '{"date": "2026-01-12", "category": "Food", "payment_source": "cash"}',
+        ])
+
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual([error['row'] for error in response.data['errors']], [2, 3, 4])
+        self.assertEqual(list(Expense.objects.values_list('description', flat=True)), ['ok'])
+        self.assertEqual(Account.objects.get(account_type='cash').balance, Decimal('70.00'))
+
+    def test_nothing_created_is_a_bad_request(self):
+        response = self.upload(['not json'])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['created'], 0)
+
+
+# ====================== EXPORT ======================
+class ExpenseExportTests(APITestCase):
+
+    def setUp(self):
+        Account.objects.create(account_type='cash', balance=Decimal('1000.00'))
+        self.client.post('/api/expenses/', expense_payload(), format='json')
+        self.client.post('/api/expenses/', expense_payload(category='Supplies', description='Crayons'), format='json')
+
+    def export(self, **params):
+        response = self.client.get('/api/expenses/export/', params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_csv_is_filtered_and_streamed(self):
+        response = self.export(category='Food')
+
+        self.assertTrue(response.streaming)
+        self.assertRegex(response['Content-Disposition'], r'attachment; filename="expenses-\d{8}\.csv"')
+        rows = list(csv.DictReader(StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual([row['description'] for row in rows], ['Groceries'])
+        self.assertEqual(json.loads(rows[0]['items'])[0]['total'], '20.00')
+
+    def test_csv_can_be_imported_again(self):
+        content = b''.join(self.export().streaming_content)
+
+        response = self.client.post(
+            '/api/expenses/bulk/',
+            {'file': SimpleUploadedFile('expenses.csv', content, content_type='text/csv')},
+            format='multipart',
+        )
+
+        self.assertEqual(response.data['created'], 2, response.data)
+        self.assertEqual(Account.objects.get(account_type='cash').balance, Decimal('920.00'))
+
+    @skipUnless(load_workbook, 'openpyxl is not installed')
+    def test_xlsx(self):
+        response = self.export(file_format='xlsx')
+
+        sheet = load_workbook(BytesIO(b''.join(response.streaming_content))).active
+        rows = list(sheet.values)
+        self.assertEqual(list(rows[0]), EXPENSE_EXPORT_FIELDS)
+        self.assertEqual(len(rows), 3)
+
+    def test_unknown_format_is_a_bad_request(self):
+        response = self.client.get('/api/expenses/export/', {'file_format': 'pdf'})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('file_format', response.json())
+
+
+# ====================== PAGINATION ======================
+class ExpenseCursorPaginationTests(APITestCase):
+
+    def setUp(self):
+        for day in (3, 1, 2, 2, 5):
+            Expense.objects.create(date=date(2026, 1, day), description=f'Day {day}', category='Food', payment_source='cash')
+
+    def test_pages_walk_every_row_once(self):
+        ids, url, params = [], '/api/expenses/', {'pagination': 'cursor', 'page_size': 2}
+        while url:
+            body = self.client.get(url, params).json()
+            self.assertNotIn('count', body)
+            ids.extend(row['id'] for row in body['results'])
+            url, params = body['next'], None
+
+        expected = Expense.objects.order_by('-date', '-created_at').values_list('id', flat=True)
+        self.assertEqual(ids, list(expected))
+
+    def test_page_numbers_stay_the_default(self):
+        body = self.client.get('/api/expenses/').json()
+
+        self.assertEqual(body['count'], 5)
+
+
+# ====================== FIELDSETS ======================
+class SparseFieldsetTests(APITestCase):
+
+    def setUp(self):
+        Account.objects.create(account_type='cash', balance=Decimal('1000.00'))
+        for description in ('Groceries', 'Crayons'):
+            self.client.post('/api/expenses/', expense_payload(description=description), format='json')
+
+    def rows(self, **params):
+        response = self.client.get('/api/expenses/', params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.json()['results']
+
+    def test_only_the_requested_fields(self):
+        with CaptureQueriesContext(connection) as queries:
+            rows = self.rows(fields='id,description,total_expense', ordering='date')
+
+        self.assertNotIn('"remarks"', queries[-1]['sql'])
+        self.assertEqual([set(row) for row in rows], [{'id', 'description', 'total_expense'}] * 2)
+        self.assertEqual({row['total_expense'] for row in rows}, {'20.00'})
+
+    def test_expanded_items_are_prefetched(self):
+        # Count, page and items, however many rows
+        with self.assertNumQueries(3):
+            self.rows(fields='id', expand='items')
+        self.client.post('/api/expenses/', expense_payload(), format='json')
+
+        with self.assertNumQueries(3):
+            rows = self.rows(fields='id', expand='items')
+        self.assertEqual([set(row) for row in rows], [{'id', 'items'}] * 3)
+        self.assertEqual(rows[0]['items'][0]['item_name'], 'Rice')
+
+    def test_unknown_fields_are_a_bad_request(self):
+        response = self.client.get('/api/expenses/', {'fields': 'id,secret', 'expand': 'supplier'})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.json()), {'fields', 'expand'})
+
+
+# ====================== SEARCH ======================
+class ExpenseSearchTests(APITestCase):
+
+    def setUp(self):
+        for description, supplier in [('Rice and beans', 'Market'), ('Crayons', 'Bookshop'), ('Rice cooker', 'Bookshop')]:
+            Expense.objects.create(
+                date=date(2026, 1, 10), description=description, supplier=supplier, category='Food',
+                payment_source='cash',
+            )
+
+    def search(self, term):
+        response = self.client.get('/api/expenses/', {'search': term})
+        return sorted(row['description'] for row in response.json()['results'])
+
+    def test_every_term_matches_as_a_prefix(self):
+        self.assertEqual(self.search('ric'), ['Rice and beans', 'Rice cooker'])
+        self.assertEqual(self.search('rice book'), ['Rice cooker'])
+        self.assertEqual(self.search('"unknown'), [])
+
+    def test_index_follows_updates_and_deletes(self):
+        Expense.objects.filter(description='Crayons').update(description='Rice paper')
+        Expense.objects.filter(description='Rice cooker').delete()
+
+        self.assertEqual(self.search('rice'), ['Rice and beans', 'Rice paper'])
+        self.assertEqual(self.search('crayons'), [])
+
+
+# ====================== INVOICES ======================
+def pdf_upload(name='scan.pdf', content=b'%PDF-1.4 scan'):
+    return SimpleUploadedFile(name, content, content_type='application/pdf')
+
+
+def png_upload(name='scan.png', color='white'):
+    output = BytesIO()
+    Image.new('RGB', (800, 600), color).save(output, format='PNG')
+    return SimpleUploadedFile(name, output.getvalue(), content_type='image/png')
+
+
+class MediaRootMixin:
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name))
+
+    def create_expense(self, invoice):
+        return Expense.objects.create(
+            date=date(2026, 1, 10), description='Invoice', category='Food', payment_source='cash', invoice=invoice,
+        )
+
+
+@override_settings(INVOICE_THUMBNAIL_WORKER='command')
+class InvoiceStorageTests(MediaRootMixin, TestCase):
+
+    def age(self, name, hours):
+        past = time.time() - hours * 3600
+        os.utime(invoice_storage.path(name), (past, past))
+
+    def purge(self):
+        call_command('purge_invoice_blobs', min_age=1, stdout=StringIO())
+        return set(invoice_storage.blob_names())
+
+    def test_same_bytes_share_a_blob(self):
+        first = self.create_expense(pdf_upload('scan.pdf'))
+        second = self.create_expense(pdf_upload('Copy of scan.PDF'))
+
+        self.assertEqual(first.invoice.name, second.invoice.name)
+        self.assertRegex(first.invoice.name, r'^invoices/sha256/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.pdf$')
+        self.assertEqual((first.invoice_name, second.invoice_name), ('scan.pdf', 'Copy of scan.PDF'))
+        self.assertEqual(list(invoice_storage.blob_names()), [first.invoice.name])
+
+    def test_purge_keeps_referenced_and_recent_blobs(self):
+        referenced = self.create_expense(pdf_upload()).invoice.name
+        orphan = invoice_storage.save('orphan.pdf', ContentFile(b'orphan'))
+        recent = invoice_storage.save('recent.pdf', ContentFile(b'recent'))
+        self.age(referenced, 48)
+        self.age(orphan, 48)
+
+        self.assertEqual(self.purge(), {referenced, recent})
+
+    def test_reupload_restarts_the_grace_period(self):
+        orphan = invoice_storage.save('orphan.pdf', ContentFile(b'orphan'))
+        self.age(orphan, 48)
+
+        # An expense about to be saved with the same file
+        self.assertEqual(invoice_storage.save('again.pdf', ContentFile(b'orphan')), orphan)
+
+        self.assertEqual(self.purge(), {orphan})
+
+    def test_dedupe_moves_legacy_files(self):
+        legacy = 'invoices/receipt.pdf'
+        os.makedirs(invoice_storage.path('invoices'))
+        with open(invoice_storage.path(legacy), 'wb') as legacy_file:
+            legacy_file.write(pdf_upload().read())
+        expenses = [self.create_expense(None), self.create_expense(None)]
+        Expense.objects.filter(pk__in=[expense.pk for expense in expenses]).update(invoice=legacy)
+
+        call_command('dedupe_invoices', delete_originals=True, stdout=StringIO())
+
+        blob = invoice_storage.save('receipt.pdf', pdf_upload())
+        self.assertEqual(set(Expense.objects.values_list('invoice', 'invoice_name')), {(blob, 'receipt.pdf')})
+        self.assertFalse(os.path.exists(invoice_storage.path(legacy)))
+
+
+@override_settings(INVOICE_THUMBNAIL_WORKER='command')
+class InvoiceDownloadTests(MediaRootMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.expense = self.create_expense(pdf_upload('March receipt.pdf', b'0123456789'))
+        self.url = f'/api/expenses/{self.expense.pk}/invoice/'
+
+    def test_whole_file(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Disposition'], 'inline; filename="March receipt.pdf"')
+        self.assertIn(response['ETag'].strip('"'), self.expense.invoice.name)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_ranges(self):
+        for header, content, content_range in [
+            ('bytes=2-5', b'2345', 'bytes 2-5/10'),
+            ('bytes=7-', b'789', 'bytes 7-9/10'),
+            ('bytes=-3', b'789', 'bytes 7-9/10'),
+        ]:
+            response = self.client.get(self.url, HTTP_RANGE=header)
+
+            self.assertEqual(response.status_code, 206, header)
+            self.assertEqual(b''.join(response.streaming_content), content)
+            self.assertEqual(response['Content-Range'], content_range)
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-')
+
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */10')
+
+    def test_stale_if_range_gets_the_whole_file(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2-5', HTTP_IF_RANGE='"stale"')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+
+    @override_settings(INVOICE_SENDFILE_BACKEND='x-accel-redirect', INVOICE_ACCEL_REDIRECT_PREFIX='/protected/')
+    def test_sendfile_hands_off_to_the_front_server(self):
+        response = self.client.get(self.url, {'download': '1'})
+
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected/{self.expense.invoice.name}')
+        self.assertEqual(response.content, b'')
+        self.assertTrue(response['Content-Disposition'].startswith('attachment;'))
+
+    def test_expense_without_invoice(self):
+        expense = self.create_expense(None)
+
+        self.assertEqual(self.client.get(f'/api/expenses/{expense.pk}/invoice/').status_code, 404)
+
+
+@skipUnless(Image, 'Pillow is not installed')
+@override_settings(INVOICE_THUMBNAIL_WORKER='command')
+class ThumbnailJobTests(MediaRootMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.expense = self.create_expense(png_upload())
+        self.job = ThumbnailJob.objects.get(expense=self.expense)
+
+    def test_image_invoice_gets_thumbnail_and_preview(self):
+        self.assertEqual(thumbnails.process_pending_jobs(), 1)
+
+        self.expense.refresh_from_db()
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, 'done')
+        with self.expense.invoice_thumbnail.open('rb') as thumbnail:
+            self.assertEqual(Image.open(thumbnail).size, (320, 240))
+
+    def test_failed_attempts_are_retried_after_a_delay(self):
+        retries = []
+        with mock.patch.object(thumbnails, 'render_derivatives', side_effect=OSError('truncated')):
+            for attempt in range(1, thumbnails.MAX_ATTEMPTS + 1):
+                thumbnails.process_job(self.job.pk, retry=lambda *args: retries.append(args))
+                self.job.refresh_from_db()
+                self.assertEqual(self.job.attempts, attempt)
+
+                # Not due again until its delay has passed
+                self.assertEqual(thumbnails.process_pending_jobs(), 0)
+                ThumbnailJob.objects.filter(pk=self.job.pk).update(
+                    updated_at=timezone.now() - thumbnails.retry_delay(attempt)
+                )
+
+        self.assertEqual(self.job.status, 'failed')
+        self.assertEqual(retries, [(self.job.pk, 1), (self.job.pk, 2)])
+
+    def test_thread_worker_resubmits_a_failed_attempt(self):
+        with mock.patch.object(thumbnails, 'render_derivatives', side_effect=OSError('truncated')), \
+                mock.patch.object(thumbnails, 'connections'), \
+                mock.patch.object(thumbnails, '_retry_later') as retry_later:
+            thumbnails._run_in_thread(self.job.pk)
+
+        retry_later.assert_called_once_with(self.job.pk, 1)
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, 'pending')
+
+    def test_replaced_invoice_is_skipped(self):
+        Expense.objects.filter(pk=self.expense.pk).update(invoice='invoices/other.png')
+
+        thumbnails.process_pending_jobs()
+
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, 'skipped')
+
+
+# ====================== VALUES ROWS ======================
+@override_settings(INVOICE_THUMBNAIL_WORKER='command')
+class ValuesRowsTests(MediaRootMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        Account.objects.create(account_type='cash', balance=Decimal('1000.00'))
+        self.client.post('/api/expenses/', expense_payload(supplier='Market', remarks=None), format='json')
+        self.client.post('/api/expenses/', expense_payload(items=[]), format='json')
+        self.create_expense(pdf_upload())
+        self.client.post('/api/income/', {
+            'date': '2026-01-10', 'description': 'Fee', 'category': 'tuition_fee', 'amount': '100.00',
+            'amount_paid': '40.00', 'payment_source': 'cash', 'transaction_type': 'receivable',
+        }, format='json')
+
+    def test_same_response_as_the_serializers(self):
+        self.assertIsNotNone(ValuesSerializer.for_serializer(ExpenseSerializer()))
+        for url, params in [
+            ('/api/expenses/', {}),
+            ('/api/expenses/', {'pagination': 'cursor', 'page_size': 2}),
+            ('/api/expenses/', {'fields': 'id,invoice,created_at', 'expand': 'items'}),
+            ('/api/income/', {}),
+        ]:
+            fast = self.client.get(url, params)
+            with override_settings(API_FAST_SERIALIZATION=False):
+                slow = self.client.get(url, params)
+
+            self.assertEqual(fast.status_code, 200)
+            self.assertEqual(fast.content, slow.content, (url, params))
+
+
+# ====================== ASYNC READS ======================
+class AsyncReadTests(APITestCase):
+
+    def setUp(self):
+        Account.objects.create(account_type='cash', balance=Decimal('1000.00'))
+        for day, category in [('2026-01-10', 'Food'), ('2026-01-12', 'Supplies'), ('2026-02-03', 'Food')]:
+            self.client.post('/api/expenses/', expense_payload(date=day, category=category), format='json')
+
+    async def assertSameAsSync(self, path, params=None):
+        expected = await sync_to_async(self.client.get)(f'/api{path}', params)
+        response = await self.async_client.get(f'/api/async{path}', params)
+
+        self.assertEqual(response.status_code, 200, path)
+        # Page links point back at the async endpoint
+        data = json.loads(response.content.decode().replace('/api/async/', '/api/'))
+        self.assertEqual(data, expected.json(), (path, params))
+        return data
+
+    async def test_lists_match_the_sync_views(self):
+        await self.assertSameAsSync('/expenses/', {'category': 'Food', 'page_size': 1})
+        await self.assertSameAsSync('/expenses/', {'ordering': 'date', 'search': 'groceries'})
+        await self.assertSameAsSync('/expenses/', {'pagination': 'cursor', 'page_size': 2})
+        await self.assertSameAsSync('/income/')
+        accounts = await self.assertSameAsSync('/accounts/')
+        self.assertEqual(accounts[0]['balance'], 940.0)
+
+    async def test_reports_match_the_sync_views(self):
+        for name in ('daily', 'monthly', 'category'):
+            await self.assertSameAsSync(f'/expenses/reports/{name}/', {'date__gte': '2026-01-11'})
+
+    async def test_bad_filter_is_a_bad_request(self):
+        response = await self.async_client.get('/api/async/expenses/', {'date__gte': 'soon'})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('date__gte', response.json())
+
+
+# ====================== ACCOUNTS ======================
+class AccountListTests(APITestCase):
+
+    def setUp(self):
+        Account.objects.create(account_type='cash', balance=Decimal('100.00'))
+
+    def test_unchanged_list_is_not_modified(self):
+        for url in ('/api/accounts/', '/api/async/accounts/'):
+            etag = self.client.get(url)['ETag']
+
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+            self.assertEqual(response.status_code, 304, url)
+
+    def test_balance_change_from_another_worker_changes_the_etag(self):
+        # Nothing in this process is told about the change
+        response = self.client.get('/api/accounts/')
+        Account.objects.filter(account_type='cash').update(balance=Decimal('75.00'))
+
+        for url in ('/api/accounts/', '/api/async/accounts/'):
+            changed = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+            self.assertEqual(changed.status_code, 200, url)
+            self.assertEqual(changed.json()[0]['balance'], 75.0)
+
+    def test_shared_cache_answers_without_the_database(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory,
+        }}):
+            etag = self.client.get('/api/accounts/')['ETag']
+            with self.assertNumQueries(0):
+                self.assertEqual(self.client.get('/api/accounts/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post('/api/expenses/', expense_payload(), format='json')
+            response = self.client.get('/api/accounts/', HTTP_IF_NONE_MATCH=etag)
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()[0]['balance'], 80.0)
@@ -0,0 +1,183 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Expense, ThumbnailJob
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # thumbnails are optional; jobs wait for Pillow
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_SIZE = (320, 320)
+THUMBNAIL_QUALITY = 70
+PREVIEW_SIZE = (1600, 1600)
+PREVIEW_QUALITY = 82
+MAX_ATTEMPTS = 3
+RETRY_DELAY = timedelta(seconds=30)  # before the second attempt; doubles after that
+
+_executor = None
+
+
+# ====================== RENDERING ======================
+def _render_jpeg(image, size, quality):
+    copy = image.copy()
+    copy.thumbnail(size, Image.Resampling.LANCZOS)
+    output = BytesIO()
+    copy.save(output, format='JPEG', quality=quality, optimize=True, progressive=True)
+    return output.getvalue()
+
+
+def render_derivatives(invoice_file):
+    # (thumbnail bytes, preview bytes), or None when the file isn't an image
+    try:
+        with Image.open(invoice_file) as original:
+            # Phone photos carry their rotation in EXIF
+            image = ImageOps.exif_transpose(original)
+            if image.mode != 'RGB':
+                image = image.convert('RGB')
+            return (
+                _render_jpeg(image, THUMBNAIL_SIZE, THUMBNAIL_QUALITY),
+                _render_jpeg(image, PREVIEW_SIZE, PREVIEW_QUALITY),
+            )
+    except Image.UnidentifiedImageError:
+        return None
+
+
+# ====================== QUEUE ======================
+def enqueue_thumbnail_job(expense):
+    job = ThumbnailJob.objects.create(expense=expense, source=expense.invoice.name)
+    if getattr(settings, 'INVOICE_THUMBNAIL_WORKER', 'thread') == 'thread' and Image is not None:
+        transaction.on_commit(lambda: _submit(job.pk))
+    return job
+
+
+def _submit(job_id):
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'INVOICE_THUMBNAIL_THREADS', 2),
+            thread_name_prefix='invoice-thumbnails',
+        )
+    _executor.submit(_run_in_thread, job_id)
+
+
+def _run_in_thread(job_id):
+    try:
+        process_job(job_id, retry=_retry_later)
+    except Exception as exc:
+        logger.exception("Thumbnail job %s crashed", job_id)
+        attempts = (
+            ThumbnailJob.objects.filter(pk=job_id, status='processing')
+            .values_list('attempts', flat=True).first()
+        )
+        if attempts is not None:
+            _fail_attempt(job_id, attempts, str(exc), retry=_retry_later)
+    finally:
+        # Worker threads get their own connections; don't leak them
+        connections.close_all()
+
+
+def retry_delay(attempts):
+    return RETRY_DELAY * 2 ** (attempts - 1)
+
+
+def _retry_later(job_id, attempts):
+    timer = threading.Timer(retry_delay(attempts).total_seconds(), _submit, [job_id])
+    timer.daemon = True
+    timer.start()
+
+
+def _finish(job_id, status, error=''):
+    ThumbnailJob.objects.filter(pk=job_id).update(
+        status=status, error=error, updated_at=timezone.now()
+    )
+
+
+def _fail_attempt(job_id, attempts, error, retry=None):
+    # Back to 'pending' until the last attempt; retry(job_id, attempts)
+    # schedules the next one
+    if attempts >= MAX_ATTEMPTS:
+        _finish(job_id, 'failed', error)
+        return
+    _finish(job_id, 'pending', error)
+    if retry is not None:
+        retry(job_id, attempts)
+
+
+def process_job(job_id, retry=None):
+    # Only one worker wins the pending -> processing transition
+    claimed = ThumbnailJob.objects.filter(pk=job_id, status='pending').update(
+        status='processing', attempts=F('attempts') + 1, updated_at=timezone.now()
+    )
+    if not claimed:
+        return False
+
+    job = ThumbnailJob.objects.select_related('expense').filter(pk=job_id).first()
+    if job is None:
+        return False
+
+    expense = job.expense
+    if expense.invoice.name != job.source:
+        _finish(job_id, 'skipped', "Invoice replaced before processing.")
+        return True
+
+    try:
+        with expense.invoice.open('rb') as invoice_file:
+            derivatives = render_derivatives(invoice_file)
+    except Exception as exc:
+        logger.warning("Thumbnail job %s failed: %s", job_id, exc)
+        _fail_attempt(job_id, job.attempts, str(exc), retry=retry)
+        return True
+
+    if derivatives is None:
+        _finish(job_id, 'skipped', "Not an image.")
+        return True
+
+    thumbnail, preview = derivatives
+    storage = Expense._meta.get_field('invoice_thumbnail').storage
+    thumbnail_name = storage.save('thumbnail.jpg', ContentFile(thumbnail))
+    preview_name = storage.save('preview.jpg', ContentFile(preview))
+
+    # update() keeps post_save quiet and won't overwrite a newer invoice's copies
+    Expense.objects.filter(pk=expense.pk, invoice=job.source).update(
+        invoice_thumbnail=thumbnail_name,
+        invoice_preview=preview_name,
+    )
+    _finish(job_id, 'done')
+    return True
+
+
+def requeue_stale_jobs(older_than=timedelta(minutes=10)):
+    # Jobs left 'processing' by a worker that died mid-run
+    return ThumbnailJob.objects.filter(
+        status='processing',
+        updated_at__lt=timezone.now() - older_than,
+        attempts__lt=MAX_ATTEMPTS,
+    ).update(status='pending', updated_at=timezone.now())
+
+
+def due_jobs():
+    # Pending jobs whose retry delay, if any, has passed
+    now = timezone.now()
+    due = Q(attempts=0)
+    for attempts in range(1, MAX_ATTEMPTS):
+        due |= Q(attempts=attempts, updated_at__lte=now - retry_delay(attempts))
+    return ThumbnailJob.objects.filter(due, status='pending')
+
+
+def process_pending_jobs(limit=None):
+    job_ids = due_jobs().values_list('pk', flat=True)
+    if limit:
+        job_ids = job_ids[:limit]
+    return sum(1 for job_id in list(job_ids) if process_job(job_id))
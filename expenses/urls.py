@@ -1,5 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from .async_views import AsyncAccountListView, AsyncExpenseListView, AsyncExpenseReportView
 from .views import ExpenseViewSet, AccountViewSet
 
 router = DefaultRouter()
@@ -40,4 +41,23 @@ urlpatterns = [
         ExpenseViewSet.as_view({'get': 'category_report'}),
         name='expense-category-report'
     ),
+
+    # Async (ASGI) versions of the read endpoints above
+    path('async/accounts/', AsyncAccountListView.as_view(), name='async-accounts-list'),
+    path('async/expenses/', AsyncExpenseListView.as_view(), name='async-expenses-list'),
+    path(
+        'async/expenses/reports/daily/',
+        AsyncExpenseReportView.as_view(action='daily_report'),
+        name='async-expense-daily-report'
+    ),
+    path(
+        'async/expenses/reports/monthly/',
+        AsyncExpenseReportView.as_view(action='monthly_report'),
+        name='async-expense-monthly-report'
+    ),
+    path(
+        'async/expenses/reports/category/',
+        AsyncExpenseReportView.as_view(action='category_report'),
+        name='async-expense-category-report'
+    ),
 ]
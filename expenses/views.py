@@ -2,18 +2,40 @@ import json
 from decimal import Decimal
 
 from django.db import transaction
-from django.db.models import Sum
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDay, TruncMonth
+from django.core.cache import cache
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.utils.http import parse_etags, quote_etag
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import viewsets
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
 from rest_framework.filters import OrderingFilter, SearchFilter
 from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.viewsets import ReadOnlyModelViewSet
+from django_filters.utils import translate_validation
 from .filters import ExpenseFilter   # ← NEW IMPORT
-
+from finances.filters import DailyRollupFilter
+from finances.idempotency import IdempotentMixin
+from finances.models import DailyRollup
+from finances.periods import merge_report_rows, open_rollups, snapshot_rollups
+from finances.services import apply_rollup_deltas, collect_expense_deltas
+
+from .downloads import file_download_response
+from .exports import EXPENSE_EXPORT_FIELDS, expense_export_rows, export_response
+from .fieldsets import SparseFieldsetMixin
+from .imports import get_batch_size, import_expenses, iter_upload_rows
+from .ledger import balance_at
 from .models import Account, Expense
-from .serializers import AccountSerializer, ExpenseSerializer
-from .services import apply_expense, get_account, rollback_expense
+from .pagination import ExpenseCursorPagination, SelectablePaginationMixin
+from .rows import ValuesListMixin
+from .search import FullTextSearchFilter
+from .serializers import AccountSerializer, ExpenseListSerializer, ExpenseSerializer
+from .services import InsufficientBalance, apply_expense, get_accounts_version, rollback_expense
 
 
 # -----------------------------
@@ -23,16 +45,48 @@ class AccountViewSet(ReadOnlyModelViewSet):
     queryset = Account.objects.all()
     serializer_class = AccountSerializer
 
+    # The list is cached per accounts version; the version changes whenever
+    # a balance does, so cached entries never need explicit deletion. See
+    # get_accounts_version() for where the version comes from.
+    list_cache_timeout = 60 * 60
+
     def list(self, request, *args, **kwargs):
+        version = get_accounts_version()
+        headers = self.list_headers(version)
+        if self.not_modified(request, headers):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        cache_key = self.list_cache_key(version)
+        data = cache.get(cache_key)
+        if data is None:
+            data = self._build_list()
+            cache.set(cache_key, data, self.list_cache_timeout)
+
+        return Response(data, headers=headers)
+
+    @staticmethod
+    def list_headers(version):
+        return {"ETag": quote_etag(f"accounts-{version}"), "Cache-Control": "no-cache"}
+
+    @staticmethod
+    def list_cache_key(version):
+        return f"expenses:accounts:list:{version}"
+
+    @staticmethod
+    def not_modified(request, headers):
+        if_none_match = parse_etags(request.headers.get("If-None-Match", ""))
+        return headers["ETag"] in if_none_match or "*" in if_none_match
+
+    def _build_list(self):
         queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
+        return self.list_rows(queryset, queryset.aggregate(total=Sum("balance"))["total"])
+
+    def list_rows(self, accounts, total_balance):
+        serializer = self.get_serializer(accounts, many=True)
 
         accounts_data = serializer.data
 
-        total_balance = (
-            queryset.aggregate(total=Sum("balance"))["total"]
-            or Decimal("0")
-        )
+        total_balance = total_balance or Decimal("0")
 
         combined_account = {
             "id": "combined",
@@ -41,17 +95,53 @@ class AccountViewSet(ReadOnlyModelViewSet):
             "balance": total_balance,
         }
 
-        return Response([combined_account] + accounts_data)
+        return [combined_account] + [dict(account) for account in accounts_data]
+
+    @action(detail=True, methods=["get"], url_path="balance-at")
+    def balance_at(self, request, pk=None, *args, **kwargs):
+        date_param = request.query_params.get("date")
+        if date_param:
+            try:
+                date = parse_date(date_param)
+            except ValueError:
+                date = None
+            if date is None:
+                raise ValidationError({"date": ["Use the YYYY-MM-DD format."]})
+        else:
+            date = timezone.localdate()
+
+        # "combined" mirrors the synthetic row returned by list()
+        if pk == "combined":
+            accounts = list(self.get_queryset())
+            account_type = "combined"
+            account_id = "combined"
+        else:
+            account = self.get_object()
+            accounts = [account]
+            account_type = account.account_type
+            account_id = account.id
+
+        balance = sum((balance_at(account, date) for account in accounts), Decimal("0"))
+
+        return Response({
+            "id": account_id,
+            "account_type": account_type,
+            "date": date,
+            "balance": balance,
+        })
 
 
 # -----------------------------
 # EXPENSE VIEWSET
 # -----------------------------
-class ExpenseViewSet(viewsets.ModelViewSet):
+class ExpenseViewSet(IdempotentMixin, ValuesListMixin, SparseFieldsetMixin, SelectablePaginationMixin, viewsets.ModelViewSet):
     queryset = Expense.objects.prefetch_related("items").all()
     serializer_class = ExpenseSerializer
+    list_serializer_class = ExpenseListSerializer
+    expandable_fields = {"items": "items"}
+    cursor_pagination_class = ExpenseCursorPagination
 
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, OrderingFilter]
     filterset_class = ExpenseFilter
     search_fields = ["description", "supplier", "category", "remarks"]
     ordering_fields = ["date", "total_expense"]
@@ -59,97 +149,200 @@ class ExpenseViewSet(viewsets.ModelViewSet):
     # -------------------------
     # CREATE
     # -------------------------
-    @transaction.atomic
-    def perform_create(self, serializer):
-        expense = serializer.save()
-
+    def _apply_payment(self, expense, insufficient_message):
+        # One guarded UPDATE covers the funds check and the deduction
         if expense.payment_source == "combined":
             cash_amount = Decimal(self.request.data.get("cash_amount", 0))
             bank_amount = Decimal(self.request.data.get("bank_amount", 0))
 
             if cash_amount + bank_amount != expense.total_expense:
                 raise ValidationError({"detail": "Cash + Bank must equal total expense."})
-
-            cash_account = get_account("cash")
-            bank_account = get_account("bank")
-
-            if cash_account.balance < cash_amount:
-                raise ValidationError({"detail": "Insufficient cash balance."})
-
-            if bank_account.balance < bank_amount:
-                raise ValidationError({"detail": "Insufficient bank balance."})
-
-            apply_expense(cash_amount, "cash")
-            apply_expense(bank_amount, "bank")
-
         else:
-            account = get_account(expense.payment_source)
-
-            if account.balance < expense.total_expense:
-                raise ValidationError({"detail": "Insufficient balance in selected account."})
+            cash_amount = bank_amount = 0
+
+        try:
+            apply_expense(
+                expense.total_expense,
+                expense.payment_source,
+                cash_amount,
+                bank_amount,
+                date=expense.date,
+                check_funds=True,
+            )
+        except InsufficientBalance as exc:
+            if expense.payment_source == "combined":
+                raise ValidationError({"detail": f"Insufficient {exc.account_type} balance{insufficient_message}."})
+            raise ValidationError({"detail": f"Insufficient balance{insufficient_message or ' in selected account'}."})
 
-            apply_expense(expense.total_expense, expense.payment_source)
+    @transaction.atomic
+    def perform_create(self, serializer):
+        expense = serializer.save()
+        self._apply_payment(expense, "")
+        apply_rollup_deltas(collect_expense_deltas([expense]))
 
     # -------------------------
     # UPDATE
     # -------------------------
     @transaction.atomic
     def perform_update(self, serializer):
-        old_expense = self.get_object()
+        # Locked so concurrent edits of one expense roll back its amounts once
+        old_expense = get_object_or_404(Expense.objects.select_for_update(), pk=serializer.instance.pk)
 
         # Rollback OLD transaction first
         if old_expense.payment_source == "combined":
             old_cash = Decimal(self.request.data.get("cash_amount", 0))
             old_bank = Decimal(self.request.data.get("bank_amount", 0))
-
-            rollback_expense(old_cash, "cash")
-            rollback_expense(old_bank, "bank")
         else:
-            rollback_expense(old_expense.total_expense, old_expense.payment_source)
+            old_cash = old_bank = 0
+
+        rollback_expense(
+            old_expense.total_expense,
+            old_expense.payment_source,
+            old_cash,
+            old_bank,
+            date=old_expense.date,
+        )
 
         expense = serializer.save()
+        self._apply_payment(expense, " after update")
 
-        if expense.payment_source == "combined":
-            cash_amount = Decimal(self.request.data.get("cash_amount", 0))
-            bank_amount = Decimal(self.request.data.get("bank_amount", 0))
-
-            if cash_amount + bank_amount != expense.total_expense:
-                raise ValidationError({"detail": "Cash + Bank must equal total expense."})
-
-            cash_account = get_account("cash")
-            bank_account = get_account("bank")
-
-            if cash_account.balance < cash_amount:
-                raise ValidationError({"detail": "Insufficient cash balance after update."})
-
-            if bank_account.balance < bank_amount:
-                raise ValidationError({"detail": "Insufficient bank balance after update."})
-
-            apply_expense(cash_amount, "cash")
-            apply_expense(bank_amount, "bank")
-
-        else:
-            account = get_account(expense.payment_source)
-
-            if account.balance < expense.total_expense:
-                raise ValidationError({"detail": "Insufficient balance after update."})
-
-            apply_expense(expense.total_expense, expense.payment_source)
+        deltas = collect_expense_deltas([old_expense], sign=-1)
+        apply_rollup_deltas(collect_expense_deltas([expense], deltas=deltas))
 
     # -------------------------
     # DELETE
     # -------------------------
     @transaction.atomic
     def perform_destroy(self, instance):
+        instance = get_object_or_404(Expense.objects.select_for_update(), pk=instance.pk)
 
         if instance.payment_source == "combined":
             # We assume frontend always sends correct split again if needed
             cash_amount = Decimal(self.request.data.get("cash_amount", 0))
             bank_amount = Decimal(self.request.data.get("bank_amount", 0))
+        else:
+            cash_amount = bank_amount = 0
+
+        rollback_expense(
+            instance.total_expense,
+            instance.payment_source,
+            cash_amount,
+            bank_amount,
+            date=instance.date,
+        )
 
-            rollback_expense(cash_amount, "cash")
-            rollback_expense(bank_amount, "bank")
+        apply_rollup_deltas(collect_expense_deltas([instance], sign=-1))
+        instance.delete()
+
+    # -------------------------
+    # BULK IMPORT
+    # -------------------------
+    @action(detail=False, methods=["post"], url_path="bulk")
+    def bulk(self, request, *args, **kwargs):
+        upload = request.FILES.get("file")
+        if upload is None:
+            raise ValidationError({"file": ["Upload a CSV or NDJSON file."]})
+
+        report = import_expenses(
+            iter_upload_rows(upload),
+            batch_size=get_batch_size(request.query_params.get("batch_size")),
+        )
+        response_status = status.HTTP_201_CREATED if report["created"] else status.HTTP_400_BAD_REQUEST
+        return Response(report, status=response_status)
+
+    # -------------------------
+    # EXPORT
+    # -------------------------
+    @action(detail=False, methods=["get"], url_path="export")
+    def export(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return export_response(
+            expense_export_rows(queryset),
+            EXPENSE_EXPORT_FIELDS,
+            request.query_params.get("file_format", "csv"),
+            "expenses",
+        )
+
+    # -------------------------
+    # INVOICE DOWNLOAD
+    # -------------------------
+    @action(detail=True, methods=["get"], url_path="invoice")
+    def invoice(self, request, pk=None, *args, **kwargs):
+        expense = self.get_object()
+        if not expense.invoice:
+            raise Http404("This expense has no invoice.")
+        return file_download_response(
+            request,
+            expense.invoice,
+            as_attachment=request.query_params.get("download") in ("1", "true"),
+            filename=expense.invoice_name,
+        )
+
+    # -------------------------
+    # REPORTS
+    # -------------------------
+    def _rollup_queryset(self, queryset):
+        filterset = DailyRollupFilter(
+            self.request.query_params,
+            queryset=queryset.filter(kind="expense"),
+            request=self.request,
+        )
+        if not filterset.is_valid():
+            raise translate_validation(filterset.errors)
+        return filterset.qs
+
+    def _report(self, group_field, group_expression=None):
+        rows = [row for queryset in self.report_rows(group_field, group_expression) for row in queryset]
+        return Response(self.report_payload(rows, group_field))
+
+    def report_rows(self, group_field, group_expression=None):
+        # One grouped queryset per source; report_payload() merges them
+        if self.request.query_params.get(SearchFilter.search_param):
+            # Free-text search can't be answered from the rollup table
+            queryset = self.filter_queryset(self.get_queryset())
+            querysets = [queryset.prefetch_related(None)]
+            total, count = Sum("total_expense"), Count("id")
         else:
-            rollback_expense(instance.total_expense, instance.payment_source)
+            # Closed months are read from their snapshot
+            querysets = [
+                self._rollup_queryset(open_rollups(DailyRollup.objects.all())),
+                self._rollup_queryset(snapshot_rollups()),
+            ]
+            total, count = Sum("total"), Sum("count")
+
+        grouped = []
+        for queryset in querysets:
+            queryset = queryset.order_by()
+            if group_expression is not None:
+                queryset = queryset.annotate(**{group_field: group_expression})
+            grouped.append(
+                queryset.values(group_field)
+                .annotate(total_expense=total, count=count)
+                .order_by(group_field)
+            )
+        return grouped
+
+    @staticmethod
+    def report_payload(rows, group_field):
+        results = merge_report_rows(rows, (group_field,), ("total_expense", "count"))
+        return {
+            "results": results,
+            "total_expense": sum((row["total_expense"] or Decimal("0") for row in results), Decimal("0")),
+            "count": sum(row["count"] for row in results),
+        }
+
+    # action -> (group field, group expression)
+    REPORTS = {
+        "daily_report": ("day", TruncDay("date")),
+        "monthly_report": ("month", TruncMonth("date")),
+        "category_report": ("category", None),
+    }
+
+    def daily_report(self, request, *args, **kwargs):
+        return self._report(*self.REPORTS["daily_report"])
+
+    def monthly_report(self, request, *args, **kwargs):
+        return self._report(*self.REPORTS["monthly_report"])
 
-        instance.delete()
\ No newline at end of file
+    def category_report(self, request, *args, **kwargs):
+        return self._report(*self.REPORTS["category_report"])
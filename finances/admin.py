@@ -1,3 +1,39 @@
 from django.contrib import admin
+from .models import ChangeEvent, ClosedPeriod, DailyRollup, IdempotencyKey, PeriodTotal
 
-# Register your models here.
+@admin.register(DailyRollup)
+class DailyRollupAdmin(admin.ModelAdmin):
+    list_display = ('date', 'kind', 'category', 'payment_source', 'total', 'count')
+    list_filter = ('kind', 'payment_source')
+
+@admin.register(IdempotencyKey)
+class IdempotencyKeyAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'scope', 'key', 'status_code')
+    search_fields = ('key',)
+
+@admin.register(ChangeEvent)
+class ChangeEventAdmin(admin.ModelAdmin):
+    list_display = ('id', 'created_at', 'topic', 'action')
+    list_filter = ('topic', 'action')
+
+class PeriodTotalInline(admin.TabularInline):
+    model = PeriodTotal
+    extra = 0
+    can_delete = False
+    readonly_fields = ('kind', 'date', 'category', 'payment_source', 'vat_rate', 'total', 'count')
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+@admin.register(ClosedPeriod)
+class ClosedPeriodAdmin(admin.ModelAdmin):
+    list_display = ('month', 'closed_at')
+    inlines = [PeriodTotalInline]
+
+    def has_add_permission(self, request):
+        # Closing takes the snapshot: POST /api/periods/
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        # Reopening checks the later periods: DELETE /api/periods/<month>/
+        return False
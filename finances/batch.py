@@ -0,0 +1,148 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from expenses.imports import MAX_BATCH_SIZE, error_detail, expense_split
+from expenses.models import Expense, ExpenseItem
+from expenses.serializers import ExpenseSerializer
+from expenses.services import InsufficientBalance, post_balance_changes
+from incomes.imports import income_split
+from incomes.models import Income
+from incomes.serializers import IncomeSerializer
+
+from .events import publish_change
+from .periods import closed_period_error, closed_until, ensure_open
+from .services import apply_rollup_deltas, collect_expense_deltas, collect_income_deltas
+
+TRANSACTION_TYPES = ('expense', 'income')
+
+
+# ====================== VALIDATION ======================
+def _validate_expense(payload):
+    serializer = ExpenseSerializer(data=payload)
+    if not serializer.is_valid():
+        return None, serializer.errors
+
+    try:
+        expense, items, cash_amount, bank_amount = serializer.build_expense(serializer.validated_data)
+    except ValidationError as exc:
+        return None, error_detail(exc)
+
+    split = expense_split(expense, cash_amount, bank_amount)
+    if split is None:
+        return None, {"detail": ["Cash + Bank must equal total expense."]}
+    return (expense, items, split), None
+
+
+def _validate_income(payload, seen_references):
+    serializer = IncomeSerializer(data=payload)
+    if not serializer.is_valid():
+        return None, serializer.errors
+
+    income = Income(**serializer.validated_data)
+    income.calculate_balance()
+
+    # The unique validator only sees rows that are already saved
+    if income.reference_number:
+        if income.reference_number in seen_references:
+            return None, {"reference_number": ["Duplicate reference number in batch."]}
+        seen_references.add(income.reference_number)
+    return (income, income_split(income)), None
+
+
+def validate_batch(entries):
+    # Returns (validated entries, errors); every entry is checked so the
+    # client sees all problems at once
+    if not isinstance(entries, list) or not entries:
+        raise ValidationError({"transactions": ["Provide a non-empty list of transactions."]})
+    if len(entries) > MAX_BATCH_SIZE:
+        raise ValidationError({"transactions": [f"At most {MAX_BATCH_SIZE} transactions per batch."]})
+
+    validated, errors = [], []
+    seen_references = set()
+    closed = closed_until()
+
+    for index, entry in enumerate(entries):
+        if not isinstance(entry, dict) or entry.get('type') not in TRANSACTION_TYPES:
+            errors.append({"index": index, "errors": {"type": [f"Must be one of: {', '.join(TRANSACTION_TYPES)}."]}})
+            continue
+
+        payload = {key: value for key, value in entry.items() if key != 'type'}
+        if entry['type'] == 'expense':
+            result, error = _validate_expense(payload)
+        else:
+            result, error = _validate_income(payload, seen_references)
+
+        if not error and closed and result[0].date <= closed:
+            error = closed_period_error(result[0].date)
+
+        if error:
+            errors.append({"index": index, "errors": error})
+        else:
+            validated.append((index, entry['type'], result))
+
+    return validated, errors
+
+
+# ====================== APPLY ======================
+def apply_transaction_batch(validated):
+    # validated: the entries returned by validate_batch()
+    expenses, items, incomes = [], [], []
+    postings = defaultdict(Decimal)  # (account_type, date, entry_type) -> signed amount
+
+    for index, kind, result in validated:
+        if kind == 'expense':
+            expense, expense_items, (cash, bank) = result
+            expenses.append((index, expense))
+            items.extend(expense_items)
+            postings[('cash', expense.date, 'expense')] -= cash
+            postings[('bank', expense.date, 'expense')] -= bank
+        else:
+            income, (cash, bank) = result
+            incomes.append((index, income))
+            postings[('cash', income.date, 'income')] += cash
+            postings[('bank', income.date, 'income')] += bank
+
+    with transaction.atomic():
+        # The batch's months stay open until it commits
+        ensure_open(*(entry.date for _, entry in expenses + incomes))
+        Expense.objects.bulk_create([expense for _, expense in expenses])
+        ExpenseItem.objects.bulk_create(items)
+        Income.objects.bulk_create([income for _, income in incomes])
+
+        # One guarded UPDATE moves each account by the batch's net amount,
+        # so incomes in the batch can fund its expenses
+        try:
+            post_balance_changes(
+                [
+                    (account_type, amount, date, entry_type)
+                    # Incomes first so running balances in the ledger stay covered
+                    for (account_type, date, entry_type), amount in sorted(
+                        postings.items(), key=lambda posting: (posting[0][0], posting[0][1], posting[0][2] != 'income')
+                    )
+                ],
+                'expense',
+                check_funds=True,
+            )
+        except InsufficientBalance as exc:
+            raise ValidationError({"detail": str(exc)})
+
+        deltas = collect_income_deltas(income for _, income in incomes)
+        apply_rollup_deltas(collect_expense_deltas((expense for _, expense in expenses), deltas=deltas))
+
+        # bulk_create() sends no post_save signals
+        publish_change('expense', 'created', [expense.pk for _, expense in expenses])
+        publish_change('income', 'created', [income.pk for _, income in incomes])
+
+    results = [{"index": index, "type": "expense", "id": expense.pk} for index, expense in expenses]
+    results += [{"index": index, "type": "income", "id": income.pk} for index, income in incomes]
+    results.sort(key=lambda row: row["index"])
+
+    return {
+        "created": len(results),
+        "expenses": len(expenses),
+        "incomes": len(incomes),
+        "results": results,
+    }
@@ -0,0 +1,252 @@
+import asyncio
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from .models import ChangeEvent
+
+logger = logging.getLogger(__name__)
+
+TOPICS = ('accounts', 'expense', 'income')
+# Events a subscriber may fall behind before its stream is closed; the
+# client reconnects with Last-Event-ID and catches up from there
+MAX_QUEUED = 1000
+# Seconds a skipped event id is re-checked by the poller: a transaction
+# that took the id earlier may still be committing
+GAP_TIMEOUT = 30
+MAX_GAP = 100
+
+
+def events_backend():
+    # 'local': events reach subscribers of this process only (one worker).
+    # 'database': events are also written to ChangeEvent, which every
+    # worker polls.
+    return getattr(settings, 'EVENTS_BACKEND', 'local')
+
+
+# ====================== SUBSCRIPTIONS ======================
+class Subscription:
+    # One connected client; lives on the event loop that serves it
+
+    def __init__(self, loop, topics=()):
+        self.loop = loop
+        self.topics = set(topics)
+        self.queue = asyncio.Queue()
+        self.overflowed = False
+        # Ignore events up to this id: the poller can still be catching up
+        # on rows committed before the client connected
+        self.floor = 0
+        self._seen = deque(maxlen=MAX_QUEUED)
+        self._seen_ids = set()
+
+    def push(self, events):
+        # Any thread
+        try:
+            self.loop.call_soon_threadsafe(self.deliver, events)
+        except RuntimeError:
+            pass  # the loop has shut down
+
+    def deliver(self, events):
+        # Event loop thread only
+        for event in events:
+            if self.overflowed:
+                return
+            if event['id'] <= self.floor or (self.topics and event['topic'] not in self.topics):
+                continue
+            if not self.remember(event['id']):
+                continue
+            if self.queue.qsize() >= MAX_QUEUED:
+                self.overflowed = True
+                self.queue.put_nowait(None)
+                return
+            self.queue.put_nowait(event)
+
+    def remember(self, event_id):
+        # False for events already delivered (local publish and the
+        # database poller can both report the same event)
+        if event_id in self._seen_ids:
+            return False
+        if len(self._seen) == self._seen.maxlen:
+            self._seen_ids.discard(self._seen[0])
+        self._seen.append(event_id)
+        self._seen_ids.add(event_id)
+        return True
+
+
+# ====================== BROKER ======================
+class EventBroker:
+    # Per process, like the metrics registry
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscriptions = set()
+        self.pollers = {}  # event loop -> database poll task
+        # Local backend: replay buffer for Last-Event-ID, and ids that keep
+        # growing across restarts
+        self.history = deque(maxlen=MAX_QUEUED)
+        self.ids = itertools.count(int(time.time() * 1000) * 1000)
+
+    def subscribe(self, topics=()):
+        loop = asyncio.get_running_loop()
+        subscription = Subscription(loop, topics)
+        with self.lock:
+            self.subscriptions.add(subscription)
+            if events_backend() == 'database' and loop not in self.pollers:
+                self.pollers[loop] = loop.create_task(self._poll(loop))
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscriptions.discard(subscription)
+            if not any(other.loop is subscription.loop for other in self.subscriptions):
+                poller = self.pollers.pop(subscription.loop, None)
+                if poller is not None:
+                    poller.cancel()
+
+    def publish(self, changes):
+        # changes: (topic, action, data) tuples from one committed transaction
+        if events_backend() == 'database':
+            rows = ChangeEvent.objects.bulk_create(
+                [ChangeEvent(topic=topic, action=action, data=data) for topic, action, data in changes]
+            )
+            events = [row.as_event() for row in rows]
+        else:
+            now = timezone.now()
+            with self.lock:
+                events = [
+                    {'id': next(self.ids), 'topic': topic, 'action': action, 'data': data, 'created_at': now}
+                    for topic, action, data in changes
+                ]
+                self.history.extend(events)
+
+        with self.lock:
+            subscriptions = list(self.subscriptions)
+        for subscription in subscriptions:
+            subscription.push(events)
+        return events
+
+    async def latest_id(self):
+        if events_backend() == 'database':
+            return (await ChangeEvent.objects.aaggregate(last=Max('id')))['last'] or 0
+        return 0  # local events are pushed as they commit, never late
+
+    async def since(self, last_id, topics=(), limit=MAX_QUEUED):
+        # Events after last_id, for clients catching up
+        if events_backend() == 'database':
+            rows = ChangeEvent.objects.filter(id__gt=last_id).order_by('id')
+            if topics:
+                rows = rows.filter(topic__in=topics)
+            return [row.as_event() async for row in rows[:limit]]
+
+        with self.lock:
+            return [
+                event for event in self.history
+                if event['id'] > last_id and (not topics or event['topic'] in topics)
+            ][:limit]
+
+    async def _poll(self, loop):
+        # One poller per event loop, whatever the number of clients on it
+        interval = getattr(settings, 'EVENTS_POLL_INTERVAL', 1.0)
+        last_id = await self.latest_id()
+        gaps = {}  # skipped id -> when it was first missed
+
+        while True:
+            await asyncio.sleep(interval)
+
+            condition = Q(id__gt=last_id)
+            if gaps:
+                condition |= Q(id__in=list(gaps))
+            try:
+                rows = [row async for row in ChangeEvent.objects.filter(condition).order_by('id')[:MAX_QUEUED]]
+            except DatabaseError:
+                logger.exception("Polling change events failed")
+                continue
+
+            now = time.monotonic()
+            for row in rows:
+                gaps.pop(row.id, None)
+                if row.id > last_id:
+                    if row.id - last_id <= MAX_GAP:
+                        gaps.update(dict.fromkeys(range(last_id + 1, row.id), now))
+                    last_id = row.id
+            gaps = {event_id: seen for event_id, seen in gaps.items() if now - seen < GAP_TIMEOUT}
+
+            if rows:
+                events = [row.as_event() for row in rows]
+                with self.lock:
+                    subscriptions = [s for s in self.subscriptions if s.loop is loop]
+                for subscription in subscriptions:
+                    subscription.deliver(events)
+
+
+broker = EventBroker()
+
+
+# ====================== PUBLISHING ======================
+_local = threading.local()
+
+
+class PendingEvents:
+    # Changes made by one transaction, published once it commits. A
+    # request that moves both accounts several times still sends one
+    # balance event.
+
+    def __init__(self):
+        self.balances = {}
+        self.changes = {}  # (topic, action) -> {object id: None}, in order
+
+    def flush(self):
+        if getattr(_local, 'pending', None) is self:
+            _local.pending = None
+
+        changes = []
+        if self.balances:
+            changes.append(('accounts', 'changed', {'accounts': self.balances}))
+        for (topic, action), ids in self.changes.items():
+            changes.append((topic, action, {'ids': list(ids)}))
+        if not changes:
+            return
+        try:
+            broker.publish(changes)
+        except DatabaseError:
+            # The change itself has committed; only the notification is lost
+            logger.exception("Publishing change events failed")
+
+
+def _pending():
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        return PendingEvents()
+
+    pending = getattr(_local, 'pending', None)
+    # A rollback drops the flush callback along with the changes
+    if pending is None or not any(callback == pending.flush for _, callback, _ in connection.run_on_commit):
+        pending = _local.pending = PendingEvents()
+        transaction.on_commit(pending.flush)
+    return pending
+
+
+def _flush_outside_transaction(pending):
+    if not transaction.get_connection().in_atomic_block:
+        pending.flush()
+
+
+def publish_balances(accounts):
+    pending = _pending()
+    pending.balances.update({account.account_type: account.balance for account in accounts})
+    _flush_outside_transaction(pending)
+
+
+def publish_change(topic, action, ids):
+    if not ids:
+        return
+    pending = _pending()
+    pending.changes.setdefault((topic, action), {}).update(dict.fromkeys(ids))
+    _flush_outside_transaction(pending)
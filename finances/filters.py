@@ -0,0 +1,15 @@
+from django_filters.rest_framework import FilterSet, DateFilter
+from .models import DailyRollup
+
+class DailyRollupFilter(FilterSet):
+    date__gte = DateFilter(field_name='date', lookup_expr='gte')
+    date__lte = DateFilter(field_name='date', lookup_expr='lte')
+
+    class Meta:
+        model = DailyRollup
+        fields = {
+            'kind': ['exact'],
+            'category': ['exact'],
+            'payment_source': ['exact'],
+            'date': ['exact'],
+        }
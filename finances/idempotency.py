@@ -0,0 +1,135 @@
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+
+def idempotency_ttl():
+    return timedelta(hours=getattr(settings, 'IDEMPOTENCY_KEY_TTL_HOURS', 24))
+
+
+def _request_payload(data):
+    # Multipart data is a QueryDict holding uploaded files; describe files
+    # by name and size so the hash stays cheap
+    if hasattr(data, 'lists'):
+        data = {key: values if len(values) > 1 else values[0] for key, values in data.lists()}
+
+    def default(value):
+        if hasattr(value, 'read'):
+            return {'file': getattr(value, 'name', ''), 'size': getattr(value, 'size', None)}
+        return DjangoJSONEncoder().default(value)
+
+    return json.dumps(data, sort_keys=True, default=default)
+
+
+def request_hash(request):
+    digest = hashlib.sha256()
+    digest.update(f'{request.method} {request.path}\n'.encode())
+    digest.update(_request_payload(request.data).encode())
+    return digest.hexdigest()
+
+
+def request_scope(request):
+    user = getattr(request, 'user', None)
+    owner = user.pk if user is not None and user.is_authenticated else 'anon'
+    return f'{owner}:{request.method}:{request.path}'[:255]
+
+
+def _stored_response(key, scope, fingerprint):
+    record = IdempotencyKey.objects.filter(key=key, scope=scope).first()
+    if record is None:
+        return None
+
+    if record.created_at < timezone.now() - idempotency_ttl():
+        record.delete()
+        return None
+
+    if record.request_hash != fingerprint:
+        return Response(
+            {"detail": f"This {IDEMPOTENCY_HEADER} was already used for a different request."},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+
+    if record.status_code is None:
+        return Response(
+            {"detail": "A request with this Idempotency-Key is already being processed."},
+            status=status.HTTP_409_CONFLICT,
+        )
+
+    return Response(
+        record.response_body,
+        status=record.status_code,
+        headers={'Idempotent-Replayed': 'true'},
+    )
+
+
+def idempotent_response(request, handler, *args, **kwargs):
+    # Runs handler(request, ...) once per Idempotency-Key and replays the
+    # stored response for retries. The key row is written in the same
+    # transaction as the change itself, so a key is only recorded for work
+    # that committed; failed requests can be retried with the same key.
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    if not key:
+        return handler(request, *args, **kwargs)
+    if len(key) > MAX_KEY_LENGTH:
+        raise ValidationError({"detail": f"{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters."})
+
+    scope = request_scope(request)
+    fingerprint = request_hash(request)
+
+    stored = _stored_response(key, scope, fingerprint)
+    if stored is not None:
+        return stored
+
+    with transaction.atomic():
+        try:
+            # Inserted first: a concurrent retry blocks on the unique
+            # index until this transaction ends
+            with transaction.atomic():
+                record = IdempotencyKey.objects.create(key=key, scope=scope, request_hash=fingerprint)
+        except IntegrityError:
+            record = None
+
+        if record is not None:
+            response = handler(request, *args, **kwargs)
+
+            if status.is_success(response.status_code):
+                record.status_code = response.status_code
+                record.response_body = response.data
+                record.save(update_fields=['status_code', 'response_body'])
+            else:
+                transaction.set_rollback(True)
+
+    if record is None:
+        # Lost the race; the winner has committed by now
+        stored = _stored_response(key, scope, fingerprint)
+        if stored is not None:
+            return stored
+        return Response(
+            {"detail": "A request with this Idempotency-Key is already being processed."},
+            status=status.HTTP_409_CONFLICT,
+        )
+
+    return response
+
+
+class IdempotentMixin:
+    # Idempotency-Key support for ModelViewSet create/update
+
+    def create(self, request, *args, **kwargs):
+        return idempotent_response(request, super().create, *args, **kwargs)
+
+    def update(self, request, *args, **kwargs):
+        return idempotent_response(request, super().update, *args, **kwargs)
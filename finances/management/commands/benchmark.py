@@ -0,0 +1,223 @@
+import json
+import math
+import platform
+import time
+from collections import Counter
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from daycare_backend.metrics import RequestStats
+from daycare_backend.renderers import orjson
+from expenses.models import Expense
+from incomes.models import Income
+
+
+def percentile(values, p):
+    # Nearest-rank percentile
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def build_scenarios():
+    expense = Expense.objects.prefetch_related('items').order_by('-id').first()
+    income = Income.objects.order_by('-id').first()
+    category = (
+        Expense.objects.order_by().values('category').annotate(rows=Count('id'))
+        .order_by('-rows').values_list('category', flat=True).first() or 'Food'
+    )
+    search_term = (expense.description.split() or ['food'])[0] if expense else 'food'
+    today = timezone.localdate()
+
+    new_items = [
+        {'item_name': f'Benchmark item {n}', 'quantity': '2', 'unit': 'pcs', 'unit_price': '1.50'}
+        for n in range(5)
+    ]
+
+    # (name, method, path, payload, expected status, mutates)
+    scenarios = [
+        ('accounts.list', 'get', '/api/accounts/', None, 200, False),
+        ('summary.month', 'get', '/api/summary/?group_by=month', None, 200, False),
+
+        ('expenses.list', 'get', '/api/expenses/', None, 200, False),
+        ('expenses.list.page50', 'get', '/api/expenses/?page=50', None, 200, False),
+        ('expenses.list.cursor', 'get', '/api/expenses/?pagination=cursor', None, 200, False),
+        ('expenses.list.cursor100', 'get', '/api/expenses/?pagination=cursor&page_size=100', None, 200, False),
+        ('expenses.list.sparse', 'get',
+         '/api/expenses/?fields=id,date,category,payment_source,total_expense', None, 200, False),
+        ('expenses.filter', 'get',
+         f'/api/expenses/?category={category}&payment_source=cash&date__gte={today.replace(day=1)}', None, 200, False),
+        ('expenses.search', 'get', f'/api/expenses/?search={search_term}', None, 200, False),
+        ('expenses.export', 'get', '/api/expenses/export/', None, 200, False),
+        ('expenses.report.daily', 'get', '/api/expenses/reports/daily/', None, 200, False),
+        ('expenses.report.monthly', 'get', '/api/expenses/reports/monthly/', None, 200, False),
+        ('expenses.report.category', 'get', '/api/expenses/reports/category/', None, 200, False),
+        ('expenses.create', 'post', '/api/expenses/', {
+            'date': str(today), 'description': 'Benchmark purchase', 'category': category,
+            'payment_source': 'cash', 'items': new_items,
+        }, 201, True),
+
+        ('incomes.list', 'get', '/api/income/', None, 200, False),
+        ('incomes.list.cursor100', 'get', '/api/income/?pagination=cursor&page_size=100', None, 200, False),
+        ('incomes.list.sparse', 'get', '/api/income/?fields=id,date,category,amount,status', None, 200, False),
+        ('incomes.filter', 'get', '/api/income/?transaction_type=receivable&status=pending', None, 200, False),
+        ('incomes.search', 'get', '/api/income/?search=tuition', None, 200, False),
+        ('incomes.export', 'get', '/api/income/export/', None, 200, False),
+        ('incomes.create', 'post', '/api/income/', {
+            'date': str(today), 'description': 'Benchmark fee', 'category': 'tuition_fee',
+            'amount': '100.00', 'amount_paid': '100.00', 'payment_source': 'cash',
+        }, 201, True),
+    ]
+
+    if expense is not None:
+        items = [
+            {'id': item.id, 'item_name': item.item_name, 'quantity': str(item.quantity),
+             'unit': item.unit, 'unit_price': str(item.unit_price), 'vat_rate': str(item.vat_rate)}
+            for item in expense.items.all()
+        ]
+        scenarios += [
+            ('expenses.retrieve', 'get', f'/api/expenses/{expense.id}/', None, 200, False),
+            ('expenses.update', 'patch', f'/api/expenses/{expense.id}/',
+             {'remarks': 'Benchmark update', 'items': items}, 200, True),
+        ]
+    if income is not None:
+        scenarios.append(
+            ('incomes.update', 'patch', f'/api/income/{income.id}/', {'remarks': 'Benchmark update'}, 200, True)
+        )
+    return scenarios
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the main API endpoints through the DRF test client and record query counts "
+        "and p50/p95 latencies; optionally compare against a saved JSON baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--only', default='', help="Comma-separated scenario name prefixes.")
+        parser.add_argument('--output', help="Write the results to this JSON file.")
+        parser.add_argument('--compare', help="Baseline JSON file to compare against.")
+        parser.add_argument(
+            '--threshold', type=float, default=0.2,
+            help="Allowed p95 slowdown against the baseline (0.2 = 20%%).",
+        )
+
+    def handle(self, *args, **options):
+        client = APIClient()
+        prefixes = [prefix for prefix in options['only'].split(',') if prefix]
+
+        results = {}
+        for name, method, path, payload, expected, mutates in build_scenarios():
+            if prefixes and not name.startswith(tuple(prefixes)):
+                continue
+            results[name] = self.run_scenario(
+                client, method, path, payload, expected, mutates,
+                options['iterations'], options['warmup'],
+            )
+            row = results[name]
+            self.stdout.write(
+                f"{name:<28} p50 {row['p50_ms']:>9.2f} ms  p95 {row['p95_ms']:>9.2f} ms  "
+                f"queries {row['queries']:>4}  status {row['status']}"
+                + ('' if row['status'] == expected else f" (expected {expected})")
+            )
+
+        report = {'meta': self.meta(options), 'scenarios': results}
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2, sort_keys=True)
+            self.stdout.write(f"Wrote {options['output']}")
+
+        if options['compare']:
+            with open(options['compare']) as baseline_file:
+                baseline = json.load(baseline_file)
+            regressions = self.compare(baseline.get('scenarios', {}), results, options['threshold'])
+            if regressions:
+                raise CommandError(f"{len(regressions)} regressions: {', '.join(regressions)}")
+            self.stdout.write(self.style.SUCCESS("No regressions against the baseline."))
+
+    def run_scenario(self, client, method, path, payload, expected, mutates, iterations, warmup):
+        timings, query_counts, statuses = [], [], Counter()
+
+        for run in range(warmup + iterations):
+            stats = RequestStats()
+            # Writes are rolled back so every run (and every benchmark)
+            # sees the same data
+            with transaction.atomic():
+                with connection.execute_wrapper(stats):
+                    start = time.perf_counter()
+                    response = getattr(client, method)(path, payload, format='json')
+                    if getattr(response, 'streaming', False):
+                        b''.join(response.streaming_content)
+                    elapsed = time.perf_counter() - start
+                if mutates:
+                    transaction.set_rollback(True)
+
+            if run < warmup:
+                continue
+            timings.append(elapsed * 1000)
+            query_counts.append(stats.queries)
+            statuses[response.status_code] += 1
+
+        status = statuses.most_common(1)[0][0]
+        return {
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            'mean_ms': round(sum(timings) / len(timings), 3),
+            'min_ms': round(min(timings), 3),
+            'queries': max(query_counts),
+            'status': status,
+            'expected_status': expected,
+        }
+
+    def meta(self, options):
+        return {
+            'created_at': timezone.now().isoformat(),
+            'iterations': options['iterations'],
+            'database': connection.vendor,
+            'debug': settings.DEBUG,
+            'fast_serialization': settings.API_FAST_SERIALIZATION,
+            'orjson': orjson is not None,
+            'django': django.get_version(),
+            'python': platform.python_version(),
+            'expenses': Expense.objects.count(),
+            'incomes': Income.objects.count(),
+        }
+
+    def compare(self, baseline, results, threshold):
+        regressions = []
+        self.stdout.write("")
+        self.stdout.write(f"{'scenario':<28} {'p95 base':>10} {'p95 now':>10} {'change':>8} {'queries':>9}")
+
+        for name, row in results.items():
+            base = baseline.get(name)
+            if base is None:
+                self.stdout.write(f"{name:<28} {'(new)':>10}")
+                continue
+
+            change = (row['p95_ms'] - base['p95_ms']) / base['p95_ms'] if base['p95_ms'] else 0
+            problems = []
+            if change > threshold:
+                problems.append('slower')
+            if row['queries'] > base['queries']:
+                problems.append('more queries')
+            if row['status'] != base['status']:
+                problems.append(f"status {base['status']} -> {row['status']}")
+
+            line = (
+                f"{name:<28} {base['p95_ms']:>10.2f} {row['p95_ms']:>10.2f} {change:>+8.0%} "
+                f"{base['queries']:>4} -> {row['queries']:<4}"
+            )
+            if problems:
+                regressions.append(name)
+                self.stdout.write(self.style.ERROR(f"{line} {', '.join(problems)}"))
+            else:
+                self.stdout.write(line)
+        return regressions
@@ -0,0 +1,103 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from expenses.views import ExpenseViewSet
+from incomes.views import OUTSTANDING_STATUSES, IncomeViewSet
+
+
+def plan_warnings(vendor, plan):
+    # Plan lines where the database sorts rows or reads a whole table
+    warnings = []
+    for line in plan.splitlines():
+        if vendor == 'sqlite':
+            full_scan = ' SCAN ' in f' {line}' and 'USING' not in line and 'VIRTUAL TABLE' not in line
+            if 'USE TEMP B-TREE' in line or full_scan:
+                warnings.append(line)
+        elif 'Sort' in line or 'Seq Scan' in line:
+            warnings.append(line)
+    return warnings
+
+
+def hot_queries():
+    today = timezone.localdate()
+    month_start = str(today.replace(day=1))
+    quarter_start = str(today - timedelta(days=90))
+    today = str(today)
+
+    # (name, viewset, query params, queryset refinement)
+    return [
+        ("expenses: default list", ExpenseViewSet, {}, None),
+        ("expenses: date range", ExpenseViewSet, {"date__gte": quarter_start, "date__lte": today}, None),
+        ("expenses: category + date range", ExpenseViewSet,
+         {"category": "Food", "date__gte": month_start, "date__lte": today}, None),
+        ("expenses: payment source + date range", ExpenseViewSet,
+         {"payment_source": "cash", "date__gte": quarter_start}, None),
+        ("expenses: category + payment source", ExpenseViewSet,
+         {"category": "Food", "payment_source": "bank"}, None),
+        ("expenses: single day", ExpenseViewSet, {"date": today}, None),
+        ("expenses: search", ExpenseViewSet, {"search": "food"}, None),
+        ("expenses: cursor page", ExpenseViewSet, {"pagination": "cursor", "category": "Food"}, None),
+
+        ("income: default list", IncomeViewSet, {}, None),
+        ("income: type + status", IncomeViewSet, {"transaction_type": "receivable", "status": "pending"}, None),
+        ("income: category", IncomeViewSet, {"category": "tuition_fee"}, None),
+        ("income: payment source + day", IncomeViewSet, {"payment_source": "cash", "date": today}, None),
+        ("income: search", IncomeViewSet, {"search": "tuition"}, None),
+        # Same rows IncomeViewSet.aging aggregates
+        ("income: aging (outstanding receivables)", IncomeViewSet, {},
+         lambda queryset: queryset.filter(
+             transaction_type="receivable", status__in=OUTSTANDING_STATUSES, balance_due__gt=0,
+         ).order_by()),
+    ]
+
+
+def list_queryset(viewset, params):
+    # The queryset a list request would page through, built by the
+    # viewset's own filter backends
+    factory = APIRequestFactory()
+    view = viewset(action_map={"get": "list"})
+    view.setup(factory.get("/", params))
+    view.request = view.initialize_request(view.request)
+    view.action = "list"
+    view.format_kwarg = None
+    view.kwargs = {}
+    return view.filter_queryset(view.get_queryset())
+
+
+class Command(BaseCommand):
+    help = "Print query plans for the list endpoints' common filter and ordering combinations."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sql', action='store_true', help="Also print the SQL.")
+        parser.add_argument('--analyze', action='store_true', help="EXPLAIN ANALYZE (PostgreSQL only).")
+        parser.add_argument('--page-size', type=int, default=10)
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        if options['analyze'] and vendor != 'postgresql':
+            raise CommandError("--analyze is only supported on PostgreSQL.")
+        explain_options = {'analyze': True} if options['analyze'] else {}
+
+        flagged = 0
+        for name, viewset, params, refine in hot_queries():
+            queryset = list_queryset(viewset, params)
+            if refine is not None:
+                queryset = refine(queryset)
+            page = queryset[:options['page_size']]
+
+            plan = page.explain(**explain_options)
+            suspicious = plan_warnings(vendor, plan)
+            flagged += bool(suspicious)
+
+            header = f"== {name}  {params or ''}"
+            self.stdout.write(self.style.WARNING(header) if suspicious else self.style.SUCCESS(header))
+            if options['sql']:
+                self.stdout.write(str(page.query))
+            self.stdout.write(plan)
+            self.stdout.write("")
+
+        self.stdout.write(f"{flagged} of {len(hot_queries())} plans sort or scan a whole table.")
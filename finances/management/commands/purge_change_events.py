@@ -0,0 +1,16 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from finances.models import ChangeEvent
+
+
+class Command(BaseCommand):
+    help = "Delete change events older than EVENTS_RETENTION_HOURS."
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=getattr(settings, 'EVENTS_RETENTION_HOURS', 24))
+        deleted, _ = ChangeEvent.objects.filter(created_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} change events."))
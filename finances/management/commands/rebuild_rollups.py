@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from expenses.models import Expense
+from finances.models import DailyRollup
+from incomes.models import Income
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily expense/income rollup table from the Expense and Income rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        rollups = []
+
+        expense_rows = (
+            Expense.objects.order_by()
+            .values('date', 'category', 'payment_source')
+            .annotate(total=Sum('total_expense'), count=Count('id'))
+        )
+        for row in expense_rows:
+            rollups.append(DailyRollup(kind='expense', **row))
+
+        income_rows = (
+            Income.objects.order_by()
+            .values('date', 'transaction_type', 'category', 'payment_source')
+            .annotate(total=Sum('amount'), count=Count('id'))
+        )
+        for row in income_rows:
+            rollups.append(DailyRollup(kind=row.pop('transaction_type'), **row))
+
+        DailyRollup.objects.all().delete()
+        DailyRollup.objects.bulk_create(rollups, batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {len(rollups)} rollup rows."))
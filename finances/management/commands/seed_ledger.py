@@ -0,0 +1,235 @@
+import random
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from expenses.models import Expense, ExpenseItem
+from expenses.services import post_balance_changes
+from incomes.models import Income
+
+CENTS = Decimal('0.01')
+
+EXPENSE_CATEGORIES = [
+    ('Food', 30), ('Supplies', 15), ('Utilities', 10), ('Salaries', 8),
+    ('Maintenance', 8), ('Cleaning', 8), ('Transport', 7), ('Toys', 5),
+    ('Medical', 5), ('Rent', 4),
+]
+SUPPLIERS = [
+    'Green Valley Market', 'City Wholesale', 'Sunrise Bakery', 'Metro Utilities',
+    'Kids Corner Supplies', 'Bright Cleaning Co', 'Swift Transport', 'Health Plus Pharmacy',
+    'Happy Toys Ltd', 'Northside Hardware', None,
+]
+ITEM_NAMES = [
+    'Rice', 'Milk', 'Eggs', 'Bread', 'Apples', 'Bananas', 'Chicken', 'Vegetables',
+    'Crayons', 'Paper', 'Glue', 'Paint', 'Diapers', 'Wipes', 'Soap', 'Detergent',
+    'Light bulbs', 'Batteries', 'Bandages', 'Building blocks', 'Fuel', 'Water',
+]
+UNITS = ['pcs', 'kg', 'box', 'pack', 'litre']
+PAYMENT_SOURCES = [('cash', 50), ('bank', 35), ('combined', 15)]
+
+TRANSACTION_TYPES = [('income', 80), ('receivable', 15), ('liability', 5)]
+INCOME_CATEGORIES = [
+    ('tuition_fee', 50), ('meal_fee', 12), ('registration_fee', 8), ('activity_fee', 8),
+    ('late_fee', 6), ('donation', 6), ('sales', 5), ('investment', 2), ('other', 3),
+]
+PAYERS = ['Ahmed', 'Rahman', 'Chowdhury', 'Hossain', 'Islam', 'Karim', 'Begum', 'Akter', 'Das', 'Roy']
+
+
+def _weighted(choices):
+    values, weights = zip(*choices)
+    return values, weights
+
+
+class Command(BaseCommand):
+    help = "Bulk-insert a reproducible synthetic ledger (expenses with items, incomes) for benchmarking."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--expenses', type=int, default=1_000_000)
+        parser.add_argument('--incomes', type=int, default=500_000)
+        parser.add_argument('--max-items', type=int, default=50, help="Items per expense are 1..max, skewed low.")
+        parser.add_argument('--days', type=int, default=730, help="Spread rows over this many days up to today.")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--force', action='store_true',
+            help="Seed even if the database already holds expenses or incomes.",
+        )
+
+    def handle(self, *args, **options):
+        if not options['force'] and (Expense.objects.exists() or Income.objects.exists()):
+            raise CommandError("The database already has data; pass --force to add the synthetic ledger anyway.")
+
+        self.rng = random.Random(options['seed'])
+        self.end_date = date.today()
+        self.days = max(1, options['days'])
+        self.postings = defaultdict(Decimal)  # (account_type, date, entry_type) -> amount
+
+        started = time.perf_counter()
+        self.seed_incomes(options['incomes'], options['batch_size'])
+        self.seed_expenses(options['expenses'], options['max_items'], options['batch_size'])
+
+        # One ledger posting per account, day and type; incomes first so
+        # the running balances stay positive
+        with transaction.atomic():
+            for entry_type in ('income', 'expense'):
+                post_balance_changes(
+                    [
+                        (account_type, amount, day)
+                        for (account_type, day, kind), amount in sorted(self.postings.items())
+                        if kind == entry_type
+                    ],
+                    entry_type,
+                )
+
+        call_command('rebuild_rollups', stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {options['incomes']} incomes and {options['expenses']} expenses "
+            f"in {time.perf_counter() - started:.1f}s."
+        ))
+
+    # ------------------------
+    # HELPERS
+    # ------------------------
+    def random_date(self):
+        # Newer dates are busier, like a growing daycare
+        offset = int(self.days * (1 - self.rng.random() ** 0.7))
+        return self.end_date - timedelta(days=min(offset, self.days - 1))
+
+    def money(self, low, high):
+        return Decimal(self.rng.uniform(low, high)).quantize(CENTS)
+
+    def split(self, payment_source, amount):
+        if payment_source == 'combined':
+            cash = (amount * Decimal(self.rng.randint(1, 9)) / 10).quantize(CENTS)
+            return cash, amount - cash
+        if payment_source == 'cash':
+            return amount, Decimal('0')
+        return Decimal('0'), amount
+
+    def post(self, entry_type, day, cash, bank):
+        sign = -1 if entry_type == 'expense' else 1
+        if cash:
+            self.postings[('cash', day, entry_type)] += sign * cash
+        if bank:
+            self.postings[('bank', day, entry_type)] += sign * bank
+
+    def progress(self, label, done, total):
+        self.stdout.write(f"{label}: {done}/{total}")
+
+    # ------------------------
+    # EXPENSES
+    # ------------------------
+    def seed_expenses(self, total, max_items, batch_size):
+        categories, category_weights = _weighted(EXPENSE_CATEGORIES)
+        sources, source_weights = _weighted(PAYMENT_SOURCES)
+        rng = self.rng
+
+        created = 0
+        while created < total:
+            size = min(batch_size, total - created)
+            expenses, item_lists = [], []
+
+            for _ in range(size):
+                items = []
+                # Mostly a handful of lines, occasionally a long receipt
+                for _ in range(min(max_items, int(rng.expovariate(1 / 4)) + 1)):
+                    quantity = Decimal(rng.randint(1, 10))
+                    unit_price = self.money(5, 100)
+                    vat_rate = Decimal(rng.choice((0, 0, 0, 5, 15)))
+                    subtotal = quantity * unit_price
+                    items.append(ExpenseItem(
+                        item_name=rng.choice(ITEM_NAMES),
+                        quantity=quantity,
+                        unit=rng.choice(UNITS),
+                        unit_price=unit_price,
+                        vat_rate=vat_rate,
+                        total=(subtotal + subtotal * vat_rate / 100).quantize(CENTS),
+                    ))
+
+                category = rng.choices(categories, category_weights)[0]
+                supplier = rng.choice(SUPPLIERS)
+                expenses.append(Expense(
+                    date=self.random_date(),
+                    description=f"{category} purchase from {supplier or 'local vendor'}",
+                    category=category,
+                    supplier=supplier,
+                    payment_source=rng.choices(sources, source_weights)[0],
+                    total_expense=sum(item.total for item in items),
+                ))
+                item_lists.append(items)
+
+            with transaction.atomic():
+                Expense.objects.bulk_create(expenses, batch_size=batch_size)
+                for expense, items in zip(expenses, item_lists):
+                    for item in items:
+                        item.expense = expense
+                ExpenseItem.objects.bulk_create(
+                    [item for items in item_lists for item in items],
+                    batch_size=batch_size,
+                )
+
+            for expense in expenses:
+                cash, bank = self.split(expense.payment_source, expense.total_expense)
+                self.post('expense', expense.date, cash, bank)
+
+            created += size
+            self.progress("Expenses", created, total)
+
+    # ------------------------
+    # INCOMES
+    # ------------------------
+    def seed_incomes(self, total, batch_size):
+        types, type_weights = _weighted(TRANSACTION_TYPES)
+        categories, category_weights = _weighted(INCOME_CATEGORIES)
+        sources, source_weights = _weighted(PAYMENT_SOURCES)
+        category_labels = dict(Income.CATEGORY_CHOICES)
+        rng = self.rng
+
+        created = 0
+        while created < total:
+            size = min(batch_size, total - created)
+            incomes = []
+
+            for _ in range(size):
+                transaction_type = rng.choices(types, type_weights)[0]
+                category = rng.choices(categories, category_weights)[0]
+                day = self.random_date()
+                amount = self.money(500, 20000)
+
+                if transaction_type == 'income':
+                    amount_paid = amount
+                else:
+                    amount_paid = rng.choice((Decimal('0'), (amount / 2).quantize(CENTS), amount))
+
+                payment_source = rng.choices(sources, source_weights)[0]
+                cash, bank = self.split(payment_source, amount_paid)
+                payer = f"{rng.choice(PAYERS)} family"
+
+                income = Income(
+                    transaction_type=transaction_type,
+                    date=day,
+                    due_date=day + timedelta(days=rng.choice((7, 15, 30, 60))) if transaction_type != 'income' else None,
+                    description=f"{category_labels[category]} - {payer}",
+                    payer_name=payer,
+                    category=category,
+                    amount=amount,
+                    payment_source=payment_source,
+                    amount_cash=cash if payment_source == 'combined' else Decimal('0'),
+                    amount_bank=bank if payment_source == 'combined' else Decimal('0'),
+                    amount_paid=amount_paid,
+                )
+                # bulk_create() skips save(), which derives these
+                income.calculate_balance()
+                incomes.append(income)
+
+                if amount_paid > 0:
+                    self.post('income', day, cash, bank)
+
+            Income.objects.bulk_create(incomes, batch_size=batch_size)
+            created += size
+            self.progress("Incomes", created, total)
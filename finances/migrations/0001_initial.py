@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('kind', models.CharField(choices=[('expense', 'Expense'), ('income', 'Income'), ('receivable', 'Receivable'), ('liability', 'Liability')], max_length=20)),
+                ('category', models.CharField(max_length=100)),
+                ('payment_source', models.CharField(max_length=10)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['date', 'kind', 'category', 'payment_source'],
+                'constraints': [models.UniqueConstraint(fields=('kind', 'date', 'category', 'payment_source'), name='finances_dailyrollup_unique_key')],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0003_changeevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClosedPeriod',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(unique=True)),
+                ('closed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['month'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PeriodTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('expense', 'Expense'), ('income', 'Income'), ('receivable', 'Receivable'), ('liability', 'Liability'), ('vat', 'VAT'), ('balance', 'Closing Balance')], max_length=20)),
+                ('category', models.CharField(blank=True, max_length=100)),
+                ('payment_source', models.CharField(blank=True, max_length=10)),
+                ('vat_rate', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('count', models.IntegerField(default=0)),
+                ('period', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='totals', to='finances.closedperiod')),
+            ],
+            options={
+                'ordering': ['period', 'kind', 'category', 'payment_source', 'vat_rate'],
+            },
+        ),
+    ]
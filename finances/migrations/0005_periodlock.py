@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0004_closedperiod_periodtotal'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PeriodLock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(unique=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,16 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:28
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0005_periodlock'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='PeriodLock',
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:30
+
+from calendar import monthrange
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def split_totals_by_day(apps, schema_editor):
+    # Closed months can't have changed since their snapshot, so the per-day
+    # rows are read from the expense and income rows again
+    ClosedPeriod = apps.get_model('finances', 'ClosedPeriod')
+    PeriodTotal = apps.get_model('finances', 'PeriodTotal')
+    Expense = apps.get_model('expenses', 'Expense')
+    Income = apps.get_model('incomes', 'Income')
+
+    for period in ClosedPeriod.objects.all():
+        start = period.month
+        end = start.replace(day=monthrange(start.year, start.month)[1])
+        PeriodTotal.objects.filter(period=period).exclude(kind__in=('vat', 'balance')).delete()
+
+        expenses = (
+            Expense.objects.filter(date__range=(start, end)).order_by()
+            .values('date', 'category', 'payment_source')
+            .annotate(total=Sum('total_expense'), count=Count('id'))
+        )
+        totals = [PeriodTotal(period=period, kind='expense', **row) for row in expenses]
+
+        incomes = (
+            Income.objects.filter(date__range=(start, end)).order_by()
+            .values('date', 'transaction_type', 'category', 'payment_source')
+            .annotate(total=Sum('amount'), count=Count('id'))
+        )
+        totals += [PeriodTotal(period=period, kind=row.pop('transaction_type'), **row) for row in incomes]
+        for total in totals:
+            total.total = total.total or 0
+        PeriodTotal.objects.bulk_create(totals)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0006_delete_periodlock'),
+        ('expenses', '0017_expense_invoice_name'),
+        ('incomes', '0008_composite_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='periodtotal',
+            options={'ordering': ['period', 'kind', 'date', 'category', 'payment_source', 'vat_rate']},
+        ),
+        migrations.AddField(
+            model_name='periodtotal',
+            name='date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.RunPython(split_totals_by_day, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+from django.db import migrations
+from django.db.models import Count, Sum
+
+
+def backfill_rollups(apps, schema_editor):
+    # Same as manage.py rebuild_rollups: rows saved before the rollups
+    # existed would otherwise be missing from the reports
+    DailyRollup = apps.get_model('finances', 'DailyRollup')
+    Expense = apps.get_model('expenses', 'Expense')
+    Income = apps.get_model('incomes', 'Income')
+
+    expense_rows = (
+        Expense.objects.order_by()
+        .values('date', 'category', 'payment_source')
+        .annotate(total=Sum('total_expense'), count=Count('id'))
+    )
+    rollups = [DailyRollup(kind='expense', **row) for row in expense_rows.iterator()]
+
+    income_rows = (
+        Income.objects.order_by()
+        .values('date', 'transaction_type', 'category', 'payment_source')
+        .annotate(total=Sum('amount'), count=Count('id'))
+    )
+    rollups += [DailyRollup(kind=row.pop('transaction_type'), **row) for row in income_rows.iterator()]
+    for rollup in rollups:
+        rollup.total = rollup.total or 0
+
+    DailyRollup.objects.all().delete()
+    DailyRollup.objects.bulk_create(rollups, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0007_periodtotal_date'),
+        ('expenses', '0017_expense_invoice_name'),
+        ('incomes', '0008_composite_list_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
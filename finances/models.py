@@ -1,3 +1,127 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 
-# Finance don't have models
+
+class DailyRollup(models.Model):
+    KIND_CHOICES = (
+        ('expense', 'Expense'),
+        ('income', 'Income'),
+        ('receivable', 'Receivable'),
+        ('liability', 'Liability'),
+    )
+
+    date = models.DateField()
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    category = models.CharField(max_length=100)
+    payment_source = models.CharField(max_length=10)
+
+    total = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0
+    )
+    count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.date} | {self.kind} | {self.category} | {self.payment_source} - {self.total}"
+
+    class Meta:
+        ordering = ['date', 'kind', 'category', 'payment_source']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['kind', 'date', 'category', 'payment_source'],
+                name='finances_dailyrollup_unique_key',
+            ),
+        ]
+
+
+class IdempotencyKey(models.Model):
+    # Client-supplied Idempotency-Key, scoped to the endpoint it was sent to
+    key = models.CharField(max_length=255)
+    scope = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(encoder=DjangoJSONEncoder, null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.scope} | {self.key}"
+
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['key', 'scope'],
+                name='finances_idempotencykey_unique_key',
+            ),
+        ]
+
+
+class ChangeEvent(models.Model):
+    # Change feed behind /api/events/ with EVENTS_BACKEND = 'database':
+    # every worker polls this table for events published by the others
+    topic = models.CharField(max_length=20)
+    action = models.CharField(max_length=20)
+    data = models.JSONField(encoder=DjangoJSONEncoder, default=dict)
+
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.id} | {self.topic}.{self.action}"
+
+    def as_event(self):
+        return {
+            'id': self.id,
+            'topic': self.topic,
+            'action': self.action,
+            'data': self.data,
+            'created_at': self.created_at,
+        }
+
+    class Meta:
+        ordering = ['id']
+
+
+class ClosedPeriod(models.Model):
+    # A month whose expenses and incomes can no longer change; its totals
+    # are kept in PeriodTotal and reports for it are read from there
+    month = models.DateField(unique=True)  # first day of the month
+    closed_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.month:%Y-%m}"
+
+    class Meta:
+        ordering = ['month']
+
+
+class PeriodTotal(models.Model):
+    # Expense and income kinds are totalled per day, category and payment
+    # source, VAT per rate, and each account's closing balance is stored
+    # with payment_source holding the account type
+    KIND_CHOICES = DailyRollup.KIND_CHOICES + (
+        ('vat', 'VAT'),
+        ('balance', 'Closing Balance'),
+    )
+
+    period = models.ForeignKey(ClosedPeriod, related_name='totals', on_delete=models.CASCADE)
+    date = models.DateField(null=True, blank=True)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    category = models.CharField(max_length=100, blank=True)
+    payment_source = models.CharField(max_length=10, blank=True)
+    vat_rate = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+
+    total = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0
+    )
+    count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.period} | {self.kind} | {self.category} | {self.payment_source} - {self.total}"
+
+    class Meta:
+        ordering = ['period', 'kind', 'date', 'category', 'payment_source', 'vat_rate']
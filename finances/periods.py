@@ -0,0 +1,233 @@
+from collections import defaultdict
+from datetime import date
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, Exists, Min, OuterRef, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from expenses.ledger import balance_at, month_end
+from expenses.models import Account, Expense, ExpenseItem
+from incomes.models import Income
+
+from .models import ClosedPeriod, PeriodTotal
+
+CENT = Decimal('0.01')
+
+# PostgreSQL advisory lock key shared by every write to a dated row
+PERIOD_LOCK = int.from_bytes(b'periods', 'big')
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def parse_month(value, field='month'):
+    # 'YYYY-MM' -> first day of that month
+    try:
+        year, month = str(value).split('-')
+        return date(int(year), int(month), 1)
+    except (TypeError, ValueError):
+        raise ValidationError({field: ["Use the YYYY-MM format."]})
+
+
+# ====================== CHECKS ======================
+# Rows dated in a closed month can't be created, changed or deleted; the
+# period has to be reopened first. Closing a month also closes every
+# month before it, so the closing balances in its snapshot can't change.
+def closed_until():
+    # Last day of the latest closed month, or None
+    latest = ClosedPeriod.objects.order_by('-month').values_list('month', flat=True).first()
+    return month_end(latest) if latest else None
+
+
+def closed_period_error(day):
+    return {"date": [f"The {day:%Y-%m} period is closed."]}
+
+
+def is_closed(day):
+    until = closed_until()
+    return until is not None and day <= until
+
+
+def lock_periods(shared=True):
+    # Held until the surrounding transaction ends. Writers share the lock,
+    # so they never wait for each other; closing a month takes it alone and
+    # waits for writes that have already checked their months. SQLite
+    # transactions already take the database's write lock when they begin.
+    if connection.vendor != 'postgresql' or not connection.in_atomic_block:
+        return
+    function = 'pg_advisory_xact_lock_shared' if shared else 'pg_advisory_xact_lock'
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT {function}(%s)', [PERIOD_LOCK])
+
+
+def ensure_open(*days):
+    # Inside a transaction no month can be closed before the caller's
+    # write commits
+    days = [day for day in days if day is not None]
+    if not days:
+        return
+    lock_periods()
+    until = closed_until()
+    if until is not None and min(days) <= until:
+        raise ValidationError(closed_period_error(min(days)))
+
+
+# ====================== SNAPSHOTS ======================
+def period_totals(month):
+    # Unsaved PeriodTotal rows for the month, from the expense, item and
+    # income rows themselves; expense and income kinds are kept per day so
+    # the daily reports can read them
+    start, end = month, month_end(month)
+    totals = []
+
+    expenses = (
+        Expense.objects.filter(date__range=(start, end)).order_by()
+        .values('date', 'category', 'payment_source')
+        .annotate(total=Sum('total_expense'), count=Count('id'))
+    )
+    totals += [PeriodTotal(kind='expense', **row) for row in expenses]
+
+    incomes = (
+        Income.objects.filter(date__range=(start, end)).order_by()
+        .values('date', 'transaction_type', 'category', 'payment_source')
+        .annotate(total=Sum('amount'), count=Count('id'))
+    )
+    totals += [PeriodTotal(kind=row.pop('transaction_type'), **row) for row in incomes]
+    for total in totals:
+        total.total = total.total or 0
+
+    # Same arithmetic as ExpenseSerializer, rounded once per rate
+    vat = defaultdict(lambda: [Decimal('0'), 0])
+    items = (
+        ExpenseItem.objects.filter(expense__date__range=(start, end))
+        .values_list('vat_rate', 'quantity', 'unit_price')
+    )
+    for vat_rate, quantity, unit_price in items.iterator():
+        vat[vat_rate][0] += quantity * unit_price * vat_rate / Decimal('100')
+        vat[vat_rate][1] += 1
+    totals += [
+        PeriodTotal(kind='vat', vat_rate=vat_rate, total=amount.quantize(CENT, ROUND_HALF_UP), count=count)
+        for vat_rate, (amount, count) in sorted(vat.items())
+    ]
+
+    totals += [
+        PeriodTotal(kind='balance', payment_source=account.account_type, total=balance_at(account, end))
+        for account in Account.objects.order_by('account_type')
+    ]
+    return totals
+
+
+def _first_open_day(until, month):
+    # Earliest expense or income dated after the closed months but before
+    # the given month
+    days = []
+    for queryset in (Expense.objects.all(), Income.objects.all()):
+        if until is not None:
+            queryset = queryset.filter(date__gt=until)
+        days.append(queryset.filter(date__lt=month).aggregate(first=Min('date'))['first'])
+    return min((day for day in days if day is not None), default=None)
+
+
+def close_period(month):
+    # Months close in order, so a snapshot's closing balances can't be
+    # changed by a posting dated in an earlier open month
+    month = month_start(month)
+    if month_end(month) >= timezone.localdate():
+        raise ValidationError({"month": ["Only months that have ended can be closed."]})
+
+    already_closed = {"month": [f"The {month:%Y-%m} period is already closed."]}
+    try:
+        with transaction.atomic():
+            # Waits for writes that have already checked their months
+            lock_periods(shared=False)
+            until = closed_until()
+            if until is not None and month <= until:
+                raise ValidationError(already_closed)
+            first_open = _first_open_day(until, month)
+            if first_open is not None:
+                raise ValidationError({"month": [f"Close the {first_open:%Y-%m} period first."]})
+
+            period = ClosedPeriod.objects.create(month=month)
+            totals = period_totals(month)
+            for total in totals:
+                total.period = period
+            PeriodTotal.objects.bulk_create(totals)
+    except IntegrityError:
+        raise ValidationError(already_closed)
+    return period
+
+
+def reopen_period(month):
+    # False when the month wasn't closed. Months reopen latest first.
+    month = month_start(month)
+    with transaction.atomic():
+        lock_periods(shared=False)
+        later = ClosedPeriod.objects.filter(month__gt=month).order_by('-month').values_list('month', flat=True).first()
+        if later is not None:
+            raise ValidationError({"month": [f"Reopen the {later:%Y-%m} period first."]})
+        deleted, _ = ClosedPeriod.objects.filter(month=month).delete()
+    return bool(deleted)
+
+
+# ====================== REPORTS ======================
+# The daily rollups answer reports for open months only; closed months
+# are read from their snapshot, whose per-day rows have the same fields.
+def open_rollups(queryset):
+    closed = ClosedPeriod.objects.filter(month=OuterRef('rollup_month'))
+    return queryset.alias(rollup_month=TruncMonth('date')).exclude(Exists(closed))
+
+
+def snapshot_rollups():
+    return PeriodTotal.objects.filter(date__isnull=False)
+
+
+def merge_report_rows(rows, keys, sums):
+    # Adds up rows of the same group coming from both sources
+    merged = {}
+    for row in rows:
+        key = tuple(row[name] for name in keys)
+        if key in merged:
+            for name in sums:
+                merged[key][name] += row[name]
+        else:
+            merged[key] = dict(row)
+    return [merged[key] for key in sorted(merged)]
+
+
+def period_report(period, totals):
+    # Built from the snapshot rows only
+    kinds, categories, sources = {}, {}, {}
+    vat, balances = [], []
+
+    def add(group, key, total):
+        row = group.setdefault(key, {'total': Decimal('0'), 'count': 0})
+        row['total'] += total.total
+        row['count'] += total.count
+
+    for total in totals:
+        if total.kind == 'vat':
+            vat.append({'vat_rate': total.vat_rate, 'total': total.total, 'count': total.count})
+        elif total.kind == 'balance':
+            balances.append({'account_type': total.payment_source, 'balance': total.total})
+        else:
+            add(kinds, total.kind, total)
+            add(categories, (total.kind, total.category), total)
+            add(sources, (total.kind, total.payment_source), total)
+
+    return {
+        'month': f"{period.month:%Y-%m}",
+        'closed_at': period.closed_at,
+        'totals': [{'kind': kind, **row} for kind, row in sorted(kinds.items())],
+        'categories': [
+            {'kind': kind, 'category': category, **row} for (kind, category), row in sorted(categories.items())
+        ],
+        'payment_sources': [
+            {'kind': kind, 'payment_source': source, **row} for (kind, source), row in sorted(sources.items())
+        ],
+        'vat': vat,
+        'closing_balances': balances,
+    }
@@ -1,6 +1,12 @@
 # finances/services.py
 from decimal import Decimal
 
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import DailyRollup
+
+
 def apply_income(amount, account):
     account.balance += Decimal(amount)
     account.save(update_fields=['balance'])
@@ -8,3 +14,58 @@ def apply_income(amount, account):
 def rollback_income(amount, account):
     account.balance -= Decimal(amount)
     account.save(update_fields=['balance'])
+
+
+# ====================== ROLLUPS ======================
+# Deltas are keyed by (date, kind, category, payment_source) and hold
+# (amount, count) so several rows hitting the same key cost one UPDATE.
+def _add_delta(deltas, key, amount, count):
+    total, rows = deltas.get(key, (Decimal('0'), 0))
+    deltas[key] = (total + Decimal(amount), rows + count)
+
+
+def collect_expense_deltas(expenses, sign=1, deltas=None):
+    deltas = {} if deltas is None else deltas
+    for expense in expenses:
+        key = (expense.date, 'expense', expense.category, expense.payment_source)
+        _add_delta(deltas, key, sign * (expense.total_expense or 0), sign)
+    return deltas
+
+
+def collect_income_deltas(incomes, sign=1, deltas=None):
+    deltas = {} if deltas is None else deltas
+    for income in incomes:
+        key = (income.date, income.transaction_type, income.category, income.payment_source)
+        _add_delta(deltas, key, sign * (income.amount or 0), sign)
+    return deltas
+
+
+def apply_rollup_deltas(deltas):
+    for (date, kind, category, payment_source), (amount, count) in deltas.items():
+        if not amount and not count:
+            continue
+
+        lookup = {
+            'date': date,
+            'kind': kind,
+            'category': category,
+            'payment_source': payment_source,
+        }
+        updated = DailyRollup.objects.filter(**lookup).update(
+            total=F('total') + amount,
+            count=F('count') + count,
+        )
+        if updated:
+            if count < 0:
+                DailyRollup.objects.filter(count__lte=0, **lookup).delete()
+            continue
+
+        try:
+            with transaction.atomic():
+                DailyRollup.objects.create(total=amount, count=count, **lookup)
+        except IntegrityError:
+            # Another writer created the row first
+            DailyRollup.objects.filter(**lookup).update(
+                total=F('total') + amount,
+                count=F('count') + count,
+            )
@@ -0,0 +1,83 @@
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from expenses.models import Account, Expense, ExpenseItem
+from incomes.models import Income
+
+from .events import publish_balances, publish_change
+from .periods import ensure_open
+
+
+# Balance changes from expenses/services.py publish themselves; these
+# cover edits made through the admin or the shell.
+@receiver(post_save, sender=Account)
+def account_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        publish_balances([instance])
+
+
+@receiver(post_save, sender=Expense)
+@receiver(post_save, sender=Income)
+def transaction_saved(sender, instance, created=False, raw=False, **kwargs):
+    if not raw:
+        publish_change(sender._meta.model_name, 'created' if created else 'updated', [instance.pk])
+
+
+@receiver(post_delete, sender=Expense)
+@receiver(post_delete, sender=Income)
+def transaction_deleted(sender, instance, **kwargs):
+    publish_change(sender._meta.model_name, 'deleted', [instance.pk])
+
+
+# ====================== CLOSED PERIODS ======================
+# Every save and delete of a dated row is checked here, whether it comes
+# from the API, the admin or the shell. Items are saved with
+# bulk_create() by the API, so only admin and shell saves reach
+# item_saving(); deletes are covered by ExpenseAdmin. Bulk imports and
+# batches bypass signals and call ensure_open() themselves.
+def _date(model, value):
+    # Unsaved instances may still hold the date as a string
+    return model._meta.get_field('date').to_python(value)
+
+
+@receiver(post_init, sender=Expense)
+@receiver(post_init, sender=Income)
+def remember_date(sender, instance, **kwargs):
+    # The stored date, so a save can check the month a row moves out of
+    # without reading it back
+    instance._stored_date = instance.__dict__.get('date')
+
+
+@receiver(pre_save, sender=Expense)
+@receiver(pre_save, sender=Income)
+def transaction_saving(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    days = [_date(sender, instance.date)]
+    if not instance._state.adding and instance._stored_date is not None:
+        days.append(instance._stored_date)
+    elif instance.pk is not None:
+        days.append(sender._default_manager.filter(pk=instance.pk).values_list('date', flat=True).first())
+    ensure_open(*days)
+
+
+@receiver(post_save, sender=Expense)
+@receiver(post_save, sender=Income)
+def transaction_stored(sender, instance, raw=False, **kwargs):
+    instance._stored_date = _date(sender, instance.date)
+
+
+@receiver(pre_delete, sender=Expense)
+@receiver(pre_delete, sender=Income)
+def transaction_deleting(sender, instance, **kwargs):
+    ensure_open(_date(sender, instance.date))
+
+
+@receiver(pre_save, sender=ExpenseItem)
+def item_saving(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    if ExpenseItem.expense.is_cached(instance):
+        ensure_open(_date(Expense, instance.expense.date))
+    else:
+        ensure_open(Expense.objects.filter(pk=instance.expense_id).values_list('date', flat=True).first())
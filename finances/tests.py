@@ -1,3 +1,416 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import tempfile
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+from unittest import skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.management import call_command
+from django.contrib.auth.models import User
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.test import TestCase, override_settings
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APITestCase
+
+from expenses.ledger import balance_at
+from expenses.models import Account, Expense, ExpenseItem
+from incomes.models import Income
+
+from .events import broker
+from .models import ChangeEvent, ClosedPeriod, DailyRollup, IdempotencyKey
+
+
+def expense_entry(**overrides):
+    entry = {
+        'type': 'expense',
+        'date': '2026-01-10',
+        'description': 'Groceries',
+        'category': 'Food',
+        'payment_source': 'cash',
+        'items': [{'item_name': 'Rice', 'quantity': '1', 'unit': 'kg', 'unit_price': '30.00'}],
+    }
+    entry.update(overrides)
+    return entry
+
+
+def income_entry(**overrides):
+    entry = {
+        'type': 'income',
+        'date': '2026-01-10',
+        'description': 'January fee',
+        'category': 'tuition_fee',
+        'amount': '50.00',
+        'amount_paid': '50.00',
+        'payment_source': 'cash',
+    }
+    entry.update(overrides)
+    return entry
+
+
+def expense_payload(**overrides):
+    payload = expense_entry(**overrides)
+    del payload['type']
+    return payload
+
+
+# ====================== ROLLUPS ======================
+class DailyRollupTests(APITestCase):
+
+    def setUp(self):
+        Account.objects.create(account_type='cash', balance=Decimal('100.00'))
+
+    def rollups(self):
+        return list(DailyRollup.objects.values_list('date', 'kind', 'category', 'total', 'count'))
+
+    def test_writes_keep_rollups_in_step(self):
+        first = self.client.post('/api/expenses/', expense_payload(), format='json').data
+        self.client.post('/api/expenses/', expense_payload(), format='json')
+        self.assertEqual(self.rollups(), [(date(2026, 1, 10), 'expense', 'Food', Decimal('60.00'), 2)])
+
+        self.client.patch(f"/api/expenses/{first['id']}/", {'category': 'Supplies'}, format='json')
+        self.client.delete(f"/api/expenses/{first['id']}/")
+        self.assertEqual(self.rollups(), [(date(2026, 1, 10), 'expense', 'Food', Decimal('30.00'), 1)])
+
+    def test_rebuild_matches_maintained_rollups(self):
+        self.client.post('/api/expenses/', expense_payload(), format='json')
+        self.client.post('/api/income/', income_entry(), format='json')
+        maintained = self.rollups()
+
+        call_command('rebuild_rollups', stdout=StringIO())
+
+        self.assertEqual(self.rollups(), maintained)
+        summary = self.client.get('/api/summary/', {'group_by': 'month'}).json()
+        self.assertEqual([(row['kind'], row['count']) for row in summary], [('expense', 1), ('income', 1)])
+
+
+# ====================== QUERY PLANS ======================
+@skipUnless(connection.vendor == 'sqlite', 'plans are checked on SQLite')
+class ExplainHotQueriesTests(TestCase):
+
+    def test_only_ranked_search_sorts(self):
+        output = StringIO()
+        call_command('explain_hot_queries', stdout=output)
+        output = output.getvalue()
+
+        self.assertIn('USING INDEX expense_cat_date_idx (category=? AND date>? AND date<?)', output)
+        self.assertIn('USING INDEX income_type_status_date_idx (transaction_type=? AND status=?)', output)
+        # Both are the relevance-ranked searches
+        self.assertEqual(output.count('USE TEMP B-TREE FOR ORDER BY'), 2)
+        self.assertIn('2 of 14 plans sort or scan a whole table.', output)
+
+    def test_analyze_needs_postgresql(self):
+        with self.assertRaises(CommandError):
+            call_command('explain_hot_queries', analyze=True, stdout=StringIO())
+
+
+# ====================== BENCHMARKS ======================
+class SeedLedgerTests(TestCase):
+
+    def setUp(self):
+        call_command(
+            'seed_ledger', expenses=40, incomes=20, max_items=3, days=60, batch_size=15, stdout=StringIO(),
+        )
+
+    def test_balances_ledger_and_rollups_agree(self):
+        self.assertEqual(Expense.objects.count(), 40)
+        self.assertEqual(Income.objects.count(), 20)
+        for account in Account.objects.all():
+            self.assertEqual(balance_at(account, date.today()), account.balance)
+        self.assertEqual(
+            DailyRollup.objects.filter(kind='expense').aggregate(total=Sum('total'))['total'],
+            Expense.objects.aggregate(total=Sum('total_expense'))['total'],
+        )
+
+    def test_refuses_a_database_with_data(self):
+        with self.assertRaises(CommandError):
+            call_command('seed_ledger', expenses=1, incomes=1, stdout=StringIO())
+
+
+class BenchmarkTests(TestCase):
+
+    def setUp(self):
+        call_command('seed_ledger', expenses=10, incomes=10, max_items=2, days=30, stdout=StringIO())
+
+    def test_writes_are_rolled_back_and_baseline_compared(self):
+        with tempfile.TemporaryDirectory() as directory:
+            baseline = os.path.join(directory, 'baseline.json')
+            call_command(
+                'benchmark', iterations=2, warmup=0, only='accounts,expenses.create', output=baseline,
+                stdout=StringIO(),
+            )
+            with open(baseline) as baseline_file:
+                scenarios = json.load(baseline_file)['scenarios']
+
+            self.assertEqual(set(scenarios), {'accounts.list', 'expenses.create'})
+            self.assertEqual(scenarios['expenses.create']['status'], 201)
+            self.assertEqual(Expense.objects.count(), 10)
+
+            output = StringIO()
+            call_command(
+                'benchmark', iterations=2, warmup=0, only='accounts', compare=baseline, threshold=100,
+                stdout=output,
+            )
+            self.assertIn('No regressions', output.getvalue())
+
+
+# ====================== IDEMPOTENCY ======================
+class IdempotencyTests(APITestCase):
+
+    def setUp(self):
+        Account.objects.create(account_type='cash', balance=Decimal('100.00'))
+
+    def post(self, payload, key):
+        return self.client.post('/api/expenses/', payload, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_the_first_response(self):
+        first = self.post(expense_payload(), 'key-1')
+        retry = self.post(expense_payload(), 'key-1')
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.json()['id'], first.json()['id'])
+        self.assertEqual(Expense.objects.count(), 1)
+        self.assertEqual(Account.objects.get(account_type='cash').balance, Decimal('70.00'))
+
+    def test_key_reused_for_another_request(self):
+        self.post(expense_payload(), 'key-1')
+        response = self.post(expense_payload(description='Something else'), 'key-1')
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Expense.objects.count(), 1)
+
+    def test_key_still_in_flight(self):
+        self.post(expense_payload(), 'key-1')
+        # As left by a request that hasn't committed its response yet
+        IdempotencyKey.objects.filter(key='key-1').update(status_code=None, response_body=None)
+
+        response = self.post(expense_payload(), 'key-1')
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Expense.objects.count(), 1)
+
+    def test_failed_request_can_be_retried(self):
+        failed = self.post(expense_payload(items=[
+            {'item_name': 'Rice', 'quantity': '1', 'unit': 'kg', 'unit_price': '500.00'},
+        ]), 'key-1')
+        self.assertEqual(failed.status_code, 400)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+        self.assertEqual(self.post(expense_payload(), 'key-1').status_code, 201)
+
+
+# ====================== BATCHES ======================
+class TransactionBatchTests(APITestCase):
+
+    def setUp(self):
+        Account.objects.create(account_type='cash', balance=Decimal('10.00'))
+
+    def post(self, transactions):
+        return self.client.post('/api/transactions/batch/', {'transactions': transactions}, format='json')
+
+    def test_incomes_fund_expenses_in_the_same_batch(self):
+        response = self.post([income_entry(), expense_entry(), expense_entry(description='Second')])
+
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(Expense.objects.count(), 2)
+        self.assertEqual(Income.objects.count(), 1)
+        self.assertEqual(Account.objects.get(account_type='cash').balance, Decimal('0.00'))
+
+    def test_one_invalid_entry_rejects_the_batch(self):
+        response = self.post([income_entry(), expense_entry(), expense_entry(payment_source='wallet')])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['index'] for error in response.data['errors']], [2])
+        self.assertFalse(Expense.objects.exists())
+        self.assertFalse(Income.objects.exists())
+
+    def test_insufficient_funds_rejects_the_batch(self):
+        response = self.post([income_entry(amount='10.00', amount_paid='10.00'), expense_entry()])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Expense.objects.exists())
+        self.assertFalse(Income.objects.exists())
+        self.assertEqual(Account.objects.get(account_type='cash').balance, Decimal('10.00'))
+
+
+# ====================== EVENTS ======================
+class ChangeEventTests(APITestCase):
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Account.objects.create(account_type='cash', balance=Decimal('100.00'))
+        # The local broker keeps its history across tests
+        self.after = broker.history[-1]['id'] if broker.history else 0
+
+    def poll(self, **params):
+        response = self.client.get('/api/events/', {'after': self.after, 'timeout': 0, **params})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def create_expense(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/api/expenses/', expense_payload(), format='json').data
+
+    def test_committed_changes_are_published_once(self):
+        expense = self.create_expense()
+
+        body = self.poll()
+        self.assertEqual(
+            [(event['topic'], event['action'], event['data']) for event in body['events']],
+            [('accounts', 'changed', {'accounts': {'cash': '70.00'}}), ('expense', 'created', {'ids': [expense['id']]})],
+        )
+        self.assertEqual(body['last_id'], body['events'][-1]['id'])
+
+        self.assertEqual(self.poll(after=body['last_id'])['events'], [])
+        self.assertEqual([event['topic'] for event in self.poll(topics='expense')['events']], ['expense'])
+
+    def test_rolled_back_changes_are_not_published(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/expenses/', expense_payload(items=[
+                {'item_name': 'Rice', 'quantity': '1', 'unit': 'kg', 'unit_price': '500.00'},
+            ]), format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.poll()['events'], [])
+
+    @override_settings(EVENTS_BACKEND='database')
+    def test_database_backend_stores_the_events(self):
+        self.after = 0
+        expense = self.create_expense()
+
+        self.assertEqual(ChangeEvent.objects.count(), 2)
+        events = self.poll(topics='expense')['events']
+        self.assertEqual([event['data'] for event in events], [{'ids': [expense['id']]}])
+
+    def test_bad_parameters(self):
+        for params in ({'topics': 'payroll'}, {'after': 'last'}, {'timeout': 'soon'}):
+            response = self.client.get('/api/events/', params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn(next(iter(params)), response.json())
+
+    async def test_stream_replays_from_last_event_id(self):
+        await sync_to_async(self.create_expense)()
+
+        response = await self.async_client.get(
+            '/api/events/stream/', {'topics': 'expense'}, headers={'Last-Event-ID': str(self.after)},
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        messages = aiter(response.streaming_content)
+        self.assertEqual(await anext(messages), b'retry: 3000\n\n')
+        message = (await anext(messages)).decode()
+        await messages.aclose()
+
+        self.assertIn('event: expense\n', message)
+        self.assertIn('"action": "created"', message)
+
+    async def test_long_poll_waits_for_the_next_change(self):
+        poll = asyncio.ensure_future(self.async_client.get('/api/events/', {'timeout': 5}))
+        await asyncio.sleep(0.1)
+        self.assertFalse(poll.done())
+
+        await sync_to_async(broker.publish)([('income', 'created', {'ids': [1]})])
+        response = await asyncio.wait_for(poll, 1)
+
+        self.assertEqual([event['topic'] for event in response.json()['events']], ['income'])
+
+
+# ====================== CLOSED PERIODS ======================
+class ClosedPeriodTests(APITestCase):
+
+    def setUp(self):
+        income = income_entry(date='2025-11-01', amount='100.00', amount_paid='100.00')
+        del income['type']
+        self.client.post('/api/income/', income, format='json')
+        response = self.client.post('/api/expenses/', expense_payload(date='2025-11-10'), format='json')
+        self.expense = Expense.objects.get(pk=response.data['id'])
+        response = self.client.post('/api/periods/', {'month': '2025-11'}, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+
+    def assertClosed(self, response):
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {'date': ['The 2025-11 period is closed.']})
+
+    def test_snapshot(self):
+        report = self.client.get('/api/periods/2025-11/').json()
+
+        totals = {row['kind']: Decimal(str(row['total'])) for row in report['totals']}
+        self.assertEqual(totals, {'expense': Decimal('30.00'), 'income': Decimal('100.00')})
+        self.assertEqual(report['closing_balances'], [{'account_type': 'cash', 'balance': 70.0}])
+
+    def test_api_writes_are_rejected(self):
+        url = f'/api/expenses/{self.expense.pk}/'
+        self.assertClosed(self.client.post('/api/expenses/', expense_payload(date='2025-11-20'), format='json'))
+        self.assertClosed(self.client.patch(url, {'description': 'changed'}, format='json'))
+        self.assertClosed(self.client.patch(url, {'date': '2026-01-05'}, format='json'))
+        self.assertClosed(self.client.delete(url))
+        self.assertEqual(Account.objects.get(account_type='cash').balance, Decimal('70.00'))
+
+    def test_batch_is_rejected(self):
+        response = self.client.post(
+            '/api/transactions/batch/', {'transactions': [income_entry(date='2025-11-12')]}, format='json'
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'], [{'index': 0, 'errors': {'date': ['The 2025-11 period is closed.']}}])
+
+    def test_model_writes_are_rejected(self):
+        moved_in = Expense.objects.create(date=date(2026, 1, 5), description='d', category='Food', payment_source='cash')
+        moved_in.date = date(2025, 11, 30)
+        self.expense.description = 'changed'
+
+        for write in (self.expense.save, self.expense.delete, self.expense.items.get().save, moved_in.save):
+            with self.assertRaises(ValidationError), transaction.atomic():
+                write()
+        self.assertEqual(Expense.objects.get(pk=self.expense.pk).description, 'Groceries')
+
+    def test_admin_is_read_only(self):
+        User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.login(username='admin', password='password')
+        url = f'/admin/expenses/expense/{self.expense.pk}/'
+
+        self.assertEqual(self.client.post(f'{url}change/', {'description': 'changed'}).status_code, 403)
+        self.assertEqual(self.client.post(f'{url}delete/', {'post': 'yes'}).status_code, 403)
+        self.assertTrue(ExpenseItem.objects.filter(expense=self.expense).exists())
+
+    def test_reports_read_the_snapshot(self):
+        # The rollups only answer for open months
+        DailyRollup.objects.all().delete()
+
+        for url in ('/api/expenses/reports/daily/', '/api/async/expenses/reports/daily/'):
+            daily = self.client.get(url).json()
+            self.assertEqual([(row['day'], row['count']) for row in daily['results']], [('2025-11-10', 1)])
+        summary = self.client.get('/api/summary/', {'group_by': 'category', 'kind': 'income'}).json()
+        self.assertEqual(summary, [{'category': 'tuition_fee', 'kind': 'income', 'total': 100.0, 'count': 1}])
+
+    def test_earlier_months_close_with_it(self):
+        response = self.client.post('/api/expenses/', expense_payload(date='2025-10-20'), format='json')
+        self.assertEqual(response.data, {'date': ['The 2025-10 period is closed.']})
+
+        response = self.client.post('/api/periods/', {'month': '2025-10'}, format='json')
+        self.assertEqual(response.data, {'month': ['The 2025-10 period is already closed.']})
+
+    def test_months_close_in_order(self):
+        self.client.delete('/api/periods/2025-11/')
+        self.client.post('/api/expenses/', expense_payload(date='2025-12-05'), format='json')
+
+        response = self.client.post('/api/periods/', {'month': '2025-12'}, format='json')
+        self.assertEqual(response.data, {'month': ['Close the 2025-11 period first.']})
+
+        self.client.post('/api/periods/', {'month': '2025-11'}, format='json')
+        self.assertEqual(self.client.post('/api/periods/', {'month': '2025-12'}, format='json').status_code, 201)
+        response = self.client.delete('/api/periods/2025-11/')
+        self.assertEqual(response.data, {'month': ['Reopen the 2025-12 period first.']})
+
+    def test_reopened_month_accepts_writes(self):
+        self.assertEqual(self.client.delete('/api/periods/2025-11/').status_code, 204)
+
+        response = self.client.patch(f'/api/expenses/{self.expense.pk}/', {'description': 'changed'}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(ClosedPeriod.objects.exists())
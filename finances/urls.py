@@ -1,7 +1,15 @@
 # finance/urls.py
 
+from django.urls import path
 from rest_framework.routers import DefaultRouter
+from .views import EventPollView, EventStreamView, PeriodViewSet, SummaryViewSet, TransactionBatchViewSet
 
 router = DefaultRouter()
+router.register('summary', SummaryViewSet, basename='summary')
+router.register('transactions', TransactionBatchViewSet, basename='transactions')
+router.register('periods', PeriodViewSet, basename='periods')
 
-urlpatterns = router.urls
+urlpatterns = router.urls + [
+    path('events/', EventPollView.as_view(), name='events-poll'),
+    path('events/stream/', EventStreamView.as_view(), name='events-stream'),
+]
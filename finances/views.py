@@ -1,3 +1,241 @@
-from django.shortcuts import render
+import asyncio
+import json
 
-# Create your views here.
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Sum
+from django.db.models.functions import TruncDay, TruncMonth
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.views import View
+from django_filters.rest_framework import DjangoFilterBackend
+from django_filters.utils import translate_validation
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from .batch import apply_transaction_batch, validate_batch
+from .events import TOPICS, broker
+from .filters import DailyRollupFilter
+from .idempotency import idempotent_response
+from .models import ClosedPeriod, DailyRollup
+from .periods import (
+    close_period,
+    merge_report_rows,
+    open_rollups,
+    parse_month,
+    period_report,
+    reopen_period,
+    snapshot_rollups,
+)
+
+
+# -----------------------------
+# SUMMARY VIEWSET
+# -----------------------------
+class SummaryViewSet(viewsets.GenericViewSet):
+    queryset = DailyRollup.objects.all()
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = DailyRollupFilter
+
+    GROUPINGS = {
+        "day": TruncDay("date"),
+        "month": TruncMonth("date"),
+        "category": None,
+        "payment_source": None,
+    }
+
+    def list(self, request, *args, **kwargs):
+        group_by = request.query_params.get("group_by", "month")
+        if group_by not in self.GROUPINGS:
+            raise ValidationError({"group_by": [f"Must be one of: {', '.join(self.GROUPINGS)}."]})
+
+        # Closed months are read from their snapshot
+        snapshots = self.filterset_class(request.query_params, queryset=snapshot_rollups(), request=request)
+        if not snapshots.is_valid():
+            raise translate_validation(snapshots.errors)
+
+        rows = []
+        for queryset in (open_rollups(self.filter_queryset(self.get_queryset())), snapshots.qs):
+            queryset = queryset.order_by()
+            if self.GROUPINGS[group_by] is not None:
+                queryset = queryset.annotate(**{group_by: self.GROUPINGS[group_by]})
+            rows += queryset.values(group_by, "kind").annotate(total=Sum("total"), count=Sum("count"))
+        return Response(merge_report_rows(rows, (group_by, "kind"), ("total", "count")))
+
+
+# -----------------------------
+# TRANSACTION BATCH
+# -----------------------------
+class TransactionBatchViewSet(viewsets.ViewSet):
+
+    @action(detail=False, methods=["post"], url_path="batch")
+    def batch(self, request, *args, **kwargs):
+        return idempotent_response(request, self._apply_batch)
+
+    def _apply_batch(self, request):
+        # Accepts {"transactions": [...]} or a bare list; each entry has
+        # "type": "expense" | "income" plus the usual create payload
+        entries = request.data
+        if isinstance(entries, dict):
+            entries = entries.get("transactions")
+
+        # All-or-nothing: report every invalid entry, create nothing
+        validated, errors = validate_batch(entries)
+        if errors:
+            return Response({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(apply_transaction_batch(validated), status=status.HTTP_201_CREATED)
+
+
+# -----------------------------
+# CLOSED PERIODS
+# -----------------------------
+class PeriodViewSet(viewsets.ViewSet):
+    # POST {"month": "YYYY-MM"} closes a month, DELETE reopens it; reports
+    # for closed months are read from their snapshot rows
+    lookup_field = "month"
+    lookup_value_regex = r"\d{4}-\d{2}"
+
+    def get_queryset(self):
+        return ClosedPeriod.objects.prefetch_related("totals")
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
+        for lookup in ("month__gte", "month__lte"):
+            value = request.query_params.get(lookup)
+            if value:
+                queryset = queryset.filter(**{lookup: parse_month(value, lookup)})
+        return Response([period_report(period, period.totals.all()) for period in queryset])
+
+    def create(self, request, *args, **kwargs):
+        period = close_period(parse_month(request.data.get("month")))
+        return Response(period_report(period, period.totals.all()), status=status.HTTP_201_CREATED)
+
+    def retrieve(self, request, month=None, *args, **kwargs):
+        period = get_object_or_404(self.get_queryset(), month=parse_month(month))
+        return Response(period_report(period, period.totals.all()))
+
+    def destroy(self, request, month=None, *args, **kwargs):
+        if not reopen_period(parse_month(month)):
+            raise Http404
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+# -----------------------------
+# CHANGE EVENTS
+# -----------------------------
+class EventParamsError(Exception):
+    def __init__(self, errors):
+        self.errors = errors
+
+
+def event_params(request):
+    # ?topics=accounts,expense limits the feed; the last seen event id comes
+    # from Last-Event-ID (EventSource reconnects) or ?after=
+    topics = [topic for topic in request.GET.get("topics", "").split(",") if topic]
+    unknown = [topic for topic in topics if topic not in TOPICS]
+    if unknown:
+        raise EventParamsError({"topics": [f"Must be one of: {', '.join(TOPICS)}."]})
+
+    last_id = request.headers.get("Last-Event-ID") or request.GET.get("after")
+    if last_id is not None:
+        try:
+            last_id = int(last_id)
+        except ValueError:
+            raise EventParamsError({"after": ["Must be an event id."]})
+    return topics, last_id
+
+
+async def _catch_up(subscription, last_id, topics):
+    if last_id is None:
+        # Only changes from now on
+        subscription.floor = await broker.latest_id()
+        return []
+    return [event for event in await broker.since(last_id, topics) if subscription.remember(event["id"])]
+
+
+def sse_message(event):
+    data = json.dumps(event, cls=DjangoJSONEncoder)
+    return f"id: {event['id']}\nevent: {event['topic']}\ndata: {data}\n\n"
+
+
+class EventStreamView(View):
+    # Server-sent events: one message per committed change. Clients wait on
+    # an in-memory queue, so idle connections cost no queries. Needs an
+    # ASGI server; under WSGI use the long-poll endpoint.
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            topics, last_id = event_params(request)
+        except EventParamsError as exc:
+            return JsonResponse(exc.errors, status=400)
+
+        subscription = broker.subscribe(topics)
+        try:
+            backlog = await _catch_up(subscription, last_id, topics)
+        except BaseException:
+            broker.unsubscribe(subscription)
+            raise
+
+        response = StreamingHttpResponse(
+            self.stream(subscription, backlog),
+            content_type="text/event-stream",
+        )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    async def stream(self, subscription, backlog):
+        keepalive = getattr(settings, "EVENTS_KEEPALIVE", 15)
+        try:
+            yield "retry: 3000\n\n"
+            for event in backlog:
+                yield sse_message(event)
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), keepalive)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if event is None:
+                    # Fell too far behind; the client reconnects with Last-Event-ID
+                    return
+                yield sse_message(event)
+        finally:
+            broker.unsubscribe(subscription)
+
+
+class EventPollView(View):
+    # Long-poll fallback: returns the events after ?after= right away, or
+    # waits up to ?timeout= seconds for the next ones.
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            topics, last_id = event_params(request)
+            timeout = float(request.GET.get("timeout", 25))
+        except EventParamsError as exc:
+            return JsonResponse(exc.errors, status=400)
+        except ValueError:
+            return JsonResponse({"timeout": ["Must be a number of seconds."]}, status=400)
+        timeout = min(max(timeout, 0), getattr(settings, "EVENTS_LONG_POLL_TIMEOUT", 30))
+
+        subscription = broker.subscribe(topics)
+        try:
+            events = await _catch_up(subscription, last_id, topics)
+            if not events:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    event = None
+                while event is not None:
+                    events.append(event)
+                    event = None if subscription.queue.empty() else subscription.queue.get_nowait()
+        finally:
+            broker.unsubscribe(subscription)
+
+        return JsonResponse(
+            {"events": events, "last_id": events[-1]["id"] if events else last_id},
+            encoder=DjangoJSONEncoder,
+        )
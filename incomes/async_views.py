@@ -0,0 +1,19 @@
+from rest_framework.response import Response
+
+from expenses.async_views import AsyncListView, AsyncViewSetView
+
+from .views import IncomeViewSet
+
+
+class AsyncIncomeListView(AsyncListView):
+    viewset_class = IncomeViewSet
+
+
+class AsyncIncomeAgingView(AsyncViewSetView):
+    viewset_class = IncomeViewSet
+    action = "aging"
+
+    async def respond(self, view, request):
+        as_of, transaction_type, queryset, aggregates = view.aging_query(request)
+        totals = await queryset.aaggregate(**aggregates)
+        return Response(view.aging_payload(as_of, transaction_type, totals))
@@ -0,0 +1,99 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import DatabaseError, transaction
+from rest_framework.exceptions import ValidationError
+
+from .models import Income
+from .serializers import IncomeSerializer
+from expenses.imports import DEFAULT_BATCH_SIZE, chunked, error_detail
+from expenses.services import post_balance_changes
+from finances.events import publish_change
+from finances.periods import closed_period_error, closed_until, ensure_open
+from finances.services import apply_rollup_deltas, collect_income_deltas
+
+
+def income_split(income):
+    if not income.amount_paid or income.amount_paid <= 0:
+        return Decimal('0'), Decimal('0')
+    if income.payment_source == 'combined':
+        return income.amount_cash or Decimal('0'), income.amount_bank or Decimal('0')
+    if income.payment_source == 'cash':
+        return income.amount_paid, Decimal('0')
+    return Decimal('0'), income.amount_paid
+
+
+def _import_income_batch(batch, report, seen_references):
+    incomes = []
+    cash_by_date, bank_by_date = defaultdict(Decimal), defaultdict(Decimal)
+    closed = closed_until()
+
+    for line_no, row, error in batch:
+        if error:
+            report['errors'].append({"row": line_no, "errors": error})
+            continue
+
+        serializer = IncomeSerializer(data=row)
+        if not serializer.is_valid():
+            report['errors'].append({"row": line_no, "errors": serializer.errors})
+            continue
+
+        income = Income(**serializer.validated_data)
+        income.calculate_balance()
+
+        if closed and income.date <= closed:
+            report['errors'].append({"row": line_no, "errors": closed_period_error(income.date)})
+            continue
+
+        # The unique validator only sees rows that are already saved
+        if income.reference_number:
+            if income.reference_number in seen_references:
+                report['errors'].append({
+                    "row": line_no,
+                    "errors": {"reference_number": ["Duplicate reference number in upload."]},
+                })
+                continue
+            seen_references.add(income.reference_number)
+
+        cash, bank = income_split(income)
+        cash_by_date[income.date] += cash
+        bank_by_date[income.date] += bank
+        incomes.append((line_no, income))
+
+    if not incomes:
+        return
+
+    try:
+        with transaction.atomic():
+            # The batch's months stay open until it commits
+            ensure_open(*(income.date for _, income in incomes))
+            Income.objects.bulk_create([income for _, income in incomes])
+
+            # Net balance effect of the whole batch in one UPDATE,
+            # with one ledger posting per account and date
+            postings = [('cash', amount, date) for date, amount in cash_by_date.items()]
+            postings += [('bank', amount, date) for date, amount in bank_by_date.items()]
+            post_balance_changes(postings, 'income')
+
+            apply_rollup_deltas(collect_income_deltas(income for _, income in incomes))
+            publish_change('income', 'created', [income.pk for _, income in incomes])
+    except ValidationError as exc:
+        # Closed since the rows were checked
+        for line_no, _ in incomes:
+            report['errors'].append({"row": line_no, "errors": error_detail(exc)})
+        return
+    except DatabaseError as exc:
+        for line_no, _ in incomes:
+            report['errors'].append({"row": line_no, "errors": {"detail": [str(exc)]}})
+        return
+
+    report['created'] += len(incomes)
+
+
+def import_incomes(rows, batch_size=DEFAULT_BATCH_SIZE):
+    report = {"created": 0, "errors": []}
+    seen_references = set()
+    for batch in chunked(rows, batch_size):
+        _import_income_batch(batch, report, seen_references)
+    report['errors'].sort(key=lambda error: error['row'])
+    return report
@@ -0,0 +1,73 @@
+from django.db import migrations
+
+# The statements are copied from expenses/search.py as of this migration
+# so it doesn't depend on app code that may change later.
+TABLE = 'incomes_income'
+FTS = 'incomes_income_fts'
+GIN_INDEX = 'incomes_income_search_gin'
+COLUMNS = '"description", "payer_name", "reference_number", "remarks"'
+NEW_VALUES = 'new."description", new."payer_name", new."reference_number", new."remarks"'
+OLD_VALUES = 'old."description", old."payer_name", old."reference_number", old."remarks"'
+DOCUMENT = (
+    "to_tsvector('simple', coalesce(\"description\", '') || ' ' || coalesce(\"payer_name\", '') || ' ' || "
+    "coalesce(\"reference_number\", '') || ' ' || coalesce(\"remarks\", ''))"
+)
+
+SQLITE_REMOVE_SQL = [
+    f'DROP TRIGGER IF EXISTS "{FTS}_ai"',
+    f'DROP TRIGGER IF EXISTS "{FTS}_ad"',
+    f'DROP TRIGGER IF EXISTS "{FTS}_au"',
+    f'DROP TABLE IF EXISTS "{FTS}"',
+]
+
+SQLITE_INSTALL_SQL = SQLITE_REMOVE_SQL + [
+    f'CREATE VIRTUAL TABLE "{FTS}" USING fts5('
+    f"{COLUMNS}, content='{TABLE}', content_rowid='id', "
+    f"tokenize='unicode61 remove_diacritics 2')",
+
+    f'CREATE TRIGGER "{FTS}_ai" AFTER INSERT ON "{TABLE}" BEGIN '
+    f'INSERT INTO "{FTS}"(rowid, {COLUMNS}) VALUES (new.id, {NEW_VALUES}); END',
+
+    f'CREATE TRIGGER "{FTS}_ad" AFTER DELETE ON "{TABLE}" BEGIN '
+    f'INSERT INTO "{FTS}"("{FTS}", rowid, {COLUMNS}) '
+    f"VALUES ('delete', old.id, {OLD_VALUES}); END",
+
+    f'CREATE TRIGGER "{FTS}_au" AFTER UPDATE OF {COLUMNS} ON "{TABLE}" BEGIN '
+    f'INSERT INTO "{FTS}"("{FTS}", rowid, {COLUMNS}) '
+    f"VALUES ('delete', old.id, {OLD_VALUES}); "
+    f'INSERT INTO "{FTS}"(rowid, {COLUMNS}) VALUES (new.id, {NEW_VALUES}); END',
+
+    f'INSERT INTO "{FTS}"("{FTS}") VALUES (\'rebuild\')',
+]
+
+POSTGRESQL_INSTALL_SQL = [
+    f'CREATE INDEX IF NOT EXISTS "{GIN_INDEX}" ON "{TABLE}" USING GIN (({DOCUMENT}))',
+]
+
+POSTGRESQL_REMOVE_SQL = [
+    f'DROP INDEX IF EXISTS "{GIN_INDEX}"',
+]
+
+
+def run(schema_editor, statements):
+    for statement in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def install(apps, schema_editor):
+    run(schema_editor, {'sqlite': SQLITE_INSTALL_SQL, 'postgresql': POSTGRESQL_INSTALL_SQL})
+
+
+def remove(apps, schema_editor):
+    run(schema_editor, {'sqlite': SQLITE_REMOVE_SQL, 'postgresql': POSTGRESQL_REMOVE_SQL})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incomes', '0005_income_amount_paid_income_balance_due_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, remove),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incomes', '0006_income_full_text_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='income',
+            index=models.Index(fields=['transaction_type', 'status', 'due_date'], name='income_type_status_due_idx'),
+        ),
+    ]
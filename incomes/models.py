@@ -151,7 +151,7 @@ class Income(models.Model):
     # ----------------------------
     # SAVE LOGIC
     # ----------------------------
-    def save(self, *args, **kwargs):
+    def calculate_balance(self):
 
         # Auto calculate balance
         if self.amount and self.amount_paid is not None:
@@ -165,6 +165,8 @@ class Income(models.Model):
         else:
             self.status = 'pending'
 
+    def save(self, *args, **kwargs):
+        self.calculate_balance()
         super().save(*args, **kwargs)
 
     # ----------------------------
@@ -177,4 +179,16 @@ class Income(models.Model):
     # ORDERING
     # ----------------------------
     class Meta:
-        ordering = ['-date']
\ No newline at end of file
+        ordering = ['-date']
+        indexes = [
+            # Outstanding receivables/liabilities by due date (aging report)
+            models.Index(
+                fields=['transaction_type', 'status', 'due_date'],
+                name='income_type_status_due_idx',
+            ),
+            # List filters, ending in the list ordering
+            models.Index(fields=['-date', 'id'], name='income_date_id_idx'),
+            models.Index(fields=['transaction_type', 'status', '-date'], name='income_type_status_date_idx'),
+            models.Index(fields=['category', '-date'], name='income_category_date_idx'),
+            models.Index(fields=['payment_source', '-date'], name='income_source_date_idx'),
+        ]
\ No newline at end of file
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from expenses.fieldsets import DynamicFieldsMixin
 from .models import Income
 
 class IncomeSerializer(serializers.ModelSerializer):
@@ -21,4 +22,11 @@ class IncomeSerializer(serializers.ModelSerializer):
                     "payment_source": f"Cash ({cash}) + Bank ({bank}) must equal Amount Paid ({amount_paid})."
                 })
 
-        return data
\ No newline at end of file
+        return data
+
+
+class IncomeListSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    # Read-only rows for ?fields= list requests
+    class Meta:
+        model = Income
+        fields = "__all__"
@@ -1,3 +1,161 @@
-from django.test import TestCase
+import csv
+from datetime import date
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from rest_framework.test import APITestCase
+
+from expenses.models import Account
+from finances.models import ClosedPeriod
+
+from .models import Income
+
+
+def income_payload(**overrides):
+    payload = {
+        'date': '2026-01-10',
+        'description': 'January fee',
+        'category': 'tuition_fee',
+        'amount': '100.00',
+        'amount_paid': '100.00',
+        'payment_source': 'cash',
+    }
+    payload.update(overrides)
+    return payload
+
+
+class IncomeBulkImportTests(APITestCase):
+
+    def upload(self, content):
+        return self.client.post(
+            '/api/income/bulk/',
+            {'file': SimpleUploadedFile('incomes.csv', content.encode(), content_type='text/csv')},
+            format='multipart',
+        )
+
+    def test_partial_failures_are_reported_per_row(self):
+        response = self.upload(
+            'date,description,category,amount,amount_paid,payment_source,reference_number\n'
+            '2026-01-10,ok,tuition_fee,100.00,100.00,cash,R-1\n'
+            'not-a-date,bad date,tuition_fee,100.00,100.00,cash,\n'
+            '2026-01-11,duplicate,tuition_fee,50.00,50.00,cash,R-1\n'
+            '2026-01-12,bank,tuition_fee,40.00,40.00,bank,\n'
+        )
+
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['created'], 2)
+        errors = {error['row']: error['errors'] for error in response.data['errors']}
+        self.assertEqual(set(errors), {3, 4})
+        self.assertIn('date', errors[3])
+        self.assertIn('reference_number', errors[4])
+        self.assertEqual(
+            dict(Account.objects.values_list('account_type', 'balance')),
+            {'cash': Decimal('100.00'), 'bank': Decimal('40.00')},
+        )
+
+    def test_closed_month_rows_are_rejected(self):
+        ClosedPeriod.objects.create(month=date(2025, 12, 1))
+
+        response = self.upload(
+            'date,description,category,amount,amount_paid,payment_source\n'
+            '2025-12-20,closed,tuition_fee,10.00,10.00,cash\n'
+            '2026-01-10,open,tuition_fee,10.00,10.00,cash\n'
+        )
+
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['errors'], [
+            {'row': 2, 'errors': {'date': ['The 2025-12 period is closed.']}},
+        ])
+
+
+class IncomeExportTests(APITestCase):
+
+    def test_csv_is_filtered(self):
+        self.client.post('/api/income/', income_payload(reference_number='R-1'), format='json')
+        self.client.post('/api/income/', income_payload(reference_number='R-2', payment_source='bank'), format='json')
+
+        response = self.client.get('/api/income/export/', {'payment_source': 'bank'})
+
+        self.assertEqual(response.status_code, 200)
+        rows = list(csv.DictReader(StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual([(row['reference_number'], row['payment_source']) for row in rows], [('R-2', 'bank')])
+
+
+class IncomeCursorPaginationTests(APITestCase):
+
+    def test_pages_walk_every_row_once(self):
+        for day in ('2026-01-03', '2026-01-01', '2026-01-03', '2026-01-02'):
+            self.client.post('/api/income/', income_payload(date=day), format='json')
+
+        ids, url, params = [], '/api/income/', {'pagination': 'cursor', 'page_size': 3}
+        while url:
+            body = self.client.get(url, params).json()
+            ids.extend(row['id'] for row in body['results'])
+            url, params = body['next'], None
+
+        self.assertEqual(ids, list(Income.objects.order_by('-date', 'id').values_list('id', flat=True)))
+
+
+class IncomeSparseFieldsetTests(APITestCase):
+
+    def test_only_the_requested_fields(self):
+        self.client.post('/api/income/', income_payload(amount_paid='40.00'), format='json')
+
+        response = self.client.get('/api/income/', {'fields': 'id,balance_due'})
+
+        self.assertEqual(response.json()['results'], [{'id': Income.objects.get().pk, 'balance_due': '60.00'}])
+
+
+class IncomeSearchTests(APITestCase):
+
+    def test_payer_and_reference_are_searched(self):
+        self.client.post('/api/income/', income_payload(payer_name='Jane Doe', reference_number='REC-1042'), format='json')
+        self.client.post('/api/income/', income_payload(payer_name='John Roe', reference_number='REC-2001'), format='json')
+
+        response = self.client.get('/api/income/', {'search': 'jane'})
+        self.assertEqual([row['payer_name'] for row in response.json()['results']], ['Jane Doe'])
+        response = self.client.get('/api/income/', {'search': 'rec 2001'})
+        self.assertEqual([row['payer_name'] for row in response.json()['results']], ['John Roe'])
+
+
+class IncomeAgingTests(APITestCase):
+
+    def setUp(self):
+        self.client.post('/api/income/', income_payload(transaction_type='receivable', amount_paid='40.00', date='2026-01-01'), format='json')
+
+    def test_outstanding_balance_is_bucketed(self):
+        response = self.client.get('/api/income/aging/', {'as_of': '2026-01-15'})
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['as_of'], '2026-01-15')
+        self.assertEqual(sum(Decimal(str(bucket['total'])) for bucket in body['results']), Decimal('60.00'))
+
+    def test_impossible_date_is_a_bad_request(self):
+        for url in ('/api/income/aging/', '/api/async/income/aging/'):
+            for value in ('2026-02-30', 'yesterday'):
+                response = self.client.get(url, {'as_of': value})
+                self.assertEqual(response.status_code, 400, (url, value))
+                self.assertIn('as_of', response.json())
+
+
+class IncomeClosedPeriodTests(APITestCase):
+
+    def setUp(self):
+        response = self.client.post('/api/income/', income_payload(date='2025-11-10'), format='json')
+        self.income = Income.objects.get(pk=response.data['id'])
+        ClosedPeriod.objects.create(month=date(2025, 11, 1))
+
+    def test_api_writes_are_rejected(self):
+        create = self.client.post('/api/income/', income_payload(date='2025-11-20'), format='json')
+        update = self.client.patch(f'/api/income/{self.income.pk}/', {'description': 'changed'}, format='json')
+        move_out = self.client.patch(f'/api/income/{self.income.pk}/', {'date': '2026-01-05'}, format='json')
+        delete = self.client.delete(f'/api/income/{self.income.pk}/')
+
+        for response in (create, update, move_out, delete):
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.data, {'date': ['The 2025-11 period is closed.']})
+        self.income.refresh_from_db()
+        self.assertEqual(self.income.description, 'January fee')
+        self.assertEqual(Account.objects.get(account_type='cash').balance, Decimal('100.00'))
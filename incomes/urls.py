@@ -1,5 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from .async_views import AsyncIncomeAgingView, AsyncIncomeListView
 from .views import IncomeViewSet
 
 router = DefaultRouter()
@@ -7,4 +8,8 @@ router.register(r'income', IncomeViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
+
+    # Async (ASGI) versions of the read endpoints
+    path('async/income/', AsyncIncomeListView.as_view(), name='async-income-list'),
+    path('async/income/aging/', AsyncIncomeAgingView.as_view(), name='async-income-aging'),
 ]
\ No newline at end of file
@@ -1,16 +1,57 @@
+from datetime import timedelta
+from decimal import Decimal
+
 from django.db import transaction
-from rest_framework import viewsets
-from rest_framework.filters import SearchFilter, OrderingFilter
+from django.db.models import Count, DecimalField, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.filters import OrderingFilter
 from django_filters.rest_framework import DjangoFilterBackend
 
+from .imports import import_incomes
 from .models import Income
-from .serializers import IncomeSerializer
+from .serializers import IncomeListSerializer, IncomeSerializer
+from expenses.exports import INCOME_EXPORT_FIELDS, export_response, income_export_rows
+from expenses.fieldsets import SparseFieldsetMixin
+from expenses.imports import get_batch_size, iter_upload_rows
+from expenses.pagination import IncomeCursorPagination, SelectablePaginationMixin
+from expenses.rows import ValuesListMixin
+from expenses.search import FullTextSearchFilter
 from expenses.services import apply_income, rollback_income
+from finances.idempotency import IdempotentMixin
+from finances.services import apply_rollup_deltas, collect_income_deltas
+
+AGING_TYPES = ("receivable", "liability")
+OUTSTANDING_STATUSES = ("pending", "partial")
+
+
+def aging_buckets(as_of):
+    # (name, condition) on due_date; days overdue counts from the due date
+    def days_ago(days):
+        return as_of - timedelta(days=days)
+
+    return [
+        ("not_due", Q(due_date__gt=as_of)),
+        ("0-30", Q(due_date__lte=as_of, due_date__gte=days_ago(30))),
+        ("31-60", Q(due_date__lt=days_ago(30), due_date__gte=days_ago(60))),
+        ("61-90", Q(due_date__lt=days_ago(60), due_date__gte=days_ago(90))),
+        ("90+", Q(due_date__lt=days_ago(90))),
+        ("no_due_date", Q(due_date__isnull=True)),
+    ]
 
-class IncomeViewSet(viewsets.ModelViewSet):
+
+class IncomeViewSet(IdempotentMixin, ValuesListMixin, SparseFieldsetMixin, SelectablePaginationMixin, viewsets.ModelViewSet):
     queryset = Income.objects.all().order_by('-date')
     serializer_class = IncomeSerializer
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    list_serializer_class = IncomeListSerializer
+    cursor_pagination_class = IncomeCursorPagination
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, OrderingFilter]
 
     filterset_fields = ['transaction_type', 'category', 'payment_source', 'status', 'date']
     search_fields = ['description', 'payer_name', 'reference_number', 'remarks']
@@ -25,13 +66,17 @@ class IncomeViewSet(viewsets.ModelViewSet):
                 income.amount_paid,
                 income.payment_source,
                 income.amount_cash or 0,
-                income.amount_bank or 0
+                income.amount_bank or 0,
+                date=income.date
             )
 
+        apply_rollup_deltas(collect_income_deltas([income]))
+
     @transaction.atomic
     def perform_update(self, serializer):
-        # Get the database state BEFORE the update
-        old_income = self.get_object()
+        # Get the database state BEFORE the update, locked so concurrent
+        # edits of one income roll back its payment once
+        old_income = get_object_or_404(Income.objects.select_for_update(), pk=serializer.instance.pk)
 
         # Rollback previous applied money
         if old_income.amount_paid > 0:
@@ -39,7 +84,8 @@ class IncomeViewSet(viewsets.ModelViewSet):
                 old_income.amount_paid,
                 old_income.payment_source,
                 old_income.amount_cash or 0,
-                old_income.amount_bank or 0
+                old_income.amount_bank or 0,
+                date=old_income.date
             )
 
         # Save new data
@@ -51,16 +97,101 @@ class IncomeViewSet(viewsets.ModelViewSet):
                 income.amount_paid,
                 income.payment_source,
                 income.amount_cash or 0,
-                income.amount_bank or 0
+                income.amount_bank or 0,
+                date=income.date
             )
 
+        deltas = collect_income_deltas([old_income], sign=-1)
+        apply_rollup_deltas(collect_income_deltas([income], deltas=deltas))
+
     @transaction.atomic
     def perform_destroy(self, instance):
+        instance = get_object_or_404(Income.objects.select_for_update(), pk=instance.pk)
         if instance.amount_paid > 0:
             rollback_income(
                 instance.amount_paid,
                 instance.payment_source,
                 instance.amount_cash or 0,
-                instance.amount_bank or 0
+                instance.amount_bank or 0,
+                date=instance.date
             )
-        instance.delete()
\ No newline at end of file
+        apply_rollup_deltas(collect_income_deltas([instance], sign=-1))
+        instance.delete()
+
+    @action(detail=False, methods=["post"], url_path="bulk")
+    def bulk(self, request, *args, **kwargs):
+        upload = request.FILES.get("file")
+        if upload is None:
+            raise ValidationError({"file": ["Upload a CSV or NDJSON file."]})
+
+        report = import_incomes(
+            iter_upload_rows(upload),
+            batch_size=get_batch_size(request.query_params.get("batch_size")),
+        )
+        response_status = status.HTTP_201_CREATED if report["created"] else status.HTTP_400_BAD_REQUEST
+        return Response(report, status=response_status)
+
+    @action(detail=False, methods=["get"], url_path="export")
+    def export(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return export_response(
+            income_export_rows(queryset),
+            INCOME_EXPORT_FIELDS,
+            request.query_params.get("file_format", "csv"),
+            "income",
+        )
+
+    @action(detail=False, methods=["get"], url_path="aging")
+    def aging(self, request, *args, **kwargs):
+        as_of, transaction_type, queryset, aggregates = self.aging_query(request)
+        return Response(self.aging_payload(as_of, transaction_type, queryset.aggregate(**aggregates)))
+
+    def aging_query(self, request):
+        transaction_type = request.query_params.get("transaction_type", "receivable")
+        if transaction_type not in AGING_TYPES:
+            raise ValidationError({"transaction_type": [f"Must be one of: {', '.join(AGING_TYPES)}."]})
+
+        as_of_param = request.query_params.get("as_of")
+        if as_of_param:
+            try:
+                as_of = parse_date(as_of_param)
+            except ValueError:
+                as_of = None
+            if as_of is None:
+                raise ValidationError({"as_of": ["Enter a valid date (YYYY-MM-DD)."]})
+        else:
+            as_of = timezone.localdate()
+
+        # Other filters (category, payer search, ...) still apply
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            transaction_type=transaction_type,
+            status__in=OUTSTANDING_STATUSES,
+            balance_due__gt=0,
+        )
+
+        # One pass over the outstanding rows, every bucket aggregated at once
+        zero = Value(Decimal("0"), output_field=DecimalField(max_digits=14, decimal_places=2))
+        aggregates = {}
+        for name, condition in aging_buckets(as_of):
+            aggregates[f"{name}__total"] = Coalesce(Sum("balance_due", filter=condition), zero)
+            aggregates[f"{name}__count"] = Count("id", filter=condition)
+        return as_of, transaction_type, queryset.order_by(), aggregates
+
+    @staticmethod
+    def aging_payload(as_of, transaction_type, totals):
+        results = [
+            {
+                "bucket": name,
+                "total": totals[f"{name}__total"],
+                "count": totals[f"{name}__count"],
+            }
+            for name, _ in aging_buckets(as_of)
+        ]
+
+        return {
+            "as_of": as_of,
+            "transaction_type": transaction_type,
+            "results": results,
+            "total_outstanding": sum((row["total"] for row in results), Decimal("0")),
+            "count": sum(row["count"] for row in results),
+        }